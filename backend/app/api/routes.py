@@ -2,6 +2,7 @@
 API Route Handlers for The Arbiter.
 """
 
+import asyncio
 import logging
 import time
 import uuid
@@ -50,7 +51,14 @@ from app.api.schemas import (
     SourceSuggestionResponse,
 )
 from app.services.answer_generator import generate_answer_with_verification, estimate_answer_quality
-from app.services.cache import generate_cache_key, get_cached_answer, cache_answer
+from app.services.cache import (
+    generate_cache_key,
+    get_cached_answer,
+    cache_answer,
+    get_or_create_embedding,
+    semantic_get,
+    semantic_put,
+)
 from app.services.cost_calculator import calculate_cost
 from app.middleware import check_ask_rate_limit, check_ingest_rate_limit, RateLimitResult
 from app.middleware.budget import check_budget
@@ -145,6 +153,114 @@ async def debug_db(games_repo: GamesRepository = Depends(get_games_repo)):
 # Ask Endpoint (Core Q&A)
 # ============================================================================
 
+# Per-request fields left out of cached answers; a cache hit fills them
+# in for the question actually asked
+_PER_REQUEST_FIELDS = ("question", "history_id")
+
+
+def _shareable_answer(response_data: dict) -> dict:
+    """Copy of an /ask response without its per-request fields, for caching."""
+    return {k: v for k, v in response_data.items() if k not in _PER_REQUEST_FIELDS}
+
+
+async def _save_history(
+    history_repo: HistoryRepository,
+    request: AskRequest,
+    question_embedding: list[float],
+    verdict: str,
+    confidence: str,
+    confidence_reason: str | None,
+    citations: list[CitationResponse],
+    response_time_ms: int,
+    model_used: str | None,
+) -> int | None:
+    """Save an /ask exchange to history, returning its id (None on failure)."""
+    try:
+        history_create = AskHistoryCreate(
+            game_id=request.game_id,
+            edition=request.edition,
+            expansions_used=request.expansion_ids,
+            question=request.question,
+            normalized_question=request.question.lower().strip(),
+            question_embedding=question_embedding,
+            verdict=verdict,
+            confidence=confidence,
+            confidence_reason=confidence_reason,
+            citations=[
+                Citation(
+                    chunk_id=c.chunk_id,
+                    quote=c.quote,
+                    page=c.page,
+                    verified=c.verified,
+                )
+                for c in citations
+            ],
+            response_time_ms=response_time_ms,
+            model_used=model_used,
+        )
+        
+        saved_history = await history_repo.save_query(history_create)
+        return saved_history.id
+    except Exception as e:
+        logger.warning(f"Failed to save to history: {e}")
+        # Don't fail the request if history save fails
+        return None
+
+
+async def _serve_cached_answer(
+    cached_response: dict,
+    request: AskRequest,
+    history_repo: HistoryRepository,
+    costs_repo: CostsRepository,
+    start_time: float,
+    question_embedding: list[float] | None = None,
+) -> dict:
+    """
+    Log a cache hit and complete a cached /ask response for this request.
+    
+    Cached answers are shared between questions (and, for the semantic
+    cache, paraphrases), so the response gets the question as asked and
+    its own history entry.
+    """
+    response_time_ms = int((time.time() - start_time) * 1000)
+    
+    if question_embedding is None:
+        from app.services.cache import get_cached_embedding
+        question_embedding = get_cached_embedding(request.question) or []
+    
+    cached_response["question"] = request.question
+    cached_response["history_id"] = await _save_history(
+        history_repo,
+        request,
+        question_embedding,
+        verdict=cached_response.get("verdict", ""),
+        confidence=cached_response.get("confidence"),
+        confidence_reason=cached_response.get("confidence_reason"),
+        citations=[CitationResponse(**c) for c in cached_response.get("citations", [])],
+        response_time_ms=response_time_ms,
+        model_used="cache",
+    )
+    
+    try:
+        await costs_repo.log_cost(ApiCostCreate(
+            request_id=str(uuid.uuid4()),
+            endpoint="/ask",
+            model="cache",
+            input_tokens=0,
+            output_tokens=0,
+            cost_usd=0.0,
+            cache_hit=True
+        ))
+    except Exception as e:
+        logger.warning(f"Failed to log cache hit: {e}")
+    
+    # Add cached flag (not stored in JSON but added on return)
+    # We assume stored JSON matches AskResponse structure
+    cached_response["cached"] = True
+    cached_response["response_time_ms"] = response_time_ms
+    return cached_response
+
+
 @router.post(
     "/ask",
     response_model=AskResponse,
@@ -184,25 +300,9 @@ async def ask_question(
     try:
         cached_response = await get_cached_answer(cache_key)
         if cached_response:
-            # Log cache hit
-            try:
-                await costs_repo.log_cost(ApiCostCreate(
-                    request_id=str(uuid.uuid4()),
-                    endpoint="/ask",
-                    model="cache",
-                    input_tokens=0,
-                    output_tokens=0,
-                    cost_usd=0.0,
-                    cache_hit=True
-                ))
-            except Exception as e:
-                logger.warning(f"Failed to log cache hit: {e}")
-
-            # Add cached flag (not stored in JSON but added on return)
-            # We assume stored JSON matches AskResponse structure
-            cached_response["cached"] = True
-            cached_response["response_time_ms"] = int((time.time() - start_time) * 1000)
-            return cached_response
+            return await _serve_cached_answer(
+                cached_response, request, history_repo, costs_repo, start_time,
+            )
     except Exception as e:
         logger.warning(f"Cache check failed: {e}")
     
@@ -292,6 +392,24 @@ async def ask_question(
             },
         )
     
+    # 3b. Check semantic answer cache (paraphrases of answered questions).
+    # The embedding is cached, so hybrid search below reuses it.
+    question_embedding = None
+    try:
+        question_embedding = await asyncio.to_thread(get_or_create_embedding, request.question)
+        cached_response = await semantic_get(
+            request.game_id, request.edition, request.expansion_ids, question_embedding,
+            chunks_repo=chunks_repo,
+            source_ids=source_ids,
+        )
+        if cached_response:
+            return await _serve_cached_answer(
+                cached_response, request, history_repo, costs_repo, start_time,
+                question_embedding=question_embedding,
+            )
+    except Exception as e:
+        logger.warning(f"Semantic cache check failed: {e}")
+    
     # 4. Hybrid search for relevant chunks (keyword + vector)
     try:
         from app.services.retrieval import hybrid_search
@@ -411,43 +529,21 @@ async def ask_question(
     response_time_ms = int((time.time() - start_time) * 1000)
     
     # 8. Save to history
-    history_id = None
-    try:
-        # Normalize question for caching
-        normalized_q = request.question.lower().strip()
-        
-        # Get embedding from cache (was created during hybrid search)
-        from app.services.cache import get_cached_embedding
-        question_embedding = get_cached_embedding(request.question) or []
-        
-        history_create = AskHistoryCreate(
-            game_id=request.game_id,
-            edition=request.edition,
-            expansions_used=request.expansion_ids,
-            question=request.question,
-            normalized_question=normalized_q,
-            question_embedding=question_embedding,
-            verdict=answer_result.get("verdict", ""),
-            confidence=confidence,
-            confidence_reason=confidence_reason,
-            citations=[
-                Citation(
-                    chunk_id=c.chunk_id,
-                    quote=c.quote,
-                    page=c.page,
-                    verified=c.verified,
-                )
-                for c in citations
-            ],
-            response_time_ms=response_time_ms,
-            model_used="gpt-4o-mini",
-        )
-        
-        saved_history = await history_repo.save_query(history_create)
-        history_id = saved_history.id
-    except Exception as e:
-        logger.warning(f"Failed to save to history: {e}")
-        # Don't fail the request if history save fails
+    # Get embedding from cache (was created during hybrid search)
+    from app.services.cache import get_cached_embedding
+    question_embedding = get_cached_embedding(request.question) or []
+    
+    history_id = await _save_history(
+        history_repo,
+        request,
+        question_embedding,
+        verdict=answer_result.get("verdict", ""),
+        confidence=confidence,
+        confidence_reason=confidence_reason,
+        citations=citations,
+        response_time_ms=response_time_ms,
+        model_used=answer_result.get("_model"),
+    )
     
     # Build response dict (to include optional superseded_rule)
     response_data = {
@@ -474,14 +570,20 @@ async def ask_question(
     
     # 5. Cache verified answers (Redis)
     if answer_result.get("verified_quote"):
+        shared_answer = _shareable_answer(response_data)
         try:
-            await cache_answer(cache_key, response_data)
+            await cache_answer(cache_key, shared_answer)
         except Exception as e:
             logger.warning(f"Failed to cache answer: {e}")
+        
+        if question_embedding:
+            await semantic_put(
+                request.game_id, request.edition, request.expansion_ids,
+                request.question, question_embedding, shared_answer,
+            )
     
-    # 6. Log cost
-    usage = answer_result.get("_usage")
-    if usage:
+    # 6. Log cost (one entry per LLM call; a speculative call logs its own)
+    for usage in answer_result.get("_usages", []):
         try:
             cost_usd = calculate_cost(usage["model"], usage["input_tokens"], usage["output_tokens"])
             await costs_repo.log_cost(ApiCostCreate(
@@ -1080,6 +1182,7 @@ async def trigger_full_cleanup():
     - cleanup_expired_chunks
     - cleanup_old_history (90 days retention)
     - cleanup_rate_limit_violations (30 days retention)
+    - cleanup_semantic_cache (rows past the cache TTL)
     """
     from app.jobs import run_all_cleanup_jobs
     
@@ -1175,17 +1278,22 @@ async def trigger_source_health_check(source_id: int | None = None):
     If source_id is provided, checks only that source.
     Otherwise checks all sources.
     """
-    from app.jobs import check_source_health, check_all_sources
+    from app.jobs.health_jobs import (
+        REQUEST_TIMEOUT,
+        check_all_sources_async,
+        check_source_health_async,
+    )
     
     try:
         if source_id is not None:
-            result = check_source_health(source_id)
+            async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
+                result = await check_source_health_async(source_id, client)
             return {
                 "success": True,
                 "result": result,
             }
         else:
-            result = check_all_sources()
+            result = await check_all_sources_async()
             return {
                 "success": True,
                 **result,
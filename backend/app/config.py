@@ -34,6 +34,20 @@ class Settings(BaseSettings):
     # Redis
     redis_url: str = "redis://localhost:6379"
     
+    # Answer generation: start the strict retry alongside the first attempt
+    # (SPECULATIVE_VERIFY=1). Halves latency when the first citation fails
+    # verification, at the cost of a second LLM call on every question.
+    speculative_verify: bool = False
+    
+    # Answer generation: pass chunks to the model as a compact tab-separated
+    # table (COMPACT_CHUNK_PROMPT=1). Fewer prompt tokens; answer quality
+    # with it has not been evaluated yet.
+    compact_chunk_prompt: bool = False
+    
+    # Ingestion: split sentences with blingfire's native FSM when installed
+    # (FAST_SENTENCE_SPLITTER=1); otherwise the regex splitter is used
+    fast_sentence_splitter: bool = False
+    
     # Frontend (CORS)
     frontend_url: str = "http://localhost:3000"
     
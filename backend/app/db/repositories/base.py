@@ -2,6 +2,7 @@
 Base repository class with common CRUD operations.
 """
 
+from functools import lru_cache
 from typing import Any, Generic, TypeVar
 
 import psycopg
@@ -14,6 +15,40 @@ T = TypeVar("T", bound=BaseDBModel)
 CreateT = TypeVar("CreateT", bound=BaseDBModel)
 
 
+# Significant digits per element: float4 (vector) needs 9 to round-trip,
+# halfvec's 16-bit floats are exact well within 6
+VECTOR_DIGITS = 9
+HALFVEC_DIGITS = 6
+
+
+@lru_cache(maxsize=8)
+def _vector_format(dimensions: int, digits: int) -> str:
+    """printf-style template for a pgvector literal of the given size."""
+    return "[" + ",".join([f"%.{digits}g"] * dimensions) + "]"
+
+
+def to_vector_literal(embedding: list[float]) -> str:
+    """
+    Format an embedding as a pgvector text literal ('[x,y,...]') for a
+    full-precision vector column.
+    
+    One %-format call over a cached template does the per-element work in
+    C, several times faster than joining str() of each float.
+    """
+    return _vector_format(len(embedding), VECTOR_DIGITS) % tuple(embedding)
+
+
+def to_halfvec_literal(embedding: list[float]) -> str:
+    """
+    Format an embedding as a pgvector text literal for a halfvec column.
+    
+    Same as to_vector_literal() but with six significant digits, which is
+    beyond halfvec's precision and about half the bytes of full float repr.
+    Don't use it for vector columns, which would lose precision.
+    """
+    return _vector_format(len(embedding), HALFVEC_DIGITS) % tuple(embedding)
+
+
 class BaseRepository(Generic[T, CreateT]):
     """
     Base repository with generic CRUD operations.
@@ -5,7 +5,14 @@ Chunks repository for rule chunk management and vector search.
 from datetime import datetime
 
 from app.db.models import RuleChunk, RuleChunkCreate, RuleChunkSearchResult
-from app.db.repositories.base import BaseRepository
+from app.db.repositories.base import BaseRepository, to_halfvec_literal
+
+
+# Rows per multi-row INSERT statement in bulk_insert_chunks_sync
+BULK_INSERT_PAGE_SIZE = 200
+
+# Above this many chunks, ingestion streams rows with COPY instead
+COPY_THRESHOLD = 1000
 
 
 class ChunksRepository(BaseRepository[RuleChunk, RuleChunkCreate]):
@@ -58,7 +65,7 @@ class ChunksRepository(BaseRepository[RuleChunk, RuleChunkCreate]):
         where_clause = " AND ".join(conditions)
         
         # Build embedding string
-        embedding_str = "[" + ",".join(map(str, embedding)) + "]"
+        embedding_str = to_halfvec_literal(embedding)
         
         # Build params in EXACT order they appear in SQL:
         # 1. embedding (SELECT - line 72)
@@ -72,15 +79,15 @@ class ChunksRepository(BaseRepository[RuleChunk, RuleChunkCreate]):
         query = f"""
             SELECT 
                 rc.*,
-                1 - (rc.embedding <=> %s::vector) as similarity,
+                1 - (rc.embedding <=> %s::halfvec) as similarity,
                 gs.edition as source_edition,
                 g.name as game_name
             FROM rule_chunks rc
             JOIN game_sources gs ON rc.source_id = gs.id
             JOIN games g ON gs.game_id = g.id
             WHERE {where_clause}
-            AND 1 - (rc.embedding <=> %s::vector) >= %s
-            ORDER BY rc.embedding <=> %s::vector
+            AND 1 - (rc.embedding <=> %s::halfvec) >= %s
+            ORDER BY rc.embedding <=> %s::halfvec
             LIMIT %s
         """
         
@@ -136,7 +143,7 @@ class ChunksRepository(BaseRepository[RuleChunk, RuleChunkCreate]):
         # Add keyword patterns
         keyword_patterns = [f"%{kw}%" for kw in keywords]
         
-        embedding_str = "[" + ",".join(map(str, embedding)) + "]"
+        embedding_str = to_halfvec_literal(embedding)
         
         # Build the hybrid query
         if keywords:
@@ -146,9 +153,9 @@ class ChunksRepository(BaseRepository[RuleChunk, RuleChunkCreate]):
             query = f"""
                 SELECT 
                     rc.*,
-                    (1 - (rc.embedding <=> %s::vector)) as vector_similarity,
+                    (1 - (rc.embedding <=> %s::halfvec)) as vector_similarity,
                     {keyword_score} as keyword_match,
-                    ((1 - (rc.embedding <=> %s::vector)) * %s + 
+                    ((1 - (rc.embedding <=> %s::halfvec)) * %s + 
                      {keyword_score} * %s) as combined_score,
                     gs.edition as source_edition,
                     g.name as game_name
@@ -359,7 +366,7 @@ class ChunksRepository(BaseRepository[RuleChunk, RuleChunkCreate]):
         """Create a new chunk with embedding."""
         embedding_value = None
         if chunk.embedding:
-            embedding_value = "[" + ",".join(map(str, chunk.embedding)) + "]"
+            embedding_value = to_halfvec_literal(chunk.embedding)
         
         query = """
             INSERT INTO rule_chunks (
@@ -367,7 +374,7 @@ class ChunksRepository(BaseRepository[RuleChunk, RuleChunkCreate]):
                 embedding, precedence_level, overrides_chunk_id, override_confidence,
                 phase_tags, expires_at
             )
-            VALUES (%s, %s, %s, %s, %s, %s::vector, %s, %s, %s, %s, %s)
+            VALUES (%s, %s, %s, %s, %s, %s::halfvec, %s, %s, %s, %s, %s)
             RETURNING id, source_id, page_number, chunk_index, section_title, 
                       chunk_text, precedence_level, overrides_chunk_id, 
                       override_confidence, phase_tags, expires_at, created_at
@@ -441,7 +448,7 @@ class ChunksRepository(BaseRepository[RuleChunk, RuleChunkCreate]):
         """Create chunk (sync version)."""
         embedding_value = None
         if chunk.embedding:
-            embedding_value = "[" + ",".join(map(str, chunk.embedding)) + "]"
+            embedding_value = to_halfvec_literal(chunk.embedding)
         
         query = """
             INSERT INTO rule_chunks (
@@ -449,7 +456,7 @@ class ChunksRepository(BaseRepository[RuleChunk, RuleChunkCreate]):
                 embedding, precedence_level, overrides_chunk_id, override_confidence,
                 phase_tags, expires_at
             )
-            VALUES (%s, %s, %s, %s, %s, %s::vector, %s, %s, %s, %s, %s)
+            VALUES (%s, %s, %s, %s, %s, %s::halfvec, %s, %s, %s, %s, %s)
             RETURNING id, source_id, page_number, chunk_index, section_title, 
                       chunk_text, precedence_level, overrides_chunk_id, 
                       override_confidence, phase_tags, expires_at, created_at
@@ -481,13 +488,20 @@ class ChunksRepository(BaseRepository[RuleChunk, RuleChunkCreate]):
             self.conn.commit()
             return len(rows)
     
-    def bulk_insert_chunks_sync(self, chunks: list[RuleChunkCreate]) -> int:
+    def bulk_insert_chunks_sync(
+        self,
+        chunks: list[RuleChunkCreate],
+        page_size: int = BULK_INSERT_PAGE_SIZE,
+    ) -> int:
         """
-        Bulk insert chunks for efficiency.
-        Uses executemany for better performance with large batches.
+        Bulk insert chunks with one multi-row INSERT per page.
+        
+        Sends len(chunks) / page_size statements instead of one
+        round trip per chunk, and commits once at the end.
         
         Args:
             chunks: List of RuleChunkCreate objects
+            page_size: Rows per INSERT statement
             
         Returns:
             Number of chunks inserted
@@ -495,37 +509,94 @@ class ChunksRepository(BaseRepository[RuleChunk, RuleChunkCreate]):
         if not chunks:
             return 0
         
-        query = """
-            INSERT INTO rule_chunks (
-                source_id, page_number, chunk_index, section_title, chunk_text,
-                embedding, precedence_level, overrides_chunk_id, override_confidence,
-                phase_tags, expires_at
-            )
-            VALUES (%s, %s, %s, %s, %s, %s::vector, %s, %s, %s, %s, %s)
+        row_template = "(%s, %s, %s, %s, %s, %s::halfvec, %s, %s, %s, %s, %s)"
+        
+        with self._get_cursor() as cur:
+            for start in range(0, len(chunks), page_size):
+                page = chunks[start:start + page_size]
+                
+                params: list = []
+                for chunk in page:
+                    embedding_value = None
+                    if chunk.embedding:
+                        embedding_value = to_halfvec_literal(chunk.embedding)
+                    
+                    params.extend((
+                        chunk.source_id,
+                        chunk.page_number,
+                        chunk.chunk_index,
+                        chunk.section_title,
+                        chunk.chunk_text,
+                        embedding_value,
+                        chunk.precedence_level,
+                        chunk.overrides_chunk_id,
+                        chunk.override_confidence,
+                        chunk.phase_tags,
+                        chunk.expires_at,
+                    ))
+                
+                values_sql = ", ".join([row_template] * len(page))
+                cur.execute(
+                    f"""
+                    INSERT INTO rule_chunks (
+                        source_id, page_number, chunk_index, section_title, chunk_text,
+                        embedding, precedence_level, overrides_chunk_id, override_confidence,
+                        phase_tags, expires_at
+                    )
+                    VALUES {values_sql}
+                    """,
+                    params,
+                )
+            self.conn.commit()
+        
+        return len(chunks)
+    
+    def copy_chunks_sync(self, chunk_creates: list[RuleChunkCreate]) -> int:
         """
+        Stream chunks into rule_chunks with COPY ... FROM STDIN.
         
-        values = []
-        for chunk in chunks:
-            embedding_value = None
-            if chunk.embedding:
-                embedding_value = "[" + ",".join(map(str, chunk.embedding)) + "]"
+        Used for very large sources: rows are written to the server as
+        they are produced, so client memory stays flat and there is no
+        per-statement parse/plan. Embeddings are sent as pgvector text
+        literals and parsed server-side.
+        
+        Args:
+            chunk_creates: Chunks to insert
             
-            values.append((
-                chunk.source_id,
-                chunk.page_number,
-                chunk.chunk_index,
-                chunk.section_title,
-                chunk.chunk_text,
-                embedding_value,
-                chunk.precedence_level,
-                chunk.overrides_chunk_id,
-                chunk.override_confidence,
-                chunk.phase_tags,
-                chunk.expires_at,
-            ))
+        Returns:
+            Number of chunks inserted
+        """
+        if not chunk_creates:
+            return 0
         
         with self._get_cursor() as cur:
-            cur.executemany(query, values)
+            with cur.copy(
+                """
+                COPY rule_chunks (
+                    source_id, page_number, chunk_index, section_title, chunk_text,
+                    embedding, precedence_level, overrides_chunk_id, override_confidence,
+                    phase_tags, expires_at
+                ) FROM STDIN
+                """
+            ) as copy:
+                for chunk in chunk_creates:
+                    embedding_value = None
+                    if chunk.embedding:
+                        embedding_value = to_halfvec_literal(chunk.embedding)
+                    
+                    copy.write_row((
+                        chunk.source_id,
+                        chunk.page_number,
+                        chunk.chunk_index,
+                        chunk.section_title,
+                        chunk.chunk_text,
+                        embedding_value,
+                        chunk.precedence_level,
+                        chunk.overrides_chunk_id,
+                        chunk.override_confidence,
+                        chunk.phase_tags,
+                        chunk.expires_at,
+                    ))
             self.conn.commit()
         
-        return len(chunks)
+        return len(chunk_creates)
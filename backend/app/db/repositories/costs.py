@@ -28,6 +28,22 @@ class CostsRepository(BaseRepository[ApiCost, ApiCostCreate]):
                 **cost.model_dump()
             )
 
+    def log_cost_sync(self, cost: ApiCostCreate) -> None:
+        """Log a cost entry (sync version, for calls finishing off the event loop)."""
+        query = """
+            INSERT INTO api_costs (
+                request_id, endpoint, model, input_tokens, output_tokens, 
+                cost_usd, cache_hit
+            )
+            VALUES (
+                %(request_id)s, %(endpoint)s, %(model)s, %(input_tokens)s, 
+                %(output_tokens)s, %(cost_usd)s, %(cache_hit)s
+            )
+        """
+        with self._get_cursor() as cur:
+            cur.execute(query, cost.model_dump())
+            self.conn.commit()
+
     async def get_daily_spend(self) -> float:
         """Calculate total spend in the last 24 hours."""
         query = """
@@ -14,7 +14,7 @@ from app.db.models import (
     AnswerFeedbackCreate,
     Citation,
 )
-from app.db.repositories.base import BaseRepository
+from app.db.repositories.base import BaseRepository, to_vector_literal
 
 
 class HistoryRepository(BaseRepository[AskHistory, AskHistoryCreate]):
@@ -39,7 +39,7 @@ class HistoryRepository(BaseRepository[AskHistory, AskHistoryCreate]):
         """
         embedding_value = None
         if history.question_embedding:
-            embedding_value = "[" + ",".join(map(str, history.question_embedding)) + "]"
+            embedding_value = to_vector_literal(history.question_embedding)
         
         # Convert citations to JSON
         citations_json = json.dumps([c.model_dump() for c in history.citations])
@@ -222,7 +222,7 @@ class HistoryRepository(BaseRepository[AskHistory, AskHistoryCreate]):
         Returns:
             Cached answer if found with high similarity
         """
-        embedding_str = "[" + ",".join(map(str, question_embedding)) + "]"
+        embedding_str = to_vector_literal(question_embedding)
         
         query = """
             SELECT *,
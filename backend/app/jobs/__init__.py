@@ -17,11 +17,14 @@ from app.jobs.cleanup_jobs import (
     cleanup_expired_chunks,
     cleanup_old_history,
     cleanup_rate_limit_violations,
+    cleanup_semantic_cache,
     run_all_cleanup_jobs,
 )
 from app.jobs.health_jobs import (
     check_source_health,
+    check_source_health_async,
     check_all_sources,
+    check_all_sources_async,
     get_health_summary,
 )
 
@@ -45,11 +48,14 @@ __all__ = [
     "cleanup_expired_chunks",
     "cleanup_old_history",
     "cleanup_rate_limit_violations",
+    "cleanup_semantic_cache",
     "run_all_cleanup_jobs",
     
     # Health jobs
     "check_source_health",
+    "check_source_health_async",
     "check_all_sources",
+    "check_all_sources_async",
     "get_health_summary",
 ]
 
@@ -179,6 +179,44 @@ def cleanup_rate_limit_violations(days_to_keep: int = 30) -> dict[str, Any]:
         return result
 
 
+def cleanup_semantic_cache() -> dict[str, Any]:
+    """
+    Delete semantic answer cache rows past the cache TTL.
+    
+    semantic_get already ignores them; this keeps the table from growing
+    without bound.
+    
+    Returns:
+        Stats dict with deleted_entries count
+    """
+    from app.services.cache import SEMANTIC_CACHE_TTL
+    
+    logger.info("Cleaning up expired semantic cache entries...")
+    
+    result = {
+        "deleted_entries": 0,
+        "ttl_seconds": SEMANTIC_CACHE_TTL,
+    }
+    
+    try:
+        with get_sync_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    DELETE FROM answer_cache_embeddings 
+                    WHERE created_at < NOW() - make_interval(secs => %s)
+                """, (SEMANTIC_CACHE_TTL,))
+                result["deleted_entries"] = cur.rowcount
+                conn.commit()
+        
+        logger.info(f"Deleted {result['deleted_entries']} expired semantic cache entries")
+        return result
+        
+    except Exception as e:
+        logger.error(f"Semantic cache cleanup failed: {e}")
+        result["error"] = str(e)
+        return result
+
+
 def run_all_cleanup_jobs() -> dict[str, Any]:
     """
     Run all cleanup jobs.
@@ -191,6 +229,7 @@ def run_all_cleanup_jobs() -> dict[str, Any]:
     results = {
         "chunks": cleanup_expired_chunks(),
         "history": cleanup_old_history(days_to_keep=90),
+        "semantic_cache": cleanup_semantic_cache(),
     }
     
     # Only run if table exists (migration may not have run)
@@ -2,14 +2,18 @@
 Health check jobs for monitoring source URLs.
 """
 
+import asyncio
 import hashlib
 import logging
+import time
+from dataclasses import asdict, dataclass
 from datetime import datetime, timezone
 from typing import Any
 
 import httpx
+from psycopg.rows import dict_row
 
-from app.db.connection import get_sync_connection
+from app.db.connection import close_async_pool, get_async_connection, get_sync_connection
 
 
 logger = logging.getLogger(__name__)
@@ -18,6 +22,42 @@ logger = logging.getLogger(__name__)
 # Request configuration
 REQUEST_TIMEOUT = 10.0  # seconds
 USER_AGENT = "The-Arbiter-HealthCheck/1.0"
+HASH_CHUNK_SIZE = 64 * 1024  # bytes fed to the hasher per update
+MAX_CONCURRENT_CHECKS = 64  # in-flight source checks per worker
+
+# Source row plus the validators recorded by its most recent health check
+_SOURCE_WITH_LAST_CHECK_SQL = """
+    SELECT
+        gs.id, gs.source_url, gs.file_hash,
+        sh.status AS prev_status,
+        sh.file_hash AS prev_file_hash,
+        sh.content_length AS prev_content_length,
+        sh.etag AS prev_etag,
+        sh.last_modified AS prev_last_modified
+    FROM game_sources gs
+    LEFT JOIN LATERAL (
+        SELECT status, file_hash, content_length, etag, last_modified
+        FROM source_health
+        WHERE source_id = gs.id
+        ORDER BY last_checked_at DESC
+        LIMIT 1
+    ) sh ON TRUE
+"""
+
+
+@dataclass(slots=True)
+class HealthCheckResult:
+    """Result of checking a single source."""
+    source_id: int
+    checked_at: str
+    status: str = "error"  # "ok", "changed", "unreachable", "error"
+    http_code: int | None = None
+    file_hash: str | None = None
+    content_length: int | None = None
+    etag: str | None = None
+    last_modified: str | None = None
+    error: str | None = None
+    hash_match: bool | None = None
 
 
 def compute_content_hash(content: bytes) -> str:
@@ -25,7 +65,177 @@ def compute_content_hash(content: bytes) -> str:
     return hashlib.sha256(content).hexdigest()
 
 
-def check_source_health(source_id: int) -> dict[str, Any]:
+async def stream_content_hash(client: httpx.AsyncClient, url: str) -> tuple[int, str | None]:
+    """
+    GET a URL and compute its SHA-256 while the body streams in.
+    
+    The body is fed to the hasher chunk by chunk, so hashing overlaps
+    the network reads and the full PDF is never buffered in memory.
+    
+    Returns:
+        Tuple of (http_status_code, hex_digest or None if not 200)
+    """
+    async with client.stream(
+        "GET",
+        url,
+        headers={"User-Agent": USER_AGENT},
+        follow_redirects=True,
+    ) as response:
+        if response.status_code != 200:
+            return response.status_code, None
+        
+        hasher = hashlib.sha256()
+        async for chunk in response.aiter_bytes(HASH_CHUNK_SIZE):
+            hasher.update(chunk)
+        return response.status_code, hasher.hexdigest()
+
+
+def _has_baseline(source: dict[str, Any]) -> bool:
+    """True if the previous health check was OK for the currently stored hash."""
+    return source.get("prev_status") == "ok" and source.get("prev_file_hash") == source["file_hash"]
+
+
+def _length_changed(source: dict[str, Any], result: HealthCheckResult) -> bool:
+    """
+    Check whether content-length alone proves the content changed.
+    
+    A different size means a different file, so the SHA-256 of the body
+    is not needed to detect the change.
+    """
+    if not _has_baseline(source):
+        return False
+    prev_length = source.get("prev_content_length")
+    return bool(result.content_length and prev_length) and result.content_length != prev_length
+
+
+def _validators_unchanged(source: dict[str, Any], result: HealthCheckResult) -> bool:
+    """
+    Check whether the HEAD validators prove the content is unchanged.
+    
+    True only if the previous check was OK for the currently stored hash
+    and the server returned content-length, ETag and Last-Modified that
+    all match what that check recorded.
+    """
+    if not _has_baseline(source):
+        return False
+    if not (result.content_length and result.etag and result.last_modified):
+        return False
+    return (
+        result.content_length == source.get("prev_content_length")
+        and result.etag == source.get("prev_etag")
+        and result.last_modified == source.get("prev_last_modified")
+    )
+
+
+async def _probe_source(
+    client: httpx.AsyncClient,
+    source: dict[str, Any],
+    result: HealthCheckResult,
+) -> None:
+    """Run the HTTP part of a health check, filling in result."""
+    source_id = source["id"]
+    source_url = source["source_url"]
+    stored_hash = source["file_hash"]
+    
+    try:
+        head_response = await client.head(
+            source_url,
+            headers={"User-Agent": USER_AGENT},
+            follow_redirects=True,
+        )
+        
+        result.http_code = head_response.status_code
+        result.content_length = int(head_response.headers.get("content-length", 0))
+        result.etag = head_response.headers.get("etag")
+        result.last_modified = head_response.headers.get("last-modified")
+        
+        if head_response.status_code == 200:
+            # Source is accessible
+            if stored_hash and _length_changed(source, result):
+                # Size differs from the last good check - changed, no hash needed
+                result.status = "changed"
+                result.hash_match = False
+                
+                logger.warning(
+                    f"Source {source_id} content changed: content-length "
+                    f"{source['prev_content_length']} -> {result.content_length}"
+                )
+            
+            elif stored_hash and _validators_unchanged(source, result):
+                # Validators match the last good check - skip the body fetch
+                result.status = "ok"
+                result.hash_match = True
+                result.file_hash = stored_hash
+            
+            # Do a full GET to compute hash for comparison
+            elif stored_hash:
+                get_status, new_hash = await stream_content_hash(client, source_url)
+                
+                if get_status == 200:
+                    result.file_hash = new_hash
+                    
+                    if new_hash != stored_hash:
+                        # Content has changed!
+                        result.status = "changed"
+                        result.hash_match = False
+                        
+                        logger.warning(
+                            f"Source {source_id} content changed: "
+                            f"old_hash={stored_hash[:8]}..., new_hash={new_hash[:8]}..."
+                        )
+                    else:
+                        # Content unchanged
+                        result.status = "ok"
+                        result.hash_match = True
+            else:
+                # No stored hash, just check accessibility
+                result.status = "ok"
+        
+        elif head_response.status_code in (301, 302, 303, 307, 308):
+            # Redirect (shouldn't happen with follow_redirects)
+            result.status = "ok"
+        
+        elif head_response.status_code in (403, 404, 410):
+            # Client errors - URL no longer accessible
+            result.status = "unreachable"
+            result.error = f"HTTP {head_response.status_code}"
+        
+        elif head_response.status_code >= 500:
+            # Server errors
+            result.status = "error"
+            result.error = f"Server error: HTTP {head_response.status_code}"
+        
+        else:
+            result.status = "error"
+            result.error = f"Unexpected status: HTTP {head_response.status_code}"
+    
+    except httpx.TimeoutException:
+        result.status = "error"
+        result.error = "Request timed out"
+    
+    except httpx.ConnectError as e:
+        result.status = "unreachable"
+        result.error = f"Connection failed: {str(e)[:100]}"
+    
+    except httpx.HTTPError as e:
+        result.status = "error"
+        result.error = f"HTTP error: {str(e)[:100]}"
+
+
+async def check_source_health_async(
+    source_id: int,
+    client: httpx.AsyncClient,
+    prefetched: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """Check a single source and return the result as a dict."""
+    return asdict(await _check_source(source_id, client, prefetched))
+
+
+async def _check_source(
+    source_id: int,
+    client: httpx.AsyncClient,
+    prefetched: dict[str, Any] | None = None,
+) -> HealthCheckResult:
     """
     Check health of a single source URL.
     
@@ -35,187 +245,125 @@ def check_source_health(source_id: int) -> dict[str, Any]:
     3. Update health status in database
     4. Set needs_reingest if content changed
     
+    The database connection is only held for the lookup and the final
+    write, never across the HTTP requests, so many checks can share a
+    small async pool.
+    
     Args:
         source_id: ID of the game_source to check
-        
+        client: Shared HTTP client
+        prefetched: Source row (as selected by _SOURCE_WITH_LAST_CHECK_SQL)
+            already loaded by the caller; skips the lookup query
+    
     Returns:
-        Dict with check results
+        HealthCheckResult for the source
     """
-    result = {
-        "source_id": source_id,
-        "status": "error",
-        "http_code": None,
-        "file_hash": None,
-        "content_length": None,
-        "etag": None,
-        "last_modified": None,
-        "error": None,
-        "hash_match": None,
-        "checked_at": datetime.now(timezone.utc).isoformat(),
-    }
+    result = HealthCheckResult(
+        source_id=source_id,
+        checked_at=datetime.now(timezone.utc).isoformat(),
+    )
     
     try:
-        with get_sync_connection() as conn:
-            with conn.cursor() as cur:
-                # Get source info
-                cur.execute("""
-                    SELECT id, source_url, file_hash
-                    FROM game_sources
-                    WHERE id = %s
-                """, (source_id,))
-                
-                source = cur.fetchone()
-                if not source:
-                    result["error"] = f"Source {source_id} not found"
-                    return result
-                
-                source_url = source["source_url"]
-                stored_hash = source["file_hash"]
-                
-                if not source_url:
-                    result["status"] = "error"
-                    result["error"] = "No source URL configured"
-                    _save_health_result(cur, source_id, result)
-                    conn.commit()
-                    return result
-                
-                # Perform HEAD request
-                try:
-                    with httpx.Client(timeout=REQUEST_TIMEOUT) as client:
-                        head_response = client.head(
-                            source_url,
-                            headers={"User-Agent": USER_AGENT},
-                            follow_redirects=True,
-                        )
-                        
-                        result["http_code"] = head_response.status_code
-                        result["content_length"] = int(head_response.headers.get("content-length", 0))
-                        result["etag"] = head_response.headers.get("etag")
-                        result["last_modified"] = head_response.headers.get("last-modified")
-                        
-                        if head_response.status_code == 200:
-                            # Source is accessible
-                            # Do a full GET to compute hash for comparison
-                            if stored_hash:
-                                get_response = client.get(
-                                    source_url,
-                                    headers={"User-Agent": USER_AGENT},
-                                    follow_redirects=True,
-                                )
-                                
-                                if get_response.status_code == 200:
-                                    new_hash = compute_content_hash(get_response.content)
-                                    result["file_hash"] = new_hash
-                                    
-                                    if new_hash != stored_hash:
-                                        # Content has changed!
-                                        result["status"] = "changed"
-                                        result["hash_match"] = False
-                                        
-                                        # Mark for re-ingestion
-                                        cur.execute("""
-                                            UPDATE game_sources
-                                            SET needs_reingest = TRUE,
-                                                last_health_check = NOW(),
-                                                updated_at = NOW()
-                                            WHERE id = %s
-                                        """, (source_id,))
-                                        
-                                        logger.warning(
-                                            f"Source {source_id} content changed: "
-                                            f"old_hash={stored_hash[:8]}..., new_hash={new_hash[:8]}..."
-                                        )
-                                    else:
-                                        # Content unchanged
-                                        result["status"] = "ok"
-                                        result["hash_match"] = True
-                                        
-                                        cur.execute("""
-                                            UPDATE game_sources
-                                            SET last_health_check = NOW()
-                                            WHERE id = %s
-                                        """, (source_id,))
-                            else:
-                                # No stored hash, just check accessibility
-                                result["status"] = "ok"
-                                
-                                cur.execute("""
-                                    UPDATE game_sources
-                                    SET last_health_check = NOW()
-                                    WHERE id = %s
-                                """, (source_id,))
-                        
-                        elif head_response.status_code in (301, 302, 303, 307, 308):
-                            # Redirect (shouldn't happen with follow_redirects)
-                            result["status"] = "ok"
-                        
-                        elif head_response.status_code in (403, 404, 410):
-                            # Client errors - URL no longer accessible
-                            result["status"] = "unreachable"
-                            result["error"] = f"HTTP {head_response.status_code}"
-                        
-                        elif head_response.status_code >= 500:
-                            # Server errors
-                            result["status"] = "error"
-                            result["error"] = f"Server error: HTTP {head_response.status_code}"
-                        
-                        else:
-                            result["status"] = "error"
-                            result["error"] = f"Unexpected status: HTTP {head_response.status_code}"
-                
-                except httpx.TimeoutException:
-                    result["status"] = "error"
-                    result["error"] = "Request timed out"
-                
-                except httpx.ConnectError as e:
-                    result["status"] = "unreachable"
-                    result["error"] = f"Connection failed: {str(e)[:100]}"
-                
-                except httpx.HTTPError as e:
-                    result["status"] = "error"
-                    result["error"] = f"HTTP error: {str(e)[:100]}"
+        source = prefetched
+        if source is None:
+            async with get_async_connection() as conn:
+                async with conn.cursor(row_factory=dict_row) as cur:
+                    # Get source info
+                    await cur.execute(
+                        _SOURCE_WITH_LAST_CHECK_SQL + "WHERE gs.id = %s",
+                        (source_id,),
+                    )
+                    source = await cur.fetchone()
+        
+        if not source:
+            result.error = f"Source {source_id} not found"
+            return result
+        
+        if not source["source_url"]:
+            result.status = "error"
+            result.error = "No source URL configured"
+        else:
+            await _probe_source(client, source, result)
+        
+        async with get_async_connection() as conn:
+            async with conn.cursor() as cur:
+                # Changed content is marked for re-ingestion; reachable
+                # sources get their last_health_check bumped
+                needs_reingest = result.status == "changed"
+                touch_check = needs_reingest or (
+                    result.status == "ok" and result.http_code == 200
+                )
                 
                 # Save health check result
-                _save_health_result(cur, source_id, result)
-                conn.commit()
+                await _save_health_result(cur, source_id, result, needs_reingest, touch_check)
+            await conn.commit()
     
     except Exception as e:
         logger.error(f"Health check failed for source {source_id}: {e}")
-        result["status"] = "error"
-        result["error"] = str(e)[:200]
+        result.status = "error"
+        result.error = str(e)[:200]
     
     return result
 
 
-def _save_health_result(cur, source_id: int, result: dict) -> None:
-    """Save health check result to database."""
-    cur.execute("""
-        INSERT INTO source_health (
-            source_id, last_checked_at, status, http_code,
-            file_hash, content_length, etag, last_modified, error
-        ) VALUES (
-            %s, NOW(), %s, %s, %s, %s, %s, %s, %s
+async def _save_health_result(
+    cur,
+    source_id: int,
+    result: HealthCheckResult,
+    needs_reingest: bool = False,
+    touch_check: bool = False,
+) -> None:
+    """
+    Save health check result to database.
+    
+    Inserts the source_health row and updates game_sources in a single
+    statement (one round trip). The game_sources row is only written
+    when needs_reingest or touch_check is set.
+    """
+    await cur.execute("""
+        WITH ins AS (
+            INSERT INTO source_health (
+                source_id, last_checked_at, status, http_code,
+                file_hash, content_length, etag, last_modified, error
+            ) VALUES (
+                %s, NOW(), %s, %s, %s, %s, %s, %s, %s
+            )
+            RETURNING source_id
         )
+        UPDATE game_sources gs
+        SET needs_reingest = CASE WHEN %s THEN TRUE ELSE gs.needs_reingest END,
+            last_health_check = NOW(),
+            updated_at = CASE WHEN %s THEN NOW() ELSE gs.updated_at END
+        FROM ins
+        WHERE gs.id = ins.source_id
+        AND %s
     """, (
         source_id,
-        result["status"],
-        result["http_code"],
-        result["file_hash"],
-        result["content_length"],
-        result["etag"],
-        result["last_modified"],
-        result["error"],
+        result.status,
+        result.http_code,
+        result.file_hash,
+        result.content_length,
+        result.etag,
+        result.last_modified,
+        result.error,
+        needs_reingest,
+        needs_reingest,
+        touch_check,
     ))
 
 
-def check_all_sources() -> dict[str, Any]:
+async def check_all_sources_async() -> dict[str, Any]:
     """
-    Check health of all game sources.
+    Check health of all game sources concurrently.
+    
+    All checks share one HTTP client; a semaphore bounds the number of
+    in-flight checks to MAX_CONCURRENT_CHECKS.
     
     Returns:
         Summary statistics
     """
-    start_time = datetime.now(timezone.utc)
+    start_ns = time.monotonic_ns()
+    started_at = datetime.now(timezone.utc).isoformat()
     logger.info("Starting health check for all sources...")
     
     result = {
@@ -225,47 +373,56 @@ def check_all_sources() -> dict[str, Any]:
         "unreachable": 0,
         "error": 0,
         "source_results": [],
-        "started_at": start_time.isoformat(),
+        "started_at": started_at,
         "completed_at": None,
         "duration_ms": 0,
     }
     
     try:
-        with get_sync_connection() as conn:
-            with conn.cursor() as cur:
+        async with get_async_connection() as conn:
+            async with conn.cursor(row_factory=dict_row) as cur:
                 # Get all sources with URLs
-                cur.execute("""
-                    SELECT id, source_url
-                    FROM game_sources
-                    WHERE source_url IS NOT NULL
-                    ORDER BY id
-                """)
-                
-                sources = cur.fetchall()
-                result["total"] = len(sources)
-                
-                logger.info(f"Checking {len(sources)} sources...")
-                
-                for source in sources:
-                    source_id = source["id"]
-                    check_result = check_source_health(source_id)
-                    
-                    status = check_result["status"]
-                    result[status] = result.get(status, 0) + 1
-                    
-                    result["source_results"].append({
-                        "source_id": source_id,
-                        "status": status,
-                        "http_code": check_result["http_code"],
-                    })
+                await cur.execute(
+                    _SOURCE_WITH_LAST_CHECK_SQL
+                    + "WHERE gs.source_url IS NOT NULL ORDER BY gs.id"
+                )
+                sources = await cur.fetchall()
+        
+        result["total"] = len(sources)
+        logger.info(f"Checking {len(sources)} sources...")
+        
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_CHECKS)
+        
+        async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
+            async def check_one(source: dict[str, Any]) -> HealthCheckResult:
+                async with semaphore:
+                    return await _check_source(source["id"], client, prefetched=source)
+            
+            check_results = await asyncio.gather(
+                *[check_one(source) for source in sources],
+                return_exceptions=True,
+            )
+        
+        for source, check_result in zip(sources, check_results):
+            if isinstance(check_result, BaseException):
+                logger.error(f"Health check failed for source {source['id']}: {check_result}")
+                check_result = HealthCheckResult(source_id=source["id"], checked_at=started_at)
+            
+            status = check_result.status
+            result[status] = result.get(status, 0) + 1
+            
+            result["source_results"].append({
+                "source_id": source["id"],
+                "status": status,
+                "http_code": check_result.http_code,
+            })
     
     except Exception as e:
         logger.error(f"Health check failed: {e}")
         result["error_message"] = str(e)
     
-    end_time = datetime.now(timezone.utc)
-    result["completed_at"] = end_time.isoformat()
-    result["duration_ms"] = int((end_time - start_time).total_seconds() * 1000)
+    result["duration_ms"] = (time.monotonic_ns() - start_ns) // 1_000_000
+    result["completed_at"] = datetime.now(timezone.utc).isoformat()
     result["problems"] = result["changed"] + result["unreachable"] + result["error"]
     
     logger.info(
@@ -276,6 +433,28 @@ def check_all_sources() -> dict[str, Any]:
     return result
 
 
+async def _run_job(coro):
+    """Run a coroutine as an RQ job, closing the job-local async pool afterwards."""
+    try:
+        return await coro
+    finally:
+        await close_async_pool()
+
+
+def check_source_health(source_id: int) -> dict[str, Any]:
+    """Sync entrypoint for RQ: check a single source."""
+    async def run():
+        async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
+            return await check_source_health_async(source_id, client)
+    
+    return asyncio.run(_run_job(run()))
+
+
+def check_all_sources() -> dict[str, Any]:
+    """Sync entrypoint for RQ: check all sources."""
+    return asyncio.run(_run_job(check_all_sources_async()))
+
+
 def get_health_summary() -> dict[str, Any]:
     """
     Get summary of latest health status for all sources.
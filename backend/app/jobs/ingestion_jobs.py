@@ -4,30 +4,73 @@ Ingestion background jobs for processing rulebook PDFs.
 
 import logging
 import time
+from operator import itemgetter
 from typing import Any
 
-from app.jobs.queue import set_job_status
+from app.jobs.queue import job_status_pipeline, set_job_status
 from app.services.ingestion import (
+    CHUNK_TTL,
+    PRECEDENCE_MAP,
     download_pdf,
-    extract_text_from_pdf,
+    extract_text_and_count,
     detect_needs_ocr,
-    compute_file_hash,
     ingest_source,
 )
-from app.services.chunker import chunk_document
-from app.services.embeddings import batch_create_embeddings
+from app.services.chunker import Chunk, iter_document_chunks
+from app.services.embeddings import parallel_create_embeddings
 from app.db.connection import get_sync_connection
 from app.db.repositories.sources import SourcesRepository
-from app.db.repositories.chunks import ChunksRepository
+from app.db.repositories.chunks import COPY_THRESHOLD, ChunksRepository
 from app.db.models import RuleChunkCreate
 from rq import get_current_job
+from rq.timeouts import JobTimeoutException
 
-import fitz
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 
 
 logger = logging.getLogger(__name__)
 
+def _mark_needs_ocr(conn, source_id: int) -> None:
+    """
+    Flag the source as needing OCR.
+    
+    file_hash is left alone: it is only written by the final save, once
+    the chunks for that content are committed, so the unchanged-content
+    check never trusts a hash whose chunks were not stored.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            "UPDATE game_sources SET needs_ocr = TRUE, updated_at = NOW() WHERE id = %s",
+            (source_id,)
+        )
+    conn.commit()
+
+
+def on_ingestion_failure(job, connection, exc_type, exc_value, traceback):
+    """
+    RQ failure callback for ingestion jobs.
+    
+    Once the job has no retries left, clear the source's needs_reingest
+    flag so the scheduler doesn't immediately pick it up again and start
+    a storm of failing re-runs. Manual or forced ingestion still works.
+    """
+    if job.retries_left:
+        return
+    
+    source_id = job.args[0]
+    set_job_status(job.id, "failed", 0, f"Job failed: {exc_value}", error=str(exc_value))
+    
+    try:
+        with get_sync_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE game_sources SET needs_reingest = FALSE, updated_at = NOW() WHERE id = %s",
+                    (source_id,)
+                )
+            conn.commit()
+    except Exception as e:
+        logger.error(f"Failed to clear needs_reingest for source {source_id}: {e}")
+
 
 def get_job_id() -> str | None:
     """Get current RQ job ID."""
@@ -45,20 +88,23 @@ def ingest_source_job(source_id: int, force: bool = False) -> dict[str, Any]:
     Args:
         source_id: ID of the source to ingest
         force: If True, re-ingest even if already done
-        
+    
     Returns:
         Ingestion result dict
     """
     job_id = get_job_id() or f"manual-{source_id}"
-    start_time = time.time()
+    start_ns = time.monotonic_ns()
     
     try:
-        # Stage 1: Fetch source info (5%)
-        set_job_status(job_id, "downloading", 5, "Fetching source information...")
-        
         with get_sync_connection() as conn:
+            # Stage 1: Fetch source info (5%)
+            set_job_status(job_id, "downloading", 5, "Fetching source information...")
+            
             sources_repo = SourcesRepository(conn)
             source = sources_repo.get_source_sync(source_id)
+            # Close the read transaction so the connection isn't left
+            # idle in transaction during the download/OCR/embed stages
+            conn.commit()
             
             if not source:
                 set_job_status(job_id, "failed", 0, "Source not found", error="Source not found")
@@ -71,162 +117,161 @@ def ingest_source_job(source_id: int, force: bool = False) -> dict[str, Any]:
             if not source.source_url:
                 set_job_status(job_id, "failed", 0, "No URL configured", error="Source has no URL")
                 return {"status": "error", "error": "Source has no URL"}
-        
-        # Stage 2: Download PDF (10-30%)
-        set_job_status(job_id, "downloading", 10, f"Downloading PDF from {source.source_url[:50]}...")
-        
-        try:
-            pdf_bytes = download_pdf(source.source_url)
-            file_hash = compute_file_hash(pdf_bytes)
-        except Exception as e:
-            set_job_status(job_id, "failed", 15, f"Download failed: {e}", error=str(e))
-            return {"status": "error", "error": f"Download failed: {e}"}
-        
-        set_job_status(job_id, "downloading", 30, f"Downloaded {len(pdf_bytes):,} bytes")
-        
-        # Stage 3: Extract text (30-50%)
-        set_job_status(job_id, "extracting", 35, "Extracting text from PDF...")
-        
-        try:
-            with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
-                total_page_count = len(doc)
             
-            pages = extract_text_from_pdf(pdf_bytes)
-            total_chars = sum(len(text) for _, text in pages)
-        except Exception as e:
-            set_job_status(job_id, "failed", 40, f"Extraction failed: {e}", error=str(e))
-            return {"status": "error", "error": f"Extraction failed: {e}"}
-        
-        set_job_status(job_id, "extracting", 50, f"Extracted {total_chars:,} chars from {len(pages)} pages")
-        
-        # Check if needs OCR
-        if detect_needs_ocr(pages, total_page_count):
-            logger.info(f"PDF needs OCR - attempting Google Cloud Vision...")
-            set_job_status(job_id, "ocr", 52, "Scanned PDF detected - starting cloud OCR...")
+            # Stage 2: Download PDF (10-30%)
+            set_job_status(job_id, "downloading", 10, f"Downloading PDF from {source.source_url[:50]}...")
             
             try:
-                from app.services.ocr_cloud import is_cloud_vision_available, ocr_pdf_with_vision
+                pdf_bytes, file_hash = download_pdf(source.source_url)
+            except Exception as e:
+                set_job_status(job_id, "failed", 15, f"Download failed: {e}", error=str(e))
+                return {"status": "error", "error": f"Download failed: {e}"}
+            
+            # Unchanged content: skip extract/OCR/embed/save entirely. The
+            # stored hash is only written once that content's chunks are
+            # saved, and a pending OCR retry always re-runs.
+            if (
+                not force
+                and file_hash == source.file_hash
+                and source.last_ingested_at
+                and not source.needs_ocr
+            ):
+                with conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        UPDATE game_sources 
+                        SET needs_reingest = FALSE, last_ingested_at = NOW(), updated_at = NOW()
+                        WHERE id = %s
+                        """,
+                        (source_id,)
+                    )
+                    conn.commit()
                 
-                if is_cloud_vision_available():
-                    # Use Google Cloud Vision (production solution)
-                    def ocr_progress(page, total, chars):
-                        pct = 52 + int(28 * page / total)  # 52-80%
-                        set_job_status(job_id, "ocr", pct, f"OCR page {page}/{total} ({chars:,} chars)...")
-                    
-                    set_job_status(job_id, "ocr", 55, f"Running Google Cloud Vision on {total_page_count} pages...")
-                    pages = ocr_pdf_with_vision(pdf_bytes, progress_callback=ocr_progress)
-                    total_chars = sum(len(text) for _, text in pages)
+                result = {"status": "unchanged", "source_id": source_id, "file_hash": file_hash}
+                set_job_status(job_id, "ready", 100, "Content unchanged - skipped re-ingestion", result=result)
+                logger.info(f"Ingestion job {job_id}: source {source_id} unchanged (hash match)")
+                return result
+            
+            # Stage 3: Extract text (30-50%)
+            # Stage boundaries write back-to-back, so send them in one round trip
+            with job_status_pipeline() as pipe:
+                set_job_status(job_id, "downloading", 30, f"Downloaded {len(pdf_bytes):,} bytes", pipe=pipe)
+                set_job_status(job_id, "extracting", 35, "Extracting text from PDF...", pipe=pipe)
+            
+            try:
+                pages, total_page_count, total_chars = extract_text_and_count(pdf_bytes)
+            except Exception as e:
+                set_job_status(job_id, "failed", 40, f"Extraction failed: {e}", error=str(e))
+                return {"status": "error", "error": f"Extraction failed: {e}"}
+            
+            set_job_status(job_id, "extracting", 50, f"Extracted {total_chars:,} chars from {len(pages)} pages")
+            
+            # Check if needs OCR
+            if detect_needs_ocr(pages, total_page_count, total_chars):
+                logger.info(f"PDF needs OCR - attempting Google Cloud Vision...")
+                set_job_status(job_id, "ocr", 52, "Scanned PDF detected - starting cloud OCR...")
+                
+                try:
+                    from app.services.ocr_cloud import is_cloud_vision_available, ocr_pdf_with_vision
                     
-                    if pages and total_chars > 100:
-                        logger.info(f"Cloud Vision OCR successful: {len(pages)} pages, {total_chars} chars")
-                        set_job_status(job_id, "ocr", 80, f"OCR complete: {total_chars:,} chars from {len(pages)} pages")
+                    if is_cloud_vision_available():
+                        # Use Google Cloud Vision (production solution)
+                        def ocr_progress(page, total, chars):
+                            pct = 52 + int(28 * page / total)  # 52-80%
+                            set_job_status(job_id, "ocr", pct, f"OCR page {page}/{total} ({chars:,} chars)...")
                         
-                        # Mark as no longer needing OCR
-                        with get_sync_connection() as conn:
-                            with conn.cursor() as cur:
-                                cur.execute(
-                                    "UPDATE game_sources SET needs_ocr = FALSE, file_hash = %s, updated_at = NOW() WHERE id = %s",
-                                    (file_hash, source_id)
-                                )
-                                conn.commit()
+                        set_job_status(job_id, "ocr", 55, f"Running Google Cloud Vision on {total_page_count} pages...")
+                        pages = ocr_pdf_with_vision(pdf_bytes, progress_callback=ocr_progress)
+                        total_chars = sum(map(len, map(itemgetter(1), pages)))
+                        
+                        if pages and total_chars > 100:
+                            logger.info(f"Cloud Vision OCR successful: {len(pages)} pages, {total_chars} chars")
+                            set_job_status(job_id, "ocr", 80, f"OCR complete: {total_chars:,} chars from {len(pages)} pages")
+                        else:
+                            logger.error(f"Cloud Vision extracted only {total_chars} chars")
+                            set_job_status(job_id, "failed", 60, "OCR extracted insufficient text", error="OCR failed")
+                            return {"status": "ocr_failed", "error": "No text extracted"}
                     else:
-                        logger.error(f"Cloud Vision extracted only {total_chars} chars")
-                        set_job_status(job_id, "failed", 60, "OCR extracted insufficient text", error="OCR failed")
-                        return {"status": "ocr_failed", "error": "No text extracted"}
-                else:
-                    # Cloud Vision not configured - mark for later
-                    logger.warning("Cloud Vision not available - credentials not configured")
-                    set_job_status(job_id, "failed", 55, 
-                        "Scanned PDF requires OCR. Configure GOOGLE_APPLICATION_CREDENTIALS_JSON to enable.",
-                        error="Cloud OCR not configured")
-                    
-                    with get_sync_connection() as conn:
-                        with conn.cursor() as cur:
-                            cur.execute(
-                                "UPDATE game_sources SET needs_ocr = TRUE, file_hash = %s, updated_at = NOW() WHERE id = %s",
-                                (file_hash, source_id)
-                            )
-                            conn.commit()
+                        # Cloud Vision not configured - mark for later
+                        logger.warning("Cloud Vision not available - credentials not configured")
+                        set_job_status(job_id, "failed", 55, 
+                            "Scanned PDF requires OCR. Configure GOOGLE_APPLICATION_CREDENTIALS_JSON to enable.",
+                            error="Cloud OCR not configured")
+                        
+                        _mark_needs_ocr(conn, source_id)
+                        
+                        return {"status": "needs_ocr", "error": "Cloud OCR not configured"}
+                
+                except Exception as e:
+                    logger.error(f"Cloud Vision OCR failed: {e}")
+                    set_job_status(job_id, "failed", 55, f"OCR failed: {e}", error=str(e))
                     
-                    return {"status": "needs_ocr", "error": "Cloud OCR not configured"}
+                    # Clear any aborted transaction before reusing the connection
+                    conn.rollback()
+                    _mark_needs_ocr(conn, source_id)
                     
-            except Exception as e:
-                logger.error(f"Cloud Vision OCR failed: {e}")
-                set_job_status(job_id, "failed", 55, f"OCR failed: {e}", error=str(e))
-                
-                with get_sync_connection() as conn:
-                    with conn.cursor() as cur:
-                        cur.execute(
-                            "UPDATE game_sources SET needs_ocr = TRUE, file_hash = %s, updated_at = NOW() WHERE id = %s",
-                            (file_hash, source_id)
-                        )
-                        conn.commit()
-                
-                return {"status": "ocr_failed", "error": str(e)}
-        
-        # Stage 4: Chunking (50-60%)
-        set_job_status(job_id, "chunking", 55, "Splitting text into chunks...")
-        
-        chunks = chunk_document(pages, max_tokens=400, overlap=0.5)
-        
-        set_job_status(job_id, "chunking", 60, f"Created {len(chunks)} chunks")
-        
-        # Stage 5: Embedding (60-90%)
-        set_job_status(job_id, "embedding", 65, f"Generating embeddings for {len(chunks)} chunks...")
-        
-        chunk_texts = [c.chunk_text for c in chunks]
-        
-        try:
-            # Update progress during embedding
-            batch_size = 100
-            embeddings = []
+                    return {"status": "ocr_failed", "error": str(e)}
             
-            for i in range(0, len(chunk_texts), batch_size):
-                batch = chunk_texts[i:i + batch_size]
-                batch_embeddings = batch_create_embeddings(batch)
-                embeddings.extend(batch_embeddings)
-                
+            # Stages 4-5: Chunking and embedding (55-90%)
+            # Chunks are fed to the embedder as they're produced, so the
+            # first batches are in flight while later pages are chunked
+            set_job_status(job_id, "embedding", 60, "Chunking text and generating embeddings...")
+            
+            chunk_iter = iter_document_chunks(pages, max_tokens=400, overlap=0.5)
+            chunks: list[Chunk] = []
+            
+            def chunk_texts():
+                for chunk in chunk_iter:
+                    chunks.append(chunk)
+                    yield chunk.chunk_text
+            
+            def embedding_progress(completed, total):
                 # Update progress (65% to 85%)
-                progress = 65 + int(20 * (i + len(batch)) / len(chunk_texts))
+                progress = 65 + int(20 * completed / total)
                 set_job_status(job_id, "embedding", progress, 
-                              f"Generated embeddings: {len(embeddings)}/{len(chunks)}")
-        except Exception as e:
-            logger.warning(f"Embedding failed: {e}")
-            embeddings = [None] * len(chunks)
-            set_job_status(job_id, "embedding", 85, "Embeddings failed - continuing without them")
-        
-        # Stage 6: Saving to database (90-100%)
-        set_job_status(job_id, "saving", 90, "Saving chunks to database...")
-        
-        # Determine precedence
-        precedence_map = {
-            "rulebook": 1, "expansion": 2, "faq": 3, "errata": 3, "reference_card": 1,
-        }
-        precedence = precedence_map.get(source.source_type, 1)
-        expires_at = datetime.now(timezone.utc) + timedelta(days=30)
-        
-        with get_sync_connection() as conn:
+                              f"Generated embeddings: {completed}/{total}")
+            
+            try:
+                embeddings = parallel_create_embeddings(chunk_texts(), progress_callback=embedding_progress)
+            except Exception as e:
+                logger.warning(f"Embedding failed: {e}")
+                # Finish chunking whatever the embedder hadn't consumed
+                chunks.extend(chunk_iter)
+                embeddings = [None] * len(chunks)
+                set_job_status(job_id, "embedding", 85, "Embeddings failed - continuing without them")
+            
+            # Stage 6: Saving to database (90-100%)
+            set_job_status(job_id, "saving", 90, "Saving chunks to database...")
+            
+            # Determine precedence
+            precedence = PRECEDENCE_MAP.get(source.source_type, 1)
+            expires_at = datetime.now(timezone.utc) + CHUNK_TTL
+            
             chunks_repo = ChunksRepository(conn)
             
             # Delete existing chunks
             deleted = chunks_repo.delete_chunks_by_source_sync(source_id)
             
             # Insert new chunks
-            for i, chunk in enumerate(chunks):
-                embedding = embeddings[i] if i < len(embeddings) else None
-                
-                chunk_create = RuleChunkCreate(
+            chunk_creates = [
+                RuleChunkCreate(
                     source_id=source_id,
                     page_number=chunk.page_number,
                     chunk_index=chunk.chunk_index,
                     chunk_text=chunk.chunk_text,
-                    embedding=embedding,
+                    embedding=embeddings[i] if i < len(embeddings) else None,
                     precedence_level=precedence,
                     expires_at=expires_at,
                 )
-                chunks_repo.create_chunk_sync(chunk_create)
+                for i, chunk in enumerate(chunks)
+            ]
+            if len(chunk_creates) >= COPY_THRESHOLD:
+                chunks_repo.copy_chunks_sync(chunk_creates)
+            else:
+                chunks_repo.bulk_insert_chunks_sync(chunk_creates)
             
-            # Update source record
+            # Update source record; file_hash (and needs_ocr = FALSE after a
+            # successful OCR) are only recorded once the chunks are in
             with conn.cursor() as cur:
                 cur.execute(
                     """
@@ -238,27 +283,30 @@ def ingest_source_job(source_id: int, force: bool = False) -> dict[str, Any]:
                     (file_hash, source_id)
                 )
                 conn.commit()
-        
-        duration_ms = int((time.time() - start_time) * 1000)
-        
-        result = {
-            "status": "success",
-            "source_id": source_id,
-            "chunks_created": len(chunks),
-            "chunks_deleted": deleted,
-            "file_hash": file_hash,
-            "duration_ms": duration_ms,
-            "pages_processed": len(pages),
-            "total_chars": total_chars,
-        }
-        
-        set_job_status(job_id, "ready", 100, 
-                      f"Ingestion complete: {len(chunks)} chunks in {duration_ms}ms",
-                      result=result)
-        
-        logger.info(f"Ingestion job {job_id} completed: {len(chunks)} chunks")
-        return result
-        
+            
+            duration_ms = (time.monotonic_ns() - start_ns) // 1_000_000
+            
+            result = {
+                "status": "success",
+                "source_id": source_id,
+                "chunks_created": len(chunks),
+                "chunks_deleted": deleted,
+                "file_hash": file_hash,
+                "duration_ms": duration_ms,
+                "pages_processed": len(pages),
+                "total_chars": total_chars,
+            }
+            
+            set_job_status(job_id, "ready", 100, 
+                          f"Ingestion complete: {len(chunks)} chunks in {duration_ms}ms",
+                          result=result)
+            
+            logger.info(f"Ingestion job {job_id} completed: {len(chunks)} chunks")
+            return result
+    
+    except JobTimeoutException:
+        # Let RQ see the timeout so the retry policy and failure callback apply
+        raise
     except Exception as e:
         logger.exception(f"Ingestion job {job_id} failed")
         set_job_status(job_id, "failed", 0, f"Job failed: {e}", error=str(e))
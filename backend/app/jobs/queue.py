@@ -2,13 +2,16 @@
 Queue management for background jobs using Redis and RQ.
 """
 
-import json
 import logging
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from typing import Any
 
+import orjson
 import redis
-from rq import Queue
+from rq import Queue, Retry
 from rq.job import Job
 
 from app.config import get_settings
@@ -19,6 +22,7 @@ logger = logging.getLogger(__name__)
 # Connection pool for Redis
 _redis_pool: redis.ConnectionPool | None = None
 _redis_client: redis.Redis | None = None
+_queues: dict[str, Queue] = {}
 
 
 def get_redis_url() -> str:
@@ -44,6 +48,7 @@ def close_redis_connection():
     """Close Redis connection pool."""
     global _redis_pool, _redis_client
     
+    _queues.clear()
     if _redis_client:
         _redis_client.close()
         _redis_client = None
@@ -54,9 +59,11 @@ def close_redis_connection():
 
 
 def get_queue(name: str = "default") -> Queue:
-    """Get RQ queue."""
-    conn = get_redis_connection()
-    return Queue(name, connection=conn)
+    """Get RQ queue (created once per name and reused)."""
+    queue = _queues.get(name)
+    if queue is None:
+        queue = _queues[name] = Queue(name, connection=get_redis_connection())
+    return queue
 
 
 # ============================================================================
@@ -65,6 +72,18 @@ def get_queue(name: str = "default") -> Queue:
 
 JOB_STATUS_TTL = 3600  # 1 hour TTL for job status in Redis
 
+# Progress updates within a state are coalesced: a write is skipped unless
+# this long has passed or pct moved this far since the last one sent
+STATUS_MIN_INTERVAL = 0.25  # seconds
+STATUS_MIN_PCT_DELTA = 5
+
+# Always written and never tracked: the enqueue-time status (set once, by the
+# API process) and the states that end a job
+UNTHROTTLED_STATES = frozenset({"queued", "ready", "failed"})
+
+# job_id -> (monotonic time, state, pct) of the last status written
+_last_status_push: dict[str, tuple[float, str, int]] = {}
+
 
 def get_job_status_key(job_id: str) -> str:
     """Get Redis key for job status."""
@@ -78,6 +97,7 @@ def set_job_status(
     message: str = "",
     result: dict[str, Any] | None = None,
     error: str | None = None,
+    pipe: redis.client.Pipeline | None = None,
 ):
     """
     Set job status in Redis.
@@ -89,8 +109,25 @@ def set_job_status(
         message: Human-readable status message
         result: Job result data (when complete)
         error: Error message (if failed)
+        pipe: Optional pipeline from job_status_pipeline(); the write is
+            queued on it instead of being sent immediately
     """
-    conn = get_redis_connection()
+    now = time.monotonic()
+    
+    if state in UNTHROTTLED_STATES:
+        _last_status_push.pop(job_id, None)
+    else:
+        last = _last_status_push.get(job_id)
+        if (
+            last is not None
+            and last[1] == state
+            and now - last[0] < STATUS_MIN_INTERVAL
+            and abs(pct - last[2]) < STATUS_MIN_PCT_DELTA
+        ):
+            return
+        _last_status_push[job_id] = (now, state, pct)
+    
+    conn = pipe if pipe is not None else get_redis_connection()
     key = get_job_status_key(job_id)
     
     status = {
@@ -98,7 +135,7 @@ def set_job_status(
         "state": state,
         "pct": pct,
         "message": message,
-        "updated_at": datetime.now(timezone.utc).isoformat(),
+        "updated_at": datetime.now(timezone.utc),  # orjson emits RFC 3339
     }
     
     if result:
@@ -106,10 +143,23 @@ def set_job_status(
     if error:
         status["error"] = error
     
-    conn.setex(key, JOB_STATUS_TTL, json.dumps(status))
+    conn.setex(key, JOB_STATUS_TTL, orjson.dumps(status))
     logger.debug(f"Job {job_id}: {state} ({pct}%) - {message}")
 
 
+@contextmanager
+def job_status_pipeline() -> Iterator[redis.client.Pipeline]:
+    """
+    Batch several job status writes into a single Redis round trip.
+    
+    Pass the yielded pipeline to set_job_status(pipe=...); the queued
+    writes are sent together when the block exits.
+    """
+    with get_redis_connection().pipeline(transaction=False) as pipe:
+        yield pipe
+        pipe.execute()
+
+
 def get_job_status(job_id: str) -> dict[str, Any]:
     """
     Get job status from Redis.
@@ -125,7 +175,7 @@ def get_job_status(job_id: str) -> dict[str, Any]:
     
     data = conn.get(key)
     if data:
-        return json.loads(data)
+        return orjson.loads(data)
     
     # Try to get status from RQ job itself
     try:
@@ -175,6 +225,50 @@ def get_job_status(job_id: str) -> dict[str, Any]:
 # Ingestion Queue
 # ============================================================================
 
+INGESTION_JOB_TIMEOUT = 300  # 5 minute floor
+INGESTION_SECONDS_PER_PAGE = 3  # budget per page of the last ingested copy
+INGESTION_TIMEOUT_OVERHEAD = 60  # download, chunk and save
+
+# Retry jobs that die (e.g. worker killed) after a short and a longer pause
+INGESTION_RETRY = Retry(max=2, interval=[30, 120])
+
+
+def ingestion_timeout(page_count: int | None) -> int:
+    """Job timeout for a source with the given page count (None if unknown)."""
+    if not page_count:
+        return INGESTION_JOB_TIMEOUT
+    return max(INGESTION_JOB_TIMEOUT, INGESTION_SECONDS_PER_PAGE * page_count + INGESTION_TIMEOUT_OVERHEAD)
+
+
+def _ingestion_timeouts(source_ids: list[int]) -> dict[int, int]:
+    """
+    Job timeouts for sources, scaled by their last known page counts.
+    
+    Page counts come from previously ingested chunks; sources never
+    ingested (or a failed lookup) get the default timeout.
+    """
+    from app.db.connection import get_sync_connection
+    
+    page_counts: dict[int, int] = {}
+    try:
+        with get_sync_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT source_id, MAX(page_number)
+                    FROM rule_chunks
+                    WHERE source_id = ANY(%s)
+                    GROUP BY source_id
+                    """,
+                    (source_ids,)
+                )
+                page_counts = dict(cur.fetchall())
+    except Exception as e:
+        logger.warning(f"Could not look up page counts for job timeouts: {e}")
+    
+    return {source_id: ingestion_timeout(page_counts.get(source_id)) for source_id in source_ids}
+
+
 def enqueue_ingestion(source_id: int, force: bool = False) -> str:
     """
     Enqueue a source ingestion job.
@@ -186,7 +280,7 @@ def enqueue_ingestion(source_id: int, force: bool = False) -> str:
     Returns:
         Job ID string
     """
-    from app.jobs.ingestion_jobs import ingest_source_job
+    from app.jobs.ingestion_jobs import ingest_source_job, on_ingestion_failure
     
     queue = get_queue("default")
     
@@ -194,8 +288,10 @@ def enqueue_ingestion(source_id: int, force: bool = False) -> str:
         ingest_source_job,
         source_id,
         force,
-        job_timeout=300,  # 5 minute timeout
+        job_timeout=_ingestion_timeouts([source_id])[source_id],
         result_ttl=JOB_STATUS_TTL,
+        retry=INGESTION_RETRY,
+        on_failure=on_ingestion_failure,
     )
     
     # Set initial status
@@ -214,6 +310,9 @@ def enqueue_batch_ingestion(source_ids: list[int], force: bool = False) -> list[
     """
     Enqueue multiple source ingestion jobs.
     
+    All jobs are enqueued in one pipelined call, and their initial
+    statuses are written in a second, instead of round trips per source.
+    
     Args:
         source_ids: List of source IDs to ingest
         force: If True, re-ingest even if already done
@@ -221,11 +320,38 @@ def enqueue_batch_ingestion(source_ids: list[int], force: bool = False) -> list[
     Returns:
         List of job IDs
     """
-    job_ids = []
-    for source_id in source_ids:
-        job_id = enqueue_ingestion(source_id, force)
-        job_ids.append(job_id)
-    return job_ids
+    if not source_ids:
+        return []
+    
+    from app.jobs.ingestion_jobs import ingest_source_job, on_ingestion_failure
+    
+    queue = get_queue("default")
+    timeouts = _ingestion_timeouts(source_ids)
+    
+    jobs = queue.enqueue_many([
+        Queue.prepare_data(
+            ingest_source_job,
+            args=(source_id, force),
+            timeout=timeouts[source_id],
+            result_ttl=JOB_STATUS_TTL,
+            retry=INGESTION_RETRY,
+            on_failure=on_ingestion_failure,
+        )
+        for source_id in source_ids
+    ])
+    
+    with job_status_pipeline() as pipe:
+        for job, source_id in zip(jobs, source_ids):
+            set_job_status(
+                job.id,
+                state="queued",
+                pct=0,
+                message=f"Ingestion queued for source {source_id}",
+                pipe=pipe,
+            )
+    
+    logger.info(f"Enqueued {len(jobs)} ingestion jobs")
+    return [job.id for job in jobs]
 
 
 def get_queue_stats() -> dict[str, Any]:
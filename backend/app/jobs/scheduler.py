@@ -25,6 +25,7 @@ def schedule_cleanup_jobs():
     
     Jobs scheduled:
     - cleanup_expired_chunks: Daily at 3 AM UTC
+    - cleanup_semantic_cache: Daily at 3:30 AM UTC
     - run_all_cleanup_jobs: Weekly on Sunday at 4 AM UTC
     """
     scheduler = get_scheduler()
@@ -47,6 +48,18 @@ def schedule_cleanup_jobs():
     )
     logger.info("Scheduled cleanup_expired_chunks: daily at 3 AM UTC")
     
+    # Schedule daily semantic cache cleanup (entries live for one day)
+    from app.jobs.cleanup_jobs import cleanup_semantic_cache
+    
+    scheduler.cron(
+        "30 3 * * *",  # 3:30 AM UTC daily
+        func=cleanup_semantic_cache,
+        id="cleanup_semantic_cache_daily",
+        timeout=600,  # 10 minute timeout
+        meta={"scheduled_by": "arbiter"},
+    )
+    logger.info("Scheduled cleanup_semantic_cache: daily at 3:30 AM UTC")
+    
     # Schedule weekly full cleanup on Sunday at 4 AM UTC
     from app.jobs.cleanup_jobs import run_all_cleanup_jobs
     
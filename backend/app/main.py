@@ -3,20 +3,31 @@ The Arbiter - FastAPI Application
 Main entry point with CORS configuration.
 """
 
+import asyncio
 import os
-import threading
+import subprocess
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app import __version__
 from app.config import get_settings
+from app.redis_client import close_async_redis
+from app.middleware.rate_limit_middleware import start_violation_drainer, stop_violation_drainer
 from app.api.routes import router as api_router
 from app.api.analytics import router as analytics_router
 from app.api.admin import router as admin_router
 
 
-# Global worker thread reference
-_worker_thread = None
+# Embedded RQ worker process (None when not started)
+_worker_proc: subprocess.Popen | None = None
+# Task restarting the worker if it dies while the API runs
+_worker_watchdog: asyncio.Task | None = None
+
+# Seconds to wait for the worker to exit before killing it. Kept well under
+# platform shutdown grace periods; a job cut off here is retried by RQ.
+WORKER_SHUTDOWN_TIMEOUT = 5
+# Seconds between checks that the worker is still running
+WORKER_CHECK_INTERVAL = 30
 
 
 def create_app() -> FastAPI:
@@ -60,26 +71,59 @@ def create_app() -> FastAPI:
 app = create_app()
 
 
-def _start_rq_worker():
-    """Start RQ worker in background thread."""
-    import subprocess
+def _start_rq_worker() -> subprocess.Popen | None:
+    """Start RQ worker as a child process (no thread waits on it)."""
     redis_url = os.getenv("REDIS_URL")
     if not redis_url:
         print("⚠️  REDIS_URL not set, skipping worker startup")
-        return
+        return None
     
     print("🔧 Starting RQ Worker in background...")
-    # Run worker blocking (this will run in its own thread)
-    subprocess.run([
+    return subprocess.Popen([
         "python", "-m", "rq.cli", "worker", 
         "--url", redis_url
     ])
 
 
+async def _watch_rq_worker():
+    """Restart the embedded RQ worker whenever it has exited."""
+    global _worker_proc
+    
+    while True:
+        await asyncio.sleep(WORKER_CHECK_INTERVAL)
+        if _worker_proc is not None and _worker_proc.poll() is not None:
+            print(f"⚠️  RQ Worker exited with code {_worker_proc.returncode}, restarting")
+            _worker_proc = _start_rq_worker()
+
+
+async def _stop_rq_worker():
+    """Terminate the embedded RQ worker, killing it if it doesn't exit."""
+    global _worker_proc, _worker_watchdog
+    
+    if _worker_watchdog is not None:
+        _worker_watchdog.cancel()
+        _worker_watchdog = None
+    
+    if _worker_proc is None or _worker_proc.poll() is not None:
+        _worker_proc = None
+        return
+    
+    # SIGTERM asks RQ for a warm shutdown; wait in a thread so the event
+    # loop isn't blocked meanwhile
+    _worker_proc.terminate()
+    try:
+        await asyncio.to_thread(_worker_proc.wait, timeout=WORKER_SHUTDOWN_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        _worker_proc.kill()
+        await asyncio.to_thread(_worker_proc.wait)
+    _worker_proc = None
+    print("🛑 RQ Worker stopped")
+
+
 @app.on_event("startup")
 async def startup_event():
     """Run on application startup."""
-    global _worker_thread
+    global _worker_proc, _worker_watchdog
     
     settings = get_settings()
     print(f"🎲 The Arbiter API v{__version__}")
@@ -87,13 +131,19 @@ async def startup_event():
     print(f"   Debug: {settings.debug}")
     print(f"   CORS Origins: {settings.cors_origins}")
     
-    # Start worker in background thread
-    _worker_thread = threading.Thread(target=_start_rq_worker, daemon=True)
-    _worker_thread.start()
-    print("✅ RQ Worker thread started")
+    start_violation_drainer()
+    
+    # Start worker as a child process
+    _worker_proc = _start_rq_worker()
+    if _worker_proc is not None:
+        print(f"✅ RQ Worker started (pid {_worker_proc.pid})")
+        _worker_watchdog = asyncio.create_task(_watch_rq_worker())
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Run on application shutdown."""
     print("👋 The Arbiter API shutting down...")
+    await _stop_rq_worker()
+    await stop_violation_drainer()
+    await close_async_redis()
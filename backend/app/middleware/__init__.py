@@ -2,10 +2,13 @@
 
 from app.middleware.rate_limit import (
     rate_limit,
+    rate_limit_many,
     check_concurrent_limit,
     release_concurrent,
     get_rate_limit_key,
     RateLimitResult,
+    WINDOW_APPROXIMATE,
+    WINDOW_SLIDING,
 )
 from app.middleware.rate_limit_middleware import (
     check_ask_rate_limit,
@@ -19,10 +22,13 @@ from app.middleware.rate_limit_middleware import (
 __all__ = [
     # Rate limit utilities
     "rate_limit",
+    "rate_limit_many",
     "check_concurrent_limit",
     "release_concurrent",
     "get_rate_limit_key",
     "RateLimitResult",
+    "WINDOW_APPROXIMATE",
+    "WINDOW_SLIDING",
     
     # Middleware and dependencies
     "check_ask_rate_limit",
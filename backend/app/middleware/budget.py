@@ -3,7 +3,7 @@ Middleware/Dependency for enforcing daily API budget.
 """
 import os
 import logging
-from datetime import datetime, timedelta
+import time
 
 from fastapi import HTTPException, Depends
 from app.db import get_costs_repo, CostsRepository
@@ -13,17 +13,53 @@ logger = logging.getLogger(__name__)
 # Default budget: $10.00
 DEFAULT_BUDGET = 10.0
 
+
+def _parse_budget() -> float:
+    """Read DAILY_BUDGET_USD from the environment, falling back to the default."""
+    try:
+        return float(os.getenv("DAILY_BUDGET_USD", str(DEFAULT_BUDGET)))
+    except ValueError:
+        logger.warning(f"Invalid DAILY_BUDGET_USD value, using default: {DEFAULT_BUDGET}")
+        return DEFAULT_BUDGET
+
+
+# Resolved once at import; use set_daily_budget() to override (e.g. in tests)
+DAILY_BUDGET_USD = _parse_budget()
+
+
+def set_daily_budget(budget_usd: float) -> None:
+    """Override the daily budget for this process."""
+    global DAILY_BUDGET_USD
+    DAILY_BUDGET_USD = budget_usd
+
+
+SECONDS_PER_DAY = 86400
+
+# (UTC day number, retry_after string) for the last budget rejection
+_retry_after_cache: tuple[int, str] | None = None
+
+
+def _budget_retry_after() -> str:
+    """Tomorrow midnight UTC as an ISO string, recomputed once per day."""
+    global _retry_after_cache
+    
+    today = int(time.time()) // SECONDS_PER_DAY
+    cached = _retry_after_cache
+    if cached is not None and cached[0] == today:
+        return cached[1]
+    
+    next_midnight = (today + 1) * SECONDS_PER_DAY
+    retry_after = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(next_midnight))
+    _retry_after_cache = (today, retry_after)
+    return retry_after
+
+
 async def check_budget(costs_repo: CostsRepository = Depends(get_costs_repo)):
     """
     Check if the daily API budget has been exceeded.
     Raises 503 Service Unavailable if exceeded.
     """
-    # Get budget from env
-    try:
-        daily_budget = float(os.getenv("DAILY_BUDGET_USD", str(DEFAULT_BUDGET)))
-    except ValueError:
-        daily_budget = DEFAULT_BUDGET
-        logger.warning(f"Invalid DAILY_BUDGET_USD value, using default: {DEFAULT_BUDGET}")
+    daily_budget = DAILY_BUDGET_USD
     
     # Get current spend
     current_spend = await costs_repo.get_daily_spend()
@@ -31,15 +67,11 @@ async def check_budget(costs_repo: CostsRepository = Depends(get_costs_repo)):
     if current_spend >= daily_budget:
         logger.warning(f"Daily budget exceeded: ${current_spend:.2f} / ${daily_budget:.2f}")
         
-        # Calculate approximate reset time (tomorrow midnight UTC)
-        next_day = (datetime.utcnow() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-        retry_after = next_day.isoformat() + "Z"
-        
         raise HTTPException(
             status_code=503,
             detail={
                 "error": "Daily budget limit reached",
                 "message": "We've reached our daily API budget. Please try again tomorrow.",
-                "retry_after": retry_after
+                "retry_after": _budget_retry_after()
             }
         )
@@ -1,130 +1,332 @@
 """
-Rate limiting utilities using Redis with sliding window algorithm.
+Rate limiting utilities using Redis with sliding window algorithms.
 """
 
 import logging
+import threading
 import time
-from typing import NamedTuple
+from dataclasses import dataclass, field
 
-from app.jobs.queue import get_redis_connection
+from app.redis_client import get_async_redis
 
 
 logger = logging.getLogger(__name__)
 
 
-class RateLimitResult(NamedTuple):
+@dataclass(frozen=True, slots=True)
+class RateLimitResult:
     """Result of a rate limit check."""
     allowed: bool
     remaining: int
     reset_at: int  # Unix timestamp
     limit: int
     window_seconds: int
+    now: int  # Unix timestamp the check was made at
+    
+    # X-RateLimit-* header values, stringified once
+    limit_header: str = field(init=False)
+    remaining_header: str = field(init=False)
+    reset_header: str = field(init=False)
+    
+    def __post_init__(self):
+        object.__setattr__(self, "limit_header", str(self.limit))
+        object.__setattr__(self, "remaining_header", str(self.remaining))
+        object.__setattr__(self, "reset_header", str(self.reset_at))
+    
+    @property
+    def retry_after(self) -> int:
+        """Seconds until the limit resets (at least 1)."""
+        return max(1, self.reset_at - self.now)
+
+
+# Window algorithms:
+# - "approximate": two fixed-window counters (current + previous, weighted by
+#   how much of the previous window still overlaps). O(1) memory per key.
+# - "sliding": exact sliding window over a sorted set of request timestamps.
+#   One member per request, so reserve it for low limits.
+WINDOW_APPROXIMATE = "approximate"
+WINDOW_SLIDING = "sliding"
+DEFAULT_WINDOW_TYPE = WINDOW_APPROXIMATE
+
+# Check-and-add over one or more limits, run atomically in Redis in one
+# round trip. A request is only recorded if every limit has room, so a
+# denial on one limit doesn't use up another.
+# KEYS = two per limit: the sorted set and its member sequence (sliding), or
+#   the current- and previous-window counters (approximate)
+# ARGV = now, then per limit: window_type, max_requests,
+#   window_seconds, window_start (sliding), previous-window weight (approximate)
+# Returns {denied_index (0 if allowed), then three values per limit}: the
+# count, and when denied the oldest score (sliding) or the current-window
+# counter (approximate), then the previous-window counter (approximate).
+# Scores are returned as strings since Lua numbers are truncated to
+# integers on the way out.
+_RATE_LIMIT_LUA = """
+local now = ARGV[1]
+local n = #KEYS / 2
+local counts = {}
+local curs = {}
+local prevs = {}
+local denied = 0
+for i = 1, n do
+    local base = 1 + (i - 1) * 5
+    local key = KEYS[2 * i - 1]
+    if ARGV[base + 1] == 'sliding' then
+        redis.call('ZREMRANGEBYSCORE', key, 0, ARGV[base + 4])
+        counts[i] = redis.call('ZCARD', key)
+    else
+        curs[i] = tonumber(redis.call('GET', key) or '0')
+        prevs[i] = tonumber(redis.call('GET', KEYS[2 * i]) or '0')
+        counts[i] = math.floor(prevs[i] * tonumber(ARGV[base + 5]) + curs[i])
+    end
+    if denied == 0 and counts[i] >= tonumber(ARGV[base + 2]) then
+        denied = i
+    end
+end
+local result = {denied}
+for i = 1, n do
+    local base = 1 + (i - 1) * 5
+    local key = KEYS[2 * i - 1]
+    local window_seconds = tonumber(ARGV[base + 3])
+    local sliding = ARGV[base + 1] == 'sliding'
+    if denied > 0 then
+        table.insert(result, counts[i])
+        if sliding then
+            table.insert(result, redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')[2] or now)
+            table.insert(result, 0)
+        else
+            table.insert(result, curs[i])
+            table.insert(result, prevs[i])
+        end
+    else
+        if sliding then
+            -- Unique member so same-timestamp requests aren't deduplicated
+            local seq = redis.call('INCR', KEYS[2 * i])
+            redis.call('EXPIRE', KEYS[2 * i], window_seconds + 1)
+            redis.call('ZADD', key, now, now .. ':' .. seq)
+            redis.call('PEXPIRE', key, (window_seconds + 1) * 1000)
+        else
+            redis.call('INCR', key)
+            redis.call('EXPIRE', key, window_seconds * 2)
+        end
+        table.insert(result, counts[i] + 1)
+        table.insert(result, now)
+        table.insert(result, 0)
+    end
+end
+return result
+"""
+
+# Registered scripts, keyed by source. register_script hashes the source
+# once and calls go out as EVALSHA, falling back to EVAL (which also loads
+# the script) on NOSCRIPT after a Redis restart or SCRIPT FLUSH.
+_scripts: dict = {}
+_scripts_lock = threading.Lock()
+
 
+def _get_script(redis, source: str):
+    """Register a Lua script once per process."""
+    script = _scripts.get(source)
+    if script is None:
+        with _scripts_lock:
+            script = _scripts.get(source)
+            if script is None:
+                script = redis.register_script(source)
+                _scripts[source] = script
+    return script
 
-def rate_limit(
+
+def _fail_open(max_requests: int, window_seconds: int) -> RateLimitResult:
+    """Result used when Redis is unavailable (allow the request)."""
+    now = int(time.time())
+    return RateLimitResult(
+        allowed=True,
+        remaining=max_requests,
+        reset_at=now + window_seconds,
+        limit=max_requests,
+        window_seconds=window_seconds,
+        now=now,
+    )
+
+
+def _approximate_reset_at(
+    now: float,
+    max_requests: int,
+    window_seconds: int,
+    current: int,
+    previous: int,
+) -> int:
+    """
+    When a denied approximate-window limit next has room.
+    
+    The weighted count prev * (1 - elapsed / window) + cur falls linearly
+    over the window. If the current window is under the limit, room opens
+    once the previous window's share has decayed enough; otherwise not
+    until the next window, where this window's count decays the same way.
+    
+    Args:
+        now: Time of the check
+        max_requests: Maximum requests allowed in window
+        window_seconds: Window length in seconds
+        current: Current-window counter
+        previous: Previous-window counter
+        
+    Returns:
+        Unix timestamp (rounded up past the exact point)
+    """
+    window_start = (now // window_seconds) * window_seconds
+    if current < max_requests:
+        # previous > 0 here, or the count couldn't have reached the limit
+        reset = window_start + window_seconds * (1 - (max_requests - current) / previous)
+    else:
+        reset = window_start + window_seconds * (2 - max_requests / current)
+    return int(reset) + 1
+
+
+async def rate_limit(
     key: str,
     max_requests: int,
     window_seconds: int,
+    window_type: str = DEFAULT_WINDOW_TYPE,
 ) -> RateLimitResult:
     """
-    Check and apply rate limit using sliding window algorithm.
+    Check and apply a rate limit.
     
-    Uses a Redis sorted set to track request timestamps, allowing
-    for a true sliding window implementation.
+    The check and the add run as one Lua script, so a decision costs a
+    single round trip and concurrent requests can't both slip in between
+    the count and the add.
     
     Args:
         key: Unique rate limit key (e.g., "ask:ip:192.168.1.1")
         max_requests: Maximum requests allowed in window
         window_seconds: Time window in seconds
+        window_type: WINDOW_APPROXIMATE (default) or WINDOW_SLIDING
         
     Returns:
         RateLimitResult with allowed status and metadata
     """
+    results = await rate_limit_many([(key, max_requests, window_seconds, window_type)])
+    return results[0]
+
+
+async def rate_limit_many(
+    limits: list[tuple[str, int, int, str]],
+) -> list[RateLimitResult]:
+    """
+    Check and apply several rate limits for one request in one round trip.
+    
+    The request is counted against every limit only if all of them have
+    room; otherwise nothing is recorded. Keys must live on the same Redis
+    node (always true outside Redis Cluster).
+    
+    Args:
+        limits: (key, max_requests, window_seconds, window_type) per limit
+        
+    Returns:
+        RateLimitResult per limit, in the same order. When denied, the
+        limits that were exceeded have allowed=False.
+    """
     try:
-        redis = get_redis_connection()
+        redis = get_async_redis()
     except Exception as e:
         logger.error(f"Redis connection failed for rate limiting: {e}")
         # If Redis is down, allow the request (fail open)
-        return RateLimitResult(
-            allowed=True,
-            remaining=max_requests,
-            reset_at=int(time.time()) + window_seconds,
-            limit=max_requests,
-            window_seconds=window_seconds,
-        )
+        return [_fail_open(max_requests, window_seconds) for _, max_requests, window_seconds, _ in limits]
     
     now = time.time()
-    window_start = now - window_seconds
     
-    # Redis key for the sorted set
-    redis_key = f"ratelimit:{key}"
+    redis_keys: list[str] = []
+    args: list = [repr(now)]
+    for key, max_requests, window_seconds, window_type in limits:
+        if window_type == WINDOW_SLIDING:
+            # Sorted set of request timestamps
+            redis_key = f"ratelimit:{key}"
+            redis_keys.extend((redis_key, f"{redis_key}:seq"))
+            args.extend((window_type, max_requests, window_seconds, repr(now - window_seconds), 0))
+        else:
+            # Counters for the current and previous fixed windows
+            window_id = int(now // window_seconds)
+            elapsed = now - window_id * window_seconds
+            redis_keys.extend((f"ratelimit:{key}:{window_id}", f"ratelimit:{key}:{window_id - 1}"))
+            args.extend((window_type, max_requests, window_seconds, 0, repr(1 - elapsed / window_seconds)))
     
     try:
-        # Use pipeline for atomic operations
-        pipe = redis.pipeline()
-        
-        # Remove old entries outside the window
-        pipe.zremrangebyscore(redis_key, 0, window_start)
-        
-        # Count requests in current window
-        pipe.zcard(redis_key)
-        
-        # Execute pipeline
-        results = pipe.execute()
-        current_count = results[1]
+        script = _get_script(redis, _RATE_LIMIT_LUA)
+        reply = await script(keys=redis_keys, args=args, client=redis)
+    except Exception as e:
+        logger.error(f"Rate limit check failed: {e}")
+        # Fail open on error
+        return [_fail_open(max_requests, window_seconds) for _, max_requests, window_seconds, _ in limits]
+    
+    denied = reply[0] > 0
+    results: list[RateLimitResult] = []
+    
+    for i, (key, max_requests, window_seconds, window_type) in enumerate(limits):
+        current_count = reply[1 + 3 * i]
         
-        if current_count >= max_requests:
-            # Rate limit exceeded
-            # Get the oldest entry to calculate when window resets
-            oldest = redis.zrange(redis_key, 0, 0, withscores=True)
-            if oldest:
-                reset_at = int(oldest[0][1]) + window_seconds
+        if denied and current_count >= max_requests:
+            if window_type == WINDOW_SLIDING:
+                # Window frees up when the oldest entry ages out
+                reset_at = int(float(reply[2 + 3 * i])) + window_seconds
             else:
-                reset_at = int(now) + window_seconds
+                reset_at = _approximate_reset_at(
+                    now, max_requests, window_seconds,
+                    int(reply[2 + 3 * i]), int(reply[3 + 3 * i]),
+                )
             
             logger.warning(
                 f"Rate limit exceeded: key={key}, "
                 f"current={current_count}, max={max_requests}"
             )
-            
-            return RateLimitResult(
+            results.append(RateLimitResult(
                 allowed=False,
                 remaining=0,
                 reset_at=reset_at,
                 limit=max_requests,
                 window_seconds=window_seconds,
-            )
-        
-        # Add current request
-        pipe = redis.pipeline()
-        pipe.zadd(redis_key, {str(now): now})
-        pipe.expire(redis_key, window_seconds + 1)
-        pipe.execute()
-        
-        remaining = max_requests - current_count - 1
-        reset_at = int(now) + window_seconds
-        
-        return RateLimitResult(
-            allowed=True,
-            remaining=max(0, remaining),
-            reset_at=reset_at,
-            limit=max_requests,
-            window_seconds=window_seconds,
-        )
-        
-    except Exception as e:
-        logger.error(f"Rate limit check failed: {e}")
-        # Fail open on error
-        return RateLimitResult(
-            allowed=True,
-            remaining=max_requests,
-            reset_at=int(time.time()) + window_seconds,
-            limit=max_requests,
-            window_seconds=window_seconds,
-        )
+                now=int(now),
+            ))
+        else:
+            results.append(RateLimitResult(
+                allowed=True,
+                remaining=max(0, max_requests - current_count),
+                reset_at=int(now) + window_seconds,
+                limit=max_requests,
+                window_seconds=window_seconds,
+                now=int(now),
+            ))
+    
+    return results
+
+
+# Test-and-increment for a concurrency counter.
+# KEYS = counter key; ARGV = max_concurrent, ttl_seconds
+# Returns {allowed (0/1), count}. TTL is only set on the first slot so
+# steady traffic can't keep a leaked counter alive forever.
+_ACQUIRE_CONCURRENT_LUA = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if current >= tonumber(ARGV[1]) then
+    return {0, current}
+end
+local count = redis.call('INCR', KEYS[1])
+if count == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return {1, count}
+"""
+
+# Decrement a concurrency counter, flooring at zero in case the slot
+# was released after the counter expired.
+_RELEASE_CONCURRENT_LUA = """
+local count = redis.call('DECR', KEYS[1])
+if count < 0 then
+    redis.call('SET', KEYS[1], 0)
+    count = 0
+end
+return count
+"""
 
 
-def check_concurrent_limit(
+async def check_concurrent_limit(
     key: str,
     max_concurrent: int,
     ttl_seconds: int = 600,
@@ -132,6 +334,10 @@ def check_concurrent_limit(
     """
     Check concurrent operation limit using Redis counter.
     
+    The check and the increment run as one Lua script, so concurrent
+    callers can't all read a free slot and then all increment past the
+    limit.
+    
     Args:
         key: Unique key for the limit (e.g., "concurrent:ingest")
         max_concurrent: Maximum concurrent operations
@@ -141,7 +347,7 @@ def check_concurrent_limit(
         Tuple of (allowed, current_count)
     """
     try:
-        redis = get_redis_connection()
+        redis = get_async_redis()
     except Exception as e:
         logger.error(f"Redis connection failed: {e}")
         return (True, 0)
@@ -149,32 +355,29 @@ def check_concurrent_limit(
     redis_key = f"concurrent:{key}"
     
     try:
-        current = redis.get(redis_key)
-        current_count = int(current) if current else 0
+        script = _get_script(redis, _ACQUIRE_CONCURRENT_LUA)
+        allowed, current_count = await script(
+            keys=[redis_key], args=[max_concurrent, ttl_seconds], client=redis
+        )
         
-        if current_count >= max_concurrent:
+        if not allowed:
             logger.warning(f"Concurrent limit exceeded: key={key}, current={current_count}")
             return (False, current_count)
         
-        # Increment with TTL
-        pipe = redis.pipeline()
-        pipe.incr(redis_key)
-        pipe.expire(redis_key, ttl_seconds)
-        pipe.execute()
-        
-        return (True, current_count + 1)
+        return (True, current_count)
         
     except Exception as e:
         logger.error(f"Concurrent limit check failed: {e}")
         return (True, 0)
 
 
-def release_concurrent(key: str) -> None:
+async def release_concurrent(key: str) -> None:
     """Release a concurrent operation slot."""
     try:
-        redis = get_redis_connection()
+        redis = get_async_redis()
         redis_key = f"concurrent:{key}"
-        redis.decr(redis_key)
+        script = _get_script(redis, _RELEASE_CONCURRENT_LUA)
+        await script(keys=[redis_key], client=redis)
     except Exception as e:
         logger.error(f"Failed to release concurrent slot: {e}")
 
@@ -191,7 +394,7 @@ def get_rate_limit_key(
         endpoint: API endpoint name (e.g., "ask", "ingest")
         identifier: The identifier value (e.g., IP address, session ID)
         identifier_type: Type of identifier ("ip" or "session")
-        
+    
     Returns:
         Rate limit key string
     """
@@ -2,20 +2,29 @@
 Rate limiting middleware and FastAPI dependencies.
 """
 
+import asyncio
 import logging
+import re
 import time
 from datetime import datetime, timezone
+from dataclasses import dataclass
 from typing import Optional
 
+import orjson
+
 from fastapi import Request, HTTPException, Depends
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 
+from app.redis_client import get_async_redis
 from app.middleware.rate_limit import (
     rate_limit,
+    rate_limit_many,
     check_concurrent_limit,
     get_rate_limit_key,
     RateLimitResult,
+    WINDOW_APPROXIMATE,
+    WINDOW_SLIDING,
 )
 
 
@@ -23,18 +32,54 @@ logger = logging.getLogger(__name__)
 
 
 # Rate limit configurations
+# window_type: WINDOW_APPROXIMATE (two counters, O(1) memory per key) or
+# WINDOW_SLIDING (exact, one sorted-set member per request)
 RATE_LIMITS = {
     "ask": {
-        "ip": {"max_requests": 10, "window_seconds": 60},       # 10/min per IP
-        "session": {"max_requests": 100, "window_seconds": 3600},  # 100/hour per session
+        "ip": {"max_requests": 10, "window_seconds": 60, "window_type": WINDOW_APPROXIMATE},       # 10/min per IP
+        "session": {"max_requests": 100, "window_seconds": 3600, "window_type": WINDOW_APPROXIMATE},  # 100/hour per session
     },
     "ingest": {
-        "ip": {"max_requests": 3, "window_seconds": 3600},      # 3/hour per IP
+        "ip": {"max_requests": 3, "window_seconds": 3600, "window_type": WINDOW_SLIDING},      # 3/hour per IP
         "concurrent": {"max_concurrent": 50},                    # 50 concurrent max
     },
 }
 
 
+@dataclass(frozen=True, slots=True)
+class BucketCfg:
+    """One rate limit bucket from RATE_LIMITS, flattened for the hot path."""
+    max_requests: int
+    window_seconds: int
+    window_type: str
+    key_prefix: str  # get_rate_limit_key() minus the identifier
+    limit_desc: str
+    config: dict  # original RATE_LIMITS entry, for violation logs
+    
+    def limit(self, identifier: str) -> tuple[str, int, int, str]:
+        """(key, max_requests, window_seconds, window_type) for rate_limit()."""
+        return (self.key_prefix + identifier, self.max_requests, self.window_seconds, self.window_type)
+
+
+def _bucket(endpoint: str, identifier_type: str, per: str) -> BucketCfg:
+    """Build the BucketCfg for RATE_LIMITS[endpoint][identifier_type]."""
+    config = RATE_LIMITS[endpoint][identifier_type]
+    return BucketCfg(
+        max_requests=config["max_requests"],
+        window_seconds=config["window_seconds"],
+        window_type=config["window_type"],
+        key_prefix=get_rate_limit_key(endpoint, "", identifier_type),
+        limit_desc=f"{config['max_requests']} requests per {per}",
+        config=config,
+    )
+
+
+ASK_IP_CFG = _bucket("ask", "ip", "minute")
+ASK_SESSION_CFG = _bucket("ask", "session", "hour")
+INGEST_IP_CFG = _bucket("ingest", "ip", "hour")
+INGEST_CONCURRENT_CFG = RATE_LIMITS["ingest"]["concurrent"]
+
+
 def get_client_ip(request: Request) -> str:
     """
     Extract client IP from request.
@@ -78,6 +123,133 @@ def get_session_id(request: Request) -> Optional[str]:
     return None
 
 
+_SESSION_COOKIE_RE = re.compile(rb"(?:^|;)\s*session_id=([^;]*)")
+
+
+def _extract_request_identity(request: Request) -> tuple[str, Optional[str]]:
+    """
+    Extract (client_ip, session_id) from one pass over the raw headers.
+    
+    Same precedence as get_client_ip() and get_session_id(), without
+    building Starlette's Headers/cookies mappings on the hot path.
+    """
+    forwarded = real_ip = cookie = auth = None
+    
+    for name, value in request.scope["headers"]:
+        if name == b"x-forwarded-for":
+            forwarded = forwarded or value
+        elif name == b"x-real-ip":
+            real_ip = real_ip or value
+        elif name == b"cookie":
+            cookie = value if cookie is None else cookie + b"; " + value
+        elif name == b"authorization":
+            auth = auth or value
+    
+    if forwarded:
+        # Take the first IP in the chain
+        client_ip = forwarded.split(b",")[0].strip().decode("latin-1")
+    elif real_ip:
+        client_ip = real_ip.decode("latin-1")
+    elif request.client:
+        client_ip = request.client.host
+    else:
+        client_ip = "unknown"
+    
+    session_id = None
+    if cookie:
+        match = _SESSION_COOKIE_RE.search(cookie)
+        if match and match.group(1).strip():
+            session_id = match.group(1).strip().decode("latin-1")
+    if session_id is None and auth and auth.startswith(b"Bearer "):
+        session_id = auth[7:][:32].decode("latin-1")  # Use first 32 chars as identifier
+    
+    return client_ip, session_id
+
+
+# Violation records go to a Redis Stream in batches from one background
+# task, so a blocked request only pays for a put_nowait. Records are
+# telemetry: if the local queue is full they're dropped and counted.
+VIOLATION_STREAM = "ratelimit:violations"
+VIOLATION_DROPPED_KEY = "ratelimit:violations:dropped"
+DENIED_METRIC_PREFIX = "metrics:ratelimit:denied:"
+VIOLATION_STREAM_MAXLEN = 100_000
+VIOLATION_QUEUE_SIZE = 10_000
+VIOLATION_BATCH_SIZE = 500
+VIOLATION_FLUSH_INTERVAL = 0.05  # seconds
+
+_violation_queue: Optional[asyncio.Queue] = None
+_violation_task: Optional[asyncio.Task] = None
+_violations_dropped = 0
+_denied_counts: dict[str, int] = {}  # endpoint -> denials since last flush
+
+
+async def _flush_violations() -> None:
+    """Write up to VIOLATION_BATCH_SIZE queued violations and the denial counters in one pipeline."""
+    global _violations_dropped, _denied_counts
+    
+    items = []
+    while len(items) < VIOLATION_BATCH_SIZE:
+        try:
+            items.append(_violation_queue.get_nowait())
+        except asyncio.QueueEmpty:
+            break
+    
+    dropped, _violations_dropped = _violations_dropped, 0
+    denied, _denied_counts = _denied_counts, {}
+    if not items and not dropped and not denied:
+        return
+    
+    try:
+        pipe = get_async_redis().pipeline(transaction=False)
+        for fields in items:
+            pipe.xadd(VIOLATION_STREAM, fields, maxlen=VIOLATION_STREAM_MAXLEN, approximate=True)
+        if dropped:
+            pipe.incrby(VIOLATION_DROPPED_KEY, dropped)
+        for endpoint, count in denied.items():
+            pipe.incrby(DENIED_METRIC_PREFIX + endpoint, count)
+        await pipe.execute()
+    except Exception as e:
+        logger.error(f"Failed to write {len(items)} rate limit violations: {e}")
+
+
+async def _violation_drainer() -> None:
+    """Background task: flush queued violations every VIOLATION_FLUSH_INTERVAL."""
+    while True:
+        await asyncio.sleep(VIOLATION_FLUSH_INTERVAL)
+        await _flush_violations()
+
+
+def start_violation_drainer() -> None:
+    """Create the violation queue and start its drainer (call on startup)."""
+    global _violation_queue, _violation_task
+    
+    if _violation_task is None:
+        _violation_queue = asyncio.Queue(maxsize=VIOLATION_QUEUE_SIZE)
+        _violation_task = asyncio.create_task(_violation_drainer())
+
+
+async def stop_violation_drainer() -> None:
+    """Stop the drainer and flush what's left (call on shutdown)."""
+    global _violation_queue, _violation_task
+    
+    if _violation_task is None:
+        return
+    
+    _violation_task.cancel()
+    try:
+        await _violation_task
+    except asyncio.CancelledError:
+        pass
+    
+    while True:
+        await _flush_violations()
+        if _violation_queue.empty():
+            break
+    
+    _violation_queue = None
+    _violation_task = None
+
+
 async def log_rate_limit_violation(
     request: Request,
     endpoint: str,
@@ -85,15 +257,29 @@ async def log_rate_limit_violation(
     limit_type: str,
     limit_config: dict,
 ) -> None:
-    """Log rate limit violation for analysis."""
-    logger.warning(
-        f"Rate limit violation: endpoint={endpoint}, ip={client_ip}, "
-        f"type={limit_type}, limit={limit_config}"
-    )
+    """Record a rate limit violation for analysis."""
+    global _violations_dropped
+    
+    if _violation_queue is None:
+        # Drainer not running (e.g. dependency used outside the app)
+        logger.warning(
+            f"Rate limit violation: endpoint={endpoint}, ip={client_ip}, "
+            f"type={limit_type}, limit={limit_config}"
+        )
+        return
+    
+    _denied_counts[endpoint] = _denied_counts.get(endpoint, 0) + 1
     
-    # TODO: Store in rate_limit_violations table
-    # This would require database access in hot path
-    # Consider async logging or queue-based approach
+    try:
+        _violation_queue.put_nowait({
+            "ts": time.time(),
+            "endpoint": endpoint,
+            "ip": client_ip,
+            "type": limit_type,
+            "limit": orjson.dumps(limit_config),
+        })
+    except asyncio.QueueFull:
+        _violations_dropped += 1
 
 
 def create_rate_limit_response(
@@ -101,7 +287,7 @@ def create_rate_limit_response(
     limit_description: str,
 ) -> JSONResponse:
     """Create a 429 Too Many Requests response."""
-    retry_after = max(1, result.reset_at - int(time.time()))
+    retry_after = result.retry_after
     
     response = JSONResponse(
         status_code=429,
@@ -115,22 +301,46 @@ def create_rate_limit_response(
     )
     
     # Add rate limit headers
-    response.headers["X-RateLimit-Limit"] = str(result.limit)
-    response.headers["X-RateLimit-Remaining"] = str(result.remaining)
-    response.headers["X-RateLimit-Reset"] = str(result.reset_at)
+    response.headers["X-RateLimit-Limit"] = result.limit_header
+    response.headers["X-RateLimit-Remaining"] = result.remaining_header
+    response.headers["X-RateLimit-Reset"] = result.reset_header
     response.headers["Retry-After"] = str(retry_after)
     
     return response
 
 
+def create_rate_limit_exception(
+    result: RateLimitResult,
+    limit_description: str,
+) -> HTTPException:
+    """Create the 429 HTTPException raised by the rate limit dependencies."""
+    retry_after = result.retry_after
+    
+    return HTTPException(
+        status_code=429,
+        detail={
+            "error": "Rate limit exceeded",
+            "error_code": "RATE_LIMIT_EXCEEDED",
+            "retry_after": retry_after,
+            "limit": limit_description,
+        },
+        headers={
+            "X-RateLimit-Limit": result.limit_header,
+            "X-RateLimit-Remaining": result.remaining_header,
+            "X-RateLimit-Reset": result.reset_header,
+            "Retry-After": str(retry_after),
+        },
+    )
+
+
 def add_rate_limit_headers(
     response: JSONResponse,
     result: RateLimitResult,
 ) -> None:
     """Add rate limit headers to a response."""
-    response.headers["X-RateLimit-Limit"] = str(result.limit)
-    response.headers["X-RateLimit-Remaining"] = str(result.remaining)
-    response.headers["X-RateLimit-Reset"] = str(result.reset_at)
+    response.headers["X-RateLimit-Limit"] = result.limit_header
+    response.headers["X-RateLimit-Remaining"] = result.remaining_header
+    response.headers["X-RateLimit-Reset"] = result.reset_header
 
 
 # ============================================================================
@@ -141,61 +351,31 @@ async def check_ask_rate_limit(request: Request) -> RateLimitResult:
     """
     Dependency to check /ask endpoint rate limits.
     
+    The IP and (if present) session limits are checked together in one
+    Redis round trip.
+    
     Raises HTTPException 429 if rate limit exceeded.
     """
-    client_ip = get_client_ip(request)
-    session_id = get_session_id(request)
+    client_ip, session_id = _extract_request_identity(request)
     
-    # Check IP rate limit (10/min)
-    ip_key = get_rate_limit_key("ask", client_ip, "ip")
-    ip_config = RATE_LIMITS["ask"]["ip"]
-    ip_result = rate_limit(ip_key, ip_config["max_requests"], ip_config["window_seconds"])
+    # IP rate limit (10/min)
+    limits = [ASK_IP_CFG.limit(client_ip)]
     
-    if not ip_result.allowed:
-        await log_rate_limit_violation(request, "ask", client_ip, "ip", ip_config)
-        raise HTTPException(
-            status_code=429,
-            detail={
-                "error": "Rate limit exceeded",
-                "error_code": "RATE_LIMIT_EXCEEDED",
-                "retry_after": max(1, ip_result.reset_at - int(time.time())),
-                "limit": f"{ip_config['max_requests']} requests per minute",
-            },
-            headers={
-                "X-RateLimit-Limit": str(ip_result.limit),
-                "X-RateLimit-Remaining": str(ip_result.remaining),
-                "X-RateLimit-Reset": str(ip_result.reset_at),
-                "Retry-After": str(max(1, ip_result.reset_at - int(time.time()))),
-            },
-        )
+    # Session rate limit if session exists (100/hour)
+    if session_id:
+        limits.append(ASK_SESSION_CFG.limit(session_id))
     
-    # Check session rate limit if session exists (100/hour)
+    results = await rate_limit_many(limits)
+    ip_result = results[0]
+    
+    checks = [(ip_result, "ip", ASK_IP_CFG)]
     if session_id:
-        session_key = get_rate_limit_key("ask", session_id, "session")
-        session_config = RATE_LIMITS["ask"]["session"]
-        session_result = rate_limit(
-            session_key,
-            session_config["max_requests"],
-            session_config["window_seconds"],
-        )
-        
-        if not session_result.allowed:
-            await log_rate_limit_violation(request, "ask", client_ip, "session", session_config)
-            raise HTTPException(
-                status_code=429,
-                detail={
-                    "error": "Rate limit exceeded",
-                    "error_code": "RATE_LIMIT_EXCEEDED",
-                    "retry_after": max(1, session_result.reset_at - int(time.time())),
-                    "limit": f"{session_config['max_requests']} requests per hour",
-                },
-                headers={
-                    "X-RateLimit-Limit": str(session_result.limit),
-                    "X-RateLimit-Remaining": str(session_result.remaining),
-                    "X-RateLimit-Reset": str(session_result.reset_at),
-                    "Retry-After": str(max(1, session_result.reset_at - int(time.time()))),
-                },
-            )
+        checks.append((results[1], "session", ASK_SESSION_CFG))
+    
+    for result, limit_type, cfg in checks:
+        if not result.allowed:
+            await log_rate_limit_violation(request, "ask", client_ip, limit_type, cfg.config)
+            raise create_rate_limit_exception(result, cfg.limit_desc)
     
     return ip_result
 
@@ -206,44 +386,27 @@ async def check_ingest_rate_limit(request: Request) -> RateLimitResult:
     
     Raises HTTPException 429 if rate limit exceeded.
     """
-    client_ip = get_client_ip(request)
+    client_ip, _ = _extract_request_identity(request)
     
     # Check IP rate limit (3/hour)
-    ip_key = get_rate_limit_key("ingest", client_ip, "ip")
-    ip_config = RATE_LIMITS["ingest"]["ip"]
-    ip_result = rate_limit(ip_key, ip_config["max_requests"], ip_config["window_seconds"])
+    ip_result = await rate_limit(*INGEST_IP_CFG.limit(client_ip))
     
     if not ip_result.allowed:
-        await log_rate_limit_violation(request, "ingest", client_ip, "ip", ip_config)
-        raise HTTPException(
-            status_code=429,
-            detail={
-                "error": "Rate limit exceeded",
-                "error_code": "RATE_LIMIT_EXCEEDED",
-                "retry_after": max(1, ip_result.reset_at - int(time.time())),
-                "limit": f"{ip_config['max_requests']} requests per hour",
-            },
-            headers={
-                "X-RateLimit-Limit": str(ip_result.limit),
-                "X-RateLimit-Remaining": str(ip_result.remaining),
-                "X-RateLimit-Reset": str(ip_result.reset_at),
-                "Retry-After": str(max(1, ip_result.reset_at - int(time.time()))),
-            },
-        )
+        await log_rate_limit_violation(request, "ingest", client_ip, "ip", INGEST_IP_CFG.config)
+        raise create_rate_limit_exception(ip_result, INGEST_IP_CFG.limit_desc)
     
     # Check concurrent limit (50 max)
-    concurrent_config = RATE_LIMITS["ingest"]["concurrent"]
-    allowed, current = check_concurrent_limit("ingest", concurrent_config["max_concurrent"])
+    allowed, current = await check_concurrent_limit("ingest", INGEST_CONCURRENT_CFG["max_concurrent"])
     
     if not allowed:
-        await log_rate_limit_violation(request, "ingest", client_ip, "concurrent", concurrent_config)
+        await log_rate_limit_violation(request, "ingest", client_ip, "concurrent", INGEST_CONCURRENT_CFG)
         raise HTTPException(
             status_code=429,
             detail={
                 "error": "Too many concurrent ingestions",
                 "error_code": "CONCURRENT_LIMIT_EXCEEDED",
                 "retry_after": 60,
-                "limit": f"{concurrent_config['max_concurrent']} concurrent operations",
+                "limit": f"{INGEST_CONCURRENT_CFG['max_concurrent']} concurrent operations",
                 "current": current,
             },
             headers={
@@ -258,6 +421,13 @@ async def check_ingest_rate_limit(request: Request) -> RateLimitResult:
 # Middleware (Alternative Approach)
 # ============================================================================
 
+# (method, path) -> IP bucket for RateLimitMiddleware
+_MIDDLEWARE_LIMITS = {
+    ("POST", "/ask"): ASK_IP_CFG,
+    ("POST", "/ingest"): INGEST_IP_CFG,
+}
+
+
 class RateLimitMiddleware(BaseHTTPMiddleware):
     """
     Middleware for rate limiting.
@@ -266,39 +436,22 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
     """
     
     async def dispatch(self, request: Request, call_next):
-        # Only apply to specific paths
-        path = request.url.path
-        
-        # Skip non-rate-limited endpoints
-        if not any(path.startswith(p) for p in ["/ask", "/ingest"]):
+        # Only apply to specific endpoints
+        cfg = _MIDDLEWARE_LIMITS.get((request.method, request.url.path))
+        if cfg is None:
             return await call_next(request)
         
-        client_ip = get_client_ip(request)
-        
-        # Determine rate limit based on path
-        if path == "/ask" and request.method == "POST":
-            key = get_rate_limit_key("ask", client_ip, "ip")
-            config = RATE_LIMITS["ask"]["ip"]
-            result = rate_limit(key, config["max_requests"], config["window_seconds"])
-            limit_desc = f"{config['max_requests']} requests per minute"
-            
-        elif path == "/ingest" and request.method == "POST":
-            key = get_rate_limit_key("ingest", client_ip, "ip")
-            config = RATE_LIMITS["ingest"]["ip"]
-            result = rate_limit(key, config["max_requests"], config["window_seconds"])
-            limit_desc = f"{config['max_requests']} requests per hour"
-            
-        else:
-            return await call_next(request)
+        client_ip, _ = _extract_request_identity(request)
+        result = await rate_limit(*cfg.limit(client_ip))
         
         if not result.allowed:
-            return create_rate_limit_response(result, limit_desc)
+            return create_rate_limit_response(result, cfg.limit_desc)
         
         response = await call_next(request)
         
         # Add rate limit headers to successful responses
-        response.headers["X-RateLimit-Limit"] = str(result.limit)
-        response.headers["X-RateLimit-Remaining"] = str(result.remaining)
-        response.headers["X-RateLimit-Reset"] = str(result.reset_at)
+        response.headers["X-RateLimit-Limit"] = result.limit_header
+        response.headers["X-RateLimit-Remaining"] = result.remaining_header
+        response.headers["X-RateLimit-Reset"] = result.reset_header
         
         return response
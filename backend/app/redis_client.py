@@ -0,0 +1,55 @@
+"""
+Shared async Redis client for the API process.
+"""
+
+import socket
+
+import redis.asyncio
+
+from app.config import get_settings
+
+
+# Async client for request-path checks (rate limiting, answer cache)
+_async_redis_client: redis.asyncio.Redis | None = None
+ASYNC_REDIS_MAX_CONNECTIONS = 256
+# How long a caller waits for a free connection once the pool is exhausted
+ASYNC_REDIS_POOL_TIMEOUT = 0.2
+# Start keepalive probes after 30s idle (Linux); otherwise the OS default
+ASYNC_REDIS_KEEPALIVE_OPTIONS = (
+    {socket.TCP_KEEPIDLE: 30} if hasattr(socket, "TCP_KEEPIDLE") else {}
+)
+
+
+def get_async_redis() -> redis.asyncio.Redis:
+    """
+    Get the shared async Redis client.
+    
+    One pooled client per process, with TCP keepalive and periodic health
+    checks, so request handlers reuse connections instead of reconnecting.
+    Rate limiting, concurrency slots, violation logging and the answer
+    cache all share it. When every connection is busy, callers wait
+    briefly for one instead of failing immediately.
+    """
+    global _async_redis_client
+    
+    if _async_redis_client is None:
+        pool = redis.asyncio.BlockingConnectionPool.from_url(
+            get_settings().redis_url,
+            max_connections=ASYNC_REDIS_MAX_CONNECTIONS,
+            timeout=ASYNC_REDIS_POOL_TIMEOUT,
+            socket_keepalive=True,
+            socket_keepalive_options=ASYNC_REDIS_KEEPALIVE_OPTIONS,
+            health_check_interval=30,
+        )
+        _async_redis_client = redis.asyncio.Redis.from_pool(pool)
+    
+    return _async_redis_client
+
+
+async def close_async_redis():
+    """Close the shared async Redis client."""
+    global _async_redis_client
+    
+    if _async_redis_client is not None:
+        await _async_redis_client.aclose()
+        _async_redis_client = None
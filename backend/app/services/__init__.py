@@ -1,72 +1,150 @@
-"""Business logic services for The Arbiter."""
+"""
+Business logic services for The Arbiter.
 
-from app.services.chunker import (
-    Chunk,
-    chunk_text,
-    chunk_document,
-    split_into_sentences,
-    estimate_tokens,
-)
-from app.services.embeddings import (
-    create_embedding,
-    batch_create_embeddings,
-    get_embedding_model_info,
-    EMBEDDING_MODEL,
-    EMBEDDING_DIMENSIONS,
-)
-from app.services.ingestion import (
-    IngestionResult,
-    ingest_source,
-    ingest_all_pending,
-    download_pdf,
-    extract_text_from_pdf,
-    compute_file_hash,
-)
-from app.services.answer_generator import (
-    generate_answer,
-    generate_answer_with_verification,
-    estimate_answer_quality,
-    ANSWER_MODEL,
-)
-from app.services.citation_verifier import (
-    verify_citation,
-    verify_citation_in_any_chunk,
-    get_relevant_sections,
-    normalize_text,
-)
-from app.services.levenshtein import (
-    levenshtein_distance,
-    similarity_ratio,
-    find_best_match_window,
-)
-from app.services.retrieval import (
-    hybrid_search,
-    hybrid_search_sync,
-)
-from app.services.cache import (
-    get_or_create_embedding,
-    get_cached_embedding,
-    cache_embedding,
-    clear_embedding_cache,
-    get_cache_stats,
-)
-from app.services.override_detector import (
-    detect_overrides,
-    detect_and_save_overrides,
-    has_override_keywords,
-)
+Submodules are imported on first attribute access (PEP 562), so importing
+one service doesn't pull in OpenAI, PyMuPDF, etc. for all the others.
+"""
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from app.services.chunker import (
+        Chunk,
+        chunk_text,
+        chunk_document,
+        iter_document_chunks,
+        split_into_sentences,
+        estimate_tokens,
+    )
+    from app.services.embeddings import (
+        create_embedding,
+        batch_create_embeddings,
+        parallel_create_embeddings,
+        get_embedding_model_info,
+        EMBEDDING_MODEL,
+        EMBEDDING_DIMENSIONS,
+    )
+    from app.services.ingestion import (
+        IngestionResult,
+        ingest_source,
+        ingest_all_pending,
+        download_pdf,
+        extract_text_from_pdf,
+        extract_text_and_count,
+        compute_file_hash,
+    )
+    from app.services.answer_generator import (
+        generate_answer,
+        generate_answer_with_verification,
+        estimate_answer_quality,
+        ANSWER_MODEL,
+    )
+    from app.services.citation_verifier import (
+        verify_citation,
+        verify_citation_in_any_chunk,
+        get_relevant_sections,
+        normalize_text,
+    )
+    from app.services.levenshtein import (
+        levenshtein_distance,
+        similarity_ratio,
+        find_best_match_window,
+    )
+    from app.services.retrieval import (
+        hybrid_search,
+        hybrid_search_sync,
+    )
+    from app.services.cache import (
+        get_or_create_embedding,
+        get_cached_embedding,
+        cache_embedding,
+        clear_embedding_cache,
+        get_cache_stats,
+    )
+    from app.services.override_detector import (
+        detect_overrides,
+        detect_and_save_overrides,
+        has_override_keywords,
+    )
+
+# Submodule -> names it provides
+_LAZY_MODULES = {
+    "app.services.chunker": (
+        "Chunk",
+        "chunk_text",
+        "chunk_document",
+        "iter_document_chunks",
+        "split_into_sentences",
+        "estimate_tokens",
+    ),
+    "app.services.embeddings": (
+        "create_embedding",
+        "batch_create_embeddings",
+        "parallel_create_embeddings",
+        "get_embedding_model_info",
+        "EMBEDDING_MODEL",
+        "EMBEDDING_DIMENSIONS",
+    ),
+    "app.services.ingestion": (
+        "IngestionResult",
+        "ingest_source",
+        "ingest_all_pending",
+        "download_pdf",
+        "extract_text_from_pdf",
+        "extract_text_and_count",
+        "compute_file_hash",
+    ),
+    "app.services.answer_generator": (
+        "generate_answer",
+        "generate_answer_with_verification",
+        "estimate_answer_quality",
+        "ANSWER_MODEL",
+    ),
+    "app.services.citation_verifier": (
+        "verify_citation",
+        "verify_citation_in_any_chunk",
+        "get_relevant_sections",
+        "normalize_text",
+    ),
+    "app.services.levenshtein": (
+        "levenshtein_distance",
+        "similarity_ratio",
+        "find_best_match_window",
+    ),
+    "app.services.retrieval": (
+        "hybrid_search",
+        "hybrid_search_sync",
+    ),
+    "app.services.cache": (
+        "get_or_create_embedding",
+        "get_cached_embedding",
+        "cache_embedding",
+        "clear_embedding_cache",
+        "get_cache_stats",
+    ),
+    "app.services.override_detector": (
+        "detect_overrides",
+        "detect_and_save_overrides",
+        "has_override_keywords",
+    ),
+}
+
+_LAZY = {name: module for module, names in _LAZY_MODULES.items() for name in names}
 
 __all__ = [
     # Chunker
     "Chunk",
     "chunk_text",
     "chunk_document",
+    "iter_document_chunks",
     "split_into_sentences",
     "estimate_tokens",
     
     # Embeddings
     "create_embedding",
     "batch_create_embeddings",
+    "parallel_create_embeddings",
     "get_embedding_model_info",
     "EMBEDDING_MODEL",
     "EMBEDDING_DIMENSIONS",
@@ -77,6 +155,7 @@ __all__ = [
     "ingest_all_pending",
     "download_pdf",
     "extract_text_from_pdf",
+    "extract_text_and_count",
     "compute_file_hash",
     
     # Answer Generation
@@ -112,3 +191,16 @@ __all__ = [
     "detect_and_save_overrides",
     "has_override_keywords",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
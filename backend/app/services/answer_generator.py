@@ -6,12 +6,16 @@ Generates structured answers from retrieved rule chunks.
 import json
 import logging
 import re
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Any
 
 from openai import OpenAI
+from openai.types import CompletionUsage
 
 from app.config import get_settings
-from app.db.models import RuleChunk, RuleChunkSearchResult
+from app.db.models import ApiCostCreate, RuleChunk, RuleChunkSearchResult
+from app.services.embeddings import count_tokens_estimate, get_openai_client
 
 
 # Configure logging
@@ -19,8 +23,39 @@ logger = logging.getLogger(__name__)
 
 # Model configuration
 ANSWER_MODEL = "gpt-4o"  # Using gpt-4o for better reasoning
+# Verified answers try the cheaper model first for simple questions and
+# only fall back to the stronger one for the strict retry after a failed
+# verification; harder questions go to the stronger model from the start
+PRIMARY_MODEL = "gpt-4o-mini"
+STRICT_MODEL = ANSWER_MODEL
 MAX_TOKENS = 1500
 
+# Longest question still treated as simple enough for PRIMARY_MODEL
+SIMPLE_QUESTION_MAX_CHARS = 200
+
+# JSON mode: the model always returns a single JSON object (the prompt
+# must still mention JSON and describe the fields)
+JSON_RESPONSE_FORMAT = {"type": "json_object"}
+
+# Characters of streamed output to see before checking it opens an answer
+# object, i.e. a JSON object whose first key is one of the answer fields
+STREAM_PREFIX_CHECK_CHARS = 64
+_ANSWER_PREFIX_RE = re.compile(
+    r'\{\s*"(?:verdict|quote_exact|quote_chunk_id|page|source_type|confidence|notes)"\s*:'
+)
+
+# Compact table format for chunks (settings.compact_chunk_prompt), and the
+# note appended to the system prompts when it is used
+CHUNKS_TABLE_HEADER = "CHUNKS (tab-separated: id, page, source_type, text):"
+CHUNKS_TABLE_CITATION_NOTE = (
+    "\n\nCITATIONS: Excerpts are tab-separated rows of id, page, source_type "
+    "and text. Cite by the id field as quote_chunk_id."
+)
+_WS_RE = re.compile(r'\s+')
+
+# Fallback extraction pattern for fenced responses
+_CODE_FENCE_RE = re.compile(r'```(?:json)?\s*\n?(.*?)\n?```', re.DOTALL)
+
 
 # Prompt template for answer generation
 SYSTEM_PROMPT = """You are The Arbiter, the ultimate board game rules authority. Your answers help players resolve disputes quickly and definitively.
@@ -47,28 +82,51 @@ IMPORTANT: When you find relevant rules and give a good answer, use HIGH or MEDI
 Being overly cautious with "low" confidence is WRONG - it makes the tool seem unreliable."""
 
 
-def get_openai_client() -> OpenAI:
-    """Get configured OpenAI client."""
-    settings = get_settings()
-    if not settings.openai_api_key:
-        raise ValueError("OPENAI_API_KEY not configured")
-    return OpenAI(api_key=settings.openai_api_key)
-
-
 def format_chunks_for_prompt(chunks: list[RuleChunk | RuleChunkSearchResult]) -> str:
-    """Format chunks as context for the prompt."""
-    formatted = []
-    for chunk in chunks:
-        chunk_id = getattr(chunk, 'id', 0)
-        page = chunk.page_number
-        text = chunk.chunk_text
-        source_type = getattr(chunk, 'source_type', 'rulebook')
+    """
+    Format chunks as context for the prompt.
+    
+    With settings.compact_chunk_prompt, one header line and then one
+    tab-separated row per chunk, which costs far fewer tokens than a
+    bracketed preamble per chunk. Whitespace inside the text is collapsed
+    to keep each chunk on its row; citation verification normalizes
+    whitespace, so verbatim quotes still match.
+    """
+    if get_settings().compact_chunk_prompt:
+        buf = [CHUNKS_TABLE_HEADER]
+        for chunk in chunks:
+            source_type = getattr(chunk, 'source_type', 'rulebook')
+            text = _WS_RE.sub(" ", chunk.chunk_text).strip()
+            buf.append(f"\n{chunk.id}\t{chunk.page_number}\t{source_type}\t{text}")
         
-        formatted.append(f"""[Chunk {chunk_id}] (Page {page}, {source_type})
-{text}
-""")
+        return "".join(buf)
     
-    return "\n---\n".join(formatted)
+    buf = []
+    for i, chunk in enumerate(chunks):
+        if i:
+            buf.append("\n---\n")
+        source_type = getattr(chunk, 'source_type', 'rulebook')
+        buf.append(f"[Chunk {chunk.id}] (Page {chunk.page_number}, {source_type})\n")
+        buf.append(chunk.chunk_text)
+        buf.append("\n")
+    
+    return "".join(buf)
+
+
+def _system_prompt(prompt: str) -> str:
+    """System prompt matching the chunk format in use."""
+    if get_settings().compact_chunk_prompt:
+        return prompt + CHUNKS_TABLE_CITATION_NOTE
+    return prompt
+
+
+def _usage_info(usage: Any, model: str) -> dict[str, Any]:
+    """Token usage of one completion, in the shape /ask logs to costs."""
+    return {
+        "input_tokens": usage.prompt_tokens,
+        "output_tokens": usage.completion_tokens,
+        "model": model,
+    }
 
 
 def generate_answer(
@@ -76,6 +134,8 @@ def generate_answer(
     chunks: list[RuleChunk | RuleChunkSearchResult],
     game_name: str,
     edition: str | None = None,
+    chunks_text: str | None = None,
+    model: str = ANSWER_MODEL,
 ) -> dict[str, Any]:
     """
     Generate an answer to a rules question using retrieved chunks.
@@ -85,6 +145,8 @@ def generate_answer(
         chunks: Retrieved relevant rule chunks
         game_name: Name of the game
         edition: Optional edition string
+        chunks_text: Pre-formatted chunks, to avoid re-formatting on retries
+        model: OpenAI model to answer with
         
     Returns:
         Dict with verdict, quote, confidence, etc.
@@ -101,7 +163,8 @@ def generate_answer(
         }
     
     # Format chunks for context
-    chunks_text = format_chunks_for_prompt(chunks)
+    if chunks_text is None:
+        chunks_text = format_chunks_for_prompt(chunks)
     
     # Build the user prompt
     edition_str = f" ({edition})" if edition else ""
@@ -126,21 +189,20 @@ Answer as valid JSON:
 REMEMBER:
 - Verdict should be 2-4 sentences, not just "yes" or "no"
 - If you found relevant rules, confidence is "high" or "medium"
-- Only use "low" if the excerpts don't mention the topic
-
-JSON only:"""
+- Only use "low" if the excerpts don't mention the topic"""
 
     client = get_openai_client()
     
     try:
         response = client.chat.completions.create(
-            model=ANSWER_MODEL,
+            model=model,
             messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "system", "content": _system_prompt(SYSTEM_PROMPT)},
                 {"role": "user", "content": user_prompt},
             ],
             max_tokens=MAX_TOKENS,
             temperature=0.1,  # Low temperature for consistency
+            response_format=JSON_RESPONSE_FORMAT,
         )
         
         content = response.choices[0].message.content
@@ -150,11 +212,7 @@ JSON only:"""
         
         # Add usage info
         if response.usage:
-            result["_usage"] = {
-                "input_tokens": response.usage.prompt_tokens,
-                "output_tokens": response.usage.completion_tokens,
-                "model": response.model
-            }
+            result["_usages"] = [_usage_info(response.usage, model)]
         
         # Validate and fix the response
         result = validate_and_fix_response(result, chunks)
@@ -174,19 +232,60 @@ JSON only:"""
         }
 
 
+def _extract_first_json_object(s: str) -> str | None:
+    """
+    Return the first balanced {...} object in s, or None.
+    
+    A single linear scan that tracks brace depth and skips braces inside
+    string literals, instead of a nested-quantifier regex that backtracks
+    badly on long responses.
+    """
+    start = s.find("{")
+    if start == -1:
+        return None
+    
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(s)):
+        ch = s[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return s[start:i + 1]
+    
+    return None
+
+
 def parse_answer_json(content: str) -> dict[str, Any]:
-    """Parse JSON from LLM response, handling common issues."""
+    """
+    Parse the JSON object from a JSON-mode LLM response.
+    
+    JSON mode rules out fences and surrounding prose; parsing can still
+    fail if the output was cut off at max_tokens. Fenced or embedded
+    objects are still extracted in case JSON mode is ever bypassed.
+    """
     if not content:
         return {}
     
-    # Try direct JSON parse first
     try:
         return json.loads(content)
     except json.JSONDecodeError:
         pass
     
     # Try to extract JSON from markdown code blocks
-    json_match = re.search(r'```(?:json)?\s*\n?(.*?)\n?```', content, re.DOTALL)
+    json_match = _CODE_FENCE_RE.search(content)
     if json_match:
         try:
             return json.loads(json_match.group(1))
@@ -194,10 +293,10 @@ def parse_answer_json(content: str) -> dict[str, Any]:
             pass
     
     # Try to find JSON object in content
-    json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', content, re.DOTALL)
-    if json_match:
+    json_text = _extract_first_json_object(content)
+    if json_text:
         try:
-            return json.loads(json_match.group(0))
+            return json.loads(json_text)
         except json.JSONDecodeError:
             pass
     
@@ -293,14 +392,7 @@ def estimate_answer_quality(
     conflict = bool(result.get("conflict_note"))
     
     # 4. Calculate confidence
-    context = {
-        "verify_ok": verify_ok,
-        "s_top": s_top,
-        "s_gap": s_gap,
-        "conflict": conflict,
-    }
-    
-    confidence, details = calculate_confidence(context)
+    confidence, details = calculate_confidence(verify_ok, s_top, s_gap, conflict)
     return confidence, details['reason']
 
 
@@ -316,11 +408,74 @@ CRITICAL RULES:
 6. Be accurate above all else"""
 
 
+def _stream_json_completion(
+    client: OpenAI,
+    messages: list[dict[str, str]],
+    model: str,
+) -> tuple[str | None, Any]:
+    """
+    Stream a zero-temperature JSON completion.
+    
+    The stream is closed as soon as the first STREAM_PREFIX_CHECK_CHARS
+    characters show the output isn't an answer object, instead of waiting
+    for the full malformed response.
+    
+    Returns:
+        (full response text, token usage), or (None, estimated usage) if
+        the stream was aborted - a closed stream never reports its usage,
+        but the tokens sent and received so far are still billed
+    """
+    stream = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        max_tokens=MAX_TOKENS,
+        temperature=0.0,  # Zero temperature for maximum determinism
+        response_format=JSON_RESPONSE_FORMAT,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    
+    parts = []
+    length = 0
+    prefix_checked = False
+    usage = None
+    try:
+        for event in stream:
+            if event.usage:
+                # Sent in a final event with no choices
+                usage = event.usage
+            if not event.choices:
+                continue
+            delta = event.choices[0].delta.content
+            if not delta:
+                continue
+            parts.append(delta)
+            length += len(delta)
+            
+            if not prefix_checked and length >= STREAM_PREFIX_CHECK_CHARS:
+                prefix_checked = True
+                text = "".join(parts)
+                if not _ANSWER_PREFIX_RE.match(text.lstrip()):
+                    prompt_tokens = count_tokens_estimate("".join(m["content"] for m in messages))
+                    completion_tokens = count_tokens_estimate(text)
+                    return None, CompletionUsage(
+                        prompt_tokens=prompt_tokens,
+                        completion_tokens=completion_tokens,
+                        total_tokens=prompt_tokens + completion_tokens,
+                    )
+    finally:
+        stream.close()
+    
+    return "".join(parts), usage
+
+
 def generate_answer_strict(
     question: str,
     chunks: list[RuleChunk | RuleChunkSearchResult],
     game_name: str,
     edition: str | None = None,
+    chunks_text: str | None = None,
+    model: str = STRICT_MODEL,
 ) -> dict[str, Any]:
     """
     Generate answer with stricter quote requirements.
@@ -329,7 +484,8 @@ def generate_answer_strict(
     if not chunks:
         return generate_answer(question, chunks, game_name, edition)
     
-    chunks_text = format_chunks_for_prompt(chunks)
+    if chunks_text is None:
+        chunks_text = format_chunks_for_prompt(chunks)
     edition_str = f" ({edition})" if edition else ""
     
     user_prompt = f"""Game: {game_name}{edition_str}
@@ -350,32 +506,135 @@ Respond with valid JSON:
   "source_type": "rulebook or faq or errata",
   "confidence": "high or medium or low",
   "notes": []
-}}
-
-Only JSON, no other text."""
+}}"""
 
     client = get_openai_client()
+    messages = [
+        {"role": "system", "content": _system_prompt(STRICT_SYSTEM_PROMPT)},
+        {"role": "user", "content": user_prompt},
+    ]
     
+    usages = []
     try:
-        response = client.chat.completions.create(
-            model=ANSWER_MODEL,
-            messages=[
-                {"role": "system", "content": STRICT_SYSTEM_PROMPT},
-                {"role": "user", "content": user_prompt},
-            ],
-            max_tokens=MAX_TOKENS,
-            temperature=0.0,  # Zero temperature for maximum determinism
-        )
+        content, usage = _stream_json_completion(client, messages, model)
+        if content is None:
+            logger.warning("Strict answer stream did not start with an answer object, retrying without streaming")
+            usages.append(_usage_info(usage, model))
+            response = client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=MAX_TOKENS,
+                temperature=0.0,  # Zero temperature for maximum determinism
+                response_format=JSON_RESPONSE_FORMAT,
+            )
+            content = response.choices[0].message.content
+            usage = response.usage
         
-        content = response.choices[0].message.content
         result = parse_answer_json(content)
+        
+        # Add usage info, including any aborted stream's
+        if usage:
+            usages.append(_usage_info(usage, model))
+        result["_usages"] = usages
+        
         result = validate_and_fix_response(result, chunks)
         
         return result
         
     except Exception as e:
         logger.error(f"Failed to generate strict answer: {e}")
-        return generate_answer(question, chunks, game_name, edition)
+        result = generate_answer(question, chunks, game_name, edition)
+        result["_usages"] = usages + result.get("_usages", [])
+        return result
+
+
+def _apply_verification(
+    result: dict[str, Any],
+    chunks: list[RuleChunk | RuleChunkSearchResult],
+    conflict_note: str | None,
+    chunks_by_id: dict[int, RuleChunk | RuleChunkSearchResult] | None = None,
+) -> str | None:
+    """
+    Verify a generated answer's citation and mark the result if it holds.
+    
+    Returns:
+        The verification method if the quote verified, else None
+    """
+    from app.services.citation_verifier import verify_citation
+    
+    if not (result.get("quote_exact") and result.get("quote_chunk_id")):
+        return None
+    
+    verification = verify_citation(
+        quote=result["quote_exact"],
+        chunk_id=result["quote_chunk_id"],
+        chunks=chunks,
+        chunks_by_id=chunks_by_id,
+    )
+    if not verification["verified"]:
+        return None
+    
+    result["verified_quote"] = True
+    result["verification_method"] = verification["method"]
+    if verification.get("distance"):
+        result["verification_distance"] = verification["distance"]
+    
+    # Add conflict note if present
+    if conflict_note:
+        result["conflict_note"] = conflict_note
+        notes = result.get("notes", [])
+        notes.append(conflict_note)
+        result["notes"] = notes
+    
+    return verification["method"]
+
+
+def _log_speculative_cost(future: Future) -> None:
+    """
+    Record a speculative call's token usage to costs once it finishes.
+    
+    Runs whether or not the result ends up being used: cancel() can't stop
+    a call that has already started, and it is billed either way.
+    """
+    if future.cancelled() or future.exception() is not None:
+        return
+    usages = future.result().get("_usages")
+    if not usages:
+        return
+    
+    from app.db.connection import get_sync_connection
+    from app.db.repositories.costs import CostsRepository
+    from app.services.cost_calculator import calculate_cost
+    
+    try:
+        with get_sync_connection() as conn:
+            repo = CostsRepository(conn)
+            for usage in usages:
+                repo.log_cost_sync(ApiCostCreate(
+                    request_id=str(uuid.uuid4()),
+                    endpoint="/ask",
+                    model=usage["model"],
+                    input_tokens=usage["input_tokens"],
+                    output_tokens=usage["output_tokens"],
+                    cost_usd=calculate_cost(usage["model"], usage["input_tokens"], usage["output_tokens"]),
+                    cache_hit=False,
+                ))
+    except Exception as e:
+        logger.warning(f"Failed to log speculative answer cost: {e}")
+
+
+def select_first_model(question: str, conflict_note: str | None = None) -> str:
+    """
+    Pick the model for the first answer attempt.
+    
+    Short questions without conflicting sources go to PRIMARY_MODEL. Long
+    (usually multi-part) questions and conflicts need more reasoning, so
+    they start on STRICT_MODEL rather than paying for a cheap attempt that
+    is likely to fail verification.
+    """
+    if conflict_note or len(question) > SIMPLE_QUESTION_MAX_CHARS:
+        return STRICT_MODEL
+    return PRIMARY_MODEL
 
 
 def generate_answer_with_verification(
@@ -389,12 +648,26 @@ def generate_answer_with_verification(
     Generate an answer with citation verification and regeneration fallback.
     
     Process:
-    1. Generate initial answer
+    1. Generate initial answer with select_first_model() (PRIMARY_MODEL
+       for simple questions)
     2. Verify the citation
-    3. If verification fails, regenerate with stricter prompt
+    3. If verification fails, regenerate with stricter prompt and STRICT_MODEL
     4. Verify again
     5. If still fails, return fallback response
     
+    With settings.speculative_verify, the stricter attempt starts in the
+    background alongside the first one and is only waited on if the first
+    fails verification; otherwise its result is discarded. Its token usage
+    is logged to costs when it finishes either way.
+    
+    The result's "_usages" lists the token usage of every other LLM call
+    made, for the caller to log, and "_model" names the model whose answer
+    was returned.
+    
+    This does no caching itself: /ask checks the exact and semantic answer
+    caches before retrieval and caches verified answers afterwards, in the
+    response shape the caches hold.
+    
     Args:
         question: The user's rules question
         chunks: Retrieved relevant rule chunks
@@ -405,10 +678,7 @@ def generate_answer_with_verification(
     Returns:
         Dict with verdict, verified_quote, and other fields
     """
-    from app.services.citation_verifier import (
-        verify_citation,
-        get_relevant_sections,
-    )
+    from app.services.citation_verifier import get_relevant_sections, index_chunks
     
     if not chunks:
         return {
@@ -422,71 +692,74 @@ def generate_answer_with_verification(
             "notes": ["No indexed rules found for this game."],
         }
     
-    # ========================================================================
-    # First Attempt
-    # ========================================================================
+    # Both attempts share the same formatted context and chunk lookup
+    chunks_text = format_chunks_for_prompt(chunks)
+    chunks_by_id = index_chunks(chunks)
+    
+    executor = None
+    strict_future = None
+    if get_settings().speculative_verify:
+        executor = ThreadPoolExecutor(max_workers=1)
+        strict_future = executor.submit(
+            generate_answer_strict, question, chunks, game_name, edition,
+            chunks_text=chunks_text,
+        )
+        strict_future.add_done_callback(_log_speculative_cost)
     
-    logger.info("Generating answer (attempt 1)...")
-    result = generate_answer(question, chunks, game_name, edition)
+    usages = []
     
-    # Verify citation if we have one
-    if result.get("quote_exact") and result.get("quote_chunk_id"):
-        verification = verify_citation(
-            quote=result["quote_exact"],
-            chunk_id=result["quote_chunk_id"],
-            chunks=chunks,
+    try:
+        # ====================================================================
+        # First Attempt
+        # ====================================================================
+        
+        first_model = select_first_model(question, conflict_note)
+        logger.info(f"Generating answer (attempt 1, model={first_model})...")
+        result = generate_answer(
+            question, chunks, game_name, edition,
+            chunks_text=chunks_text, model=first_model,
         )
+        usages.extend(result.get("_usages", []))
         
-        if verification["verified"]:
-            result["verified_quote"] = True
-            result["verification_method"] = verification["method"]
-            if verification.get("distance"):
-                result["verification_distance"] = verification["distance"]
-            
-            # Add conflict note if present
-            if conflict_note:
-                result["conflict_note"] = conflict_note
-                notes = result.get("notes", [])
-                notes.append(conflict_note)
-                result["notes"] = notes
-            
-            logger.info(f"Citation verified on first attempt ({verification['method']})")
+        method = _apply_verification(result, chunks, conflict_note, chunks_by_id)
+        if method:
+            if strict_future:
+                # Only stops the call if it hasn't started yet
+                strict_future.cancel()
+            logger.info(f"Citation verified on first attempt ({method}, model={first_model})")
+            result["_usages"] = usages
+            result["_model"] = first_model
             return result
         
-        logger.warning("Citation verification failed on first attempt")
-    
-    # ========================================================================
-    # Second Attempt (Stricter)
-    # ========================================================================
-    
-    logger.info("Regenerating answer with stricter prompt (attempt 2)...")
-    result = generate_answer_strict(question, chunks, game_name, edition)
-    
-    # Verify again
-    if result.get("quote_exact") and result.get("quote_chunk_id"):
-        verification = verify_citation(
-            quote=result["quote_exact"],
-            chunk_id=result["quote_chunk_id"],
-            chunks=chunks,
-        )
+        if result.get("quote_exact") and result.get("quote_chunk_id"):
+            logger.warning(f"Citation verification failed on first attempt (model={first_model})")
         
-        if verification["verified"]:
-            result["verified_quote"] = True
-            result["verification_method"] = verification["method"]
-            if verification.get("distance"):
-                result["verification_distance"] = verification["distance"]
-            
-            # Add conflict note if present
-            if conflict_note:
-                result["conflict_note"] = conflict_note
-                notes = result.get("notes", [])
-                notes.append(conflict_note)
-                result["notes"] = notes
-            
-            logger.info(f"Citation verified on second attempt ({verification['method']})")
+        # ====================================================================
+        # Second Attempt (Stricter)
+        # ====================================================================
+        
+        if strict_future:
+            logger.info("Using speculative stricter answer (attempt 2)...")
+            # Copied: _log_speculative_cost may still be reading its "_usages"
+            result = dict(strict_future.result())
+        else:
+            logger.info("Regenerating answer with stricter prompt (attempt 2)...")
+            result = generate_answer_strict(question, chunks, game_name, edition, chunks_text=chunks_text)
+            usages.extend(result.get("_usages", []))
+        
+        method = _apply_verification(result, chunks, conflict_note, chunks_by_id)
+        if method:
+            logger.info(f"Citation verified on second attempt ({method}, model={STRICT_MODEL})")
+            result["_usages"] = usages
+            result["_model"] = STRICT_MODEL
             return result
         
-        logger.warning("Citation verification failed on second attempt")
+        if result.get("quote_exact") and result.get("quote_chunk_id"):
+            logger.warning(f"Citation verification failed on second attempt (model={STRICT_MODEL})")
+    finally:
+        if executor:
+            # Don't block on a discarded speculative call
+            executor.shutdown(wait=False)
     
     # ========================================================================
     # Fallback Response
@@ -515,6 +788,8 @@ def generate_answer_with_verification(
         "verified_quote": False,
         "relevant_sections": get_relevant_sections(chunks, max_sections=3),
         "notes": notes,
+        "_usages": usages,
+        "_model": STRICT_MODEL,
     }
     
     if conflict_note:
@@ -6,64 +6,68 @@ import time
 import logging
 import hashlib
 import json
-from typing import Any
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any
 from functools import lru_cache
 
-import redis.asyncio as redis
-from app.config import get_settings
+from app.redis_client import get_async_redis
 from app.services.normalizer import normalize_question
 
+if TYPE_CHECKING:
+    from app.db.repositories.chunks import ChunksRepository
+
 
 logger = logging.getLogger(__name__)
 
 
 class TTLCache:
-    """Simple TTL cache for embeddings."""
+    """
+    Simple LRU cache with a TTL, for embeddings.
+    
+    Entries are kept in recency order so get/set/evict are all O(1). A lock
+    guards mutations since the sync embedding path calls in from worker
+    threads.
+    """
     
     def __init__(self, ttl_seconds: int = 300, max_size: int = 1000):
-        self._cache: dict[str, tuple[Any, float]] = {}
+        self._cache: OrderedDict[str, tuple[Any, float]] = OrderedDict()
         self._ttl = ttl_seconds
         self._max_size = max_size
+        self._lock = threading.Lock()
     
     def get(self, key: str) -> Any | None:
         """Get value if exists and not expired."""
-        if key not in self._cache:
-            return None
-        
-        value, timestamp = self._cache[key]
-        if time.time() - timestamp > self._ttl:
-            # Expired
-            del self._cache[key]
-            return None
-        
-        return value
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            
+            value, timestamp = entry
+            if time.time() - timestamp > self._ttl:
+                # Expired
+                del self._cache[key]
+                return None
+            
+            self._cache.move_to_end(key)
+            return value
     
     def set(self, key: str, value: Any) -> None:
         """Set value with current timestamp."""
-        # Evict if at max size
-        if len(self._cache) >= self._max_size:
-            self._evict_oldest()
-        
-        self._cache[key] = (value, time.time())
-    
-    def _evict_oldest(self) -> None:
-        """Remove oldest entries."""
-        if not self._cache:
-            return
-        
-        # Sort by timestamp and remove oldest 10%
-        sorted_keys = sorted(
-            self._cache.keys(),
-            key=lambda k: self._cache[k][1]
-        )
-        
-        to_remove = max(1, len(sorted_keys) // 10)
-        for key in sorted_keys[:to_remove]:
-            del self._cache[key]
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+            else:
+                # Evict least recently used entries if at max size
+                while len(self._cache) >= self._max_size:
+                    self._cache.popitem(last=False)
+            
+            self._cache[key] = (value, time.time())
     
     def clear(self) -> None:
         """Clear all cache entries."""
-        self._cache.clear()
+        with self._lock:
+            self._cache.clear()
     
     def stats(self) -> dict:
         """Get cache statistics."""
@@ -130,30 +134,36 @@ def get_cache_stats() -> dict:
 # Redis Answer Cache
 # ============================================================================
 
+def _cache_scope(edition: str | None, expansion_ids: list[int]) -> tuple[str, str]:
+    """(edition_str, exp_hash) scoping cached answers to one edition and expansion set."""
+    # Sort expansion IDs
+    exp_payload = ",".join(map(str, sorted(expansion_ids or []))).encode()
+    exp_hash = hashlib.blake2b(exp_payload, digest_size=4).hexdigest()
+    return edition or "base", exp_hash
+
+
+def _dump_answer(answer: dict[str, Any]) -> str:
+    """Serialize an answer dict, including any Pydantic models in it (e.g. citations)."""
+    return json.dumps(answer, default=lambda o: o.model_dump() if hasattr(o, "model_dump") else str(o))
+
+
 def generate_cache_key(game_id: int, edition: str | None, expansion_ids: list[int], question: str) -> str:
     """Generate a consistent cache key using normalized question."""
-    # Sort expansion IDs
-    exp_hash = hashlib.md5(json.dumps(sorted(expansion_ids or [])).encode()).hexdigest()[:8]
+    edition_str, exp_hash = _cache_scope(edition, expansion_ids)
     
     # Normalize question
     norm_q = normalize_question(question)
-    q_hash = hashlib.md5(norm_q.encode()).hexdigest()[:12]
-    
-    edition_str = edition or "base"
+    q_hash = hashlib.blake2b(norm_q.encode(), digest_size=6).hexdigest()
     
     return f"answer:{game_id}:{edition_str}:{exp_hash}:{q_hash}"
 
 
 async def get_cached_answer(key: str) -> dict[str, Any] | None:
     """Get answer from Redis cache."""
-    settings = get_settings()
     try:
-        # Note: In production, use a shared connection pool
-        client = redis.from_url(settings.redis_url, decode_responses=True)
-        async with client:
-            data = await client.get(key)
-            if data:
-                return json.loads(data)
+        data = await get_async_redis().get(key)
+        if data:
+            return json.loads(data)
     except Exception as e:
         logger.warning(f"Redis cache get failed: {e}")
     return None
@@ -161,11 +171,144 @@ async def get_cached_answer(key: str) -> dict[str, Any] | None:
 
 async def cache_answer(key: str, answer: dict[str, Any], ttl: int = 86400) -> None:
     """Cache answer in Redis."""
-    settings = get_settings()
     try:
-        client = redis.from_url(settings.redis_url, decode_responses=True)
-        async with client:
-            await client.set(key, json.dumps(answer), ex=ttl)
+        await get_async_redis().set(key, _dump_answer(answer), ex=ttl)
     except Exception as e:
         logger.warning(f"Redis cache set failed: {e}")
 
+
+# ============================================================================
+# Semantic Answer Cache (Postgres + pgvector)
+# ============================================================================
+
+# Minimum cosine similarity for a paraphrase to reuse a cached answer
+SEMANTIC_CACHE_THRESHOLD = 0.92
+SEMANTIC_CACHE_TTL = 86400  # seconds, same as the Redis answer cache
+# A hit is only served if its cited chunk is in the new question's top-K
+SEMANTIC_CACHE_GUARD_TOP_K = 5
+
+
+async def semantic_get(
+    game_id: int,
+    edition: str | None,
+    expansion_ids: list[int],
+    query_embedding: list[float],
+    chunks_repo: "ChunksRepository",
+    source_ids: list[int],
+    threshold: float = SEMANTIC_CACHE_THRESHOLD,
+) -> dict[str, Any] | None:
+    """
+    Find a cached answer for a similar question in the same scope.
+    
+    Follow-ups ("what about in the endgame?") often embed close to the
+    question they follow, so similarity alone gives false hits. A hit is
+    only served if the chunk its citation quotes is among the top
+    SEMANTIC_CACHE_GUARD_TOP_K chunks for the new question, which costs
+    one vector search on hits only.
+    
+    Args:
+        game_id: The game being asked about
+        edition: Edition queried against (None for base)
+        expansion_ids: Enabled expansion IDs
+        query_embedding: Embedding of the new question
+        chunks_repo: Repository used for the guard's vector search
+        source_ids: Sources the new question is answered from
+        threshold: Minimum cosine similarity for a hit
+        
+    Returns:
+        The cached response body, or None on a miss
+    """
+    from app.db.connection import get_async_cursor
+    from app.db.repositories.base import to_vector_literal
+    
+    edition_str, exp_hash = _cache_scope(edition, expansion_ids)
+    embedding_str = to_vector_literal(query_embedding)
+    
+    query = """
+        SELECT answer_json, 1 - (embedding <=> %s::vector) AS similarity
+        FROM answer_cache_embeddings
+        WHERE game_id = %s AND edition = %s AND exp_hash = %s
+              AND created_at > NOW() - make_interval(secs => %s)
+        ORDER BY embedding <=> %s::vector
+        LIMIT 1
+    """
+    try:
+        async with get_async_cursor() as cur:
+            await cur.execute(query, (
+                embedding_str, game_id, edition_str, exp_hash, SEMANTIC_CACHE_TTL, embedding_str
+            ))
+            row = await cur.fetchone()
+    except Exception as e:
+        logger.warning(f"Semantic cache get failed: {e}")
+        return None
+    
+    if not row or row["similarity"] < threshold:
+        return None
+    
+    answer = row["answer_json"]
+    if isinstance(answer, str):
+        answer = json.loads(answer)
+    
+    # Context guard: the cited chunk must still be relevant to this question
+    citations = answer.get("citations") or []
+    quote_chunk_id = citations[0].get("chunk_id") if citations else None
+    if quote_chunk_id is None:
+        return None
+    
+    try:
+        top_chunks = await chunks_repo.vector_search(
+            query_embedding,
+            source_ids=source_ids,
+            limit=SEMANTIC_CACHE_GUARD_TOP_K,
+            min_similarity=0.0,
+        )
+    except Exception as e:
+        logger.warning(f"Semantic cache guard search failed: {e}")
+        return None
+    
+    if quote_chunk_id not in {chunk.id for chunk in top_chunks}:
+        logger.debug(
+            f"Semantic cache near-hit rejected (similarity={row['similarity']:.3f}): "
+            f"chunk {quote_chunk_id} not in top {SEMANTIC_CACHE_GUARD_TOP_K}"
+        )
+        return None
+    
+    logger.debug(f"Semantic cache hit (similarity={row['similarity']:.3f})")
+    return answer
+
+
+async def semantic_put(
+    game_id: int,
+    edition: str | None,
+    expansion_ids: list[int],
+    question: str,
+    query_embedding: list[float],
+    answer: dict[str, Any],
+) -> None:
+    """
+    Store a verified answer for semantic cache lookups.
+    
+    Keyed by the normalized question within its scope, so answering the
+    same question again refreshes the row instead of adding another.
+    """
+    from app.db.connection import get_async_cursor
+    from app.db.repositories.base import to_vector_literal
+    
+    edition_str, exp_hash = _cache_scope(edition, expansion_ids)
+    
+    query = """
+        INSERT INTO answer_cache_embeddings (game_id, edition, exp_hash, question, embedding, answer_json)
+        VALUES (%s, %s, %s, %s, %s::vector, %s::jsonb)
+        ON CONFLICT (game_id, edition, exp_hash, question) DO UPDATE
+        SET embedding = EXCLUDED.embedding,
+            answer_json = EXCLUDED.answer_json,
+            created_at = NOW()
+    """
+    try:
+        async with get_async_cursor() as cur:
+            await cur.execute(query, (
+                game_id, edition_str, exp_hash, normalize_question(question),
+                to_vector_literal(query_embedding), _dump_answer(answer),
+            ))
+    except Exception as e:
+        logger.warning(f"Semantic cache put failed: {e}")
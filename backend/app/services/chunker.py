@@ -4,8 +4,19 @@ Splits text into overlapping chunks suitable for embedding.
 """
 
 import re
+from collections import deque
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
 
+from app.config import get_settings
+
+# Optional: blingfire's native sentence splitter (pip install blingfire)
+try:
+    from blingfire import text_to_sentences
+    BLINGFIRE_AVAILABLE = True
+except ImportError:
+    BLINGFIRE_AVAILABLE = False
+
 
 @dataclass
 class Chunk:
@@ -25,48 +36,45 @@ def estimate_tokens(text: str) -> int:
     return len(text) // 4
 
 
+# Abbreviations whose periods shouldn't end a sentence, as one alternation
+_ABBR_RE = re.compile(
+    r"\b(?:Mr|Mrs|Ms|Dr|Prof|Jr|Sr|Inc|Ltd|Corp|vs|etc)\.|\be\.g\.|\bi\.e\.",
+    re.IGNORECASE,
+)
+_DECIMAL_RE = re.compile(r"(\d)\.(\d)")
+_WS_RE = re.compile(r"\s+")
+# Period, exclamation or question mark followed by space and a capital
+_SENT_SPLIT_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z])")
+
+
+def _protect_dots(match: re.Match) -> str:
+    return match.group(0).replace(".", "<<DOT>>")
+
+
 def split_into_sentences(text: str) -> list[str]:
     """
     Split text into sentences using regex.
     Handles common abbreviations and edge cases.
+    
+    With settings.fast_sentence_splitter and blingfire installed, splitting
+    is done in one native pass instead.
     """
     # Normalize whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = _WS_RE.sub(' ', text).strip()
     
     if not text:
         return []
     
-    # Split on sentence boundaries
-    # This regex handles:
-    # - Period, exclamation, question mark followed by space and capital
-    # - Handles common abbreviations (Mr., Mrs., Dr., etc.)
-    # - Preserves numbers with decimals (3.14)
-    
-    # First, protect common abbreviations
-    protected = text
-    abbreviations = [
-        (r'Mr\.', 'Mr<<DOT>>'),
-        (r'Mrs\.', 'Mrs<<DOT>>'),
-        (r'Ms\.', 'Ms<<DOT>>'),
-        (r'Dr\.', 'Dr<<DOT>>'),
-        (r'Prof\.', 'Prof<<DOT>>'),
-        (r'Jr\.', 'Jr<<DOT>>'),
-        (r'Sr\.', 'Sr<<DOT>>'),
-        (r'Inc\.', 'Inc<<DOT>>'),
-        (r'Ltd\.', 'Ltd<<DOT>>'),
-        (r'Corp\.', 'Corp<<DOT>>'),
-        (r'vs\.', 'vs<<DOT>>'),
-        (r'e\.g\.', 'e<<DOT>>g<<DOT>>'),
-        (r'i\.e\.', 'i<<DOT>>e<<DOT>>'),
-        (r'etc\.', 'etc<<DOT>>'),
-        (r'(\d)\.(\d)', r'\1<<DECIMAL>>\2'),  # Decimal numbers
-    ]
-    
-    for pattern, replacement in abbreviations:
-        protected = re.sub(pattern, replacement, protected, flags=re.IGNORECASE)
+    if BLINGFIRE_AVAILABLE and get_settings().fast_sentence_splitter:
+        # One sentence per line in the output
+        return [sent for sent in text_to_sentences(text).split('\n') if sent.strip()]
+    
+    # Protect common abbreviations (Mr., e.g., etc.) and decimals (3.14)
+    protected = _ABBR_RE.sub(_protect_dots, text)
+    protected = _DECIMAL_RE.sub(r'\1<<DECIMAL>>\2', protected)
     
     # Split on sentence-ending punctuation
-    sentences = re.split(r'(?<=[.!?])\s+(?=[A-Z])', protected)
+    sentences = _SENT_SPLIT_RE.split(protected)
     
     # Restore protected text
     result = []
@@ -109,17 +117,22 @@ def chunk_text(
         # If no sentences detected, treat whole text as one sentence
         sentences = [text.strip()]
     
+    # Token estimates computed once per sentence
+    sentence_token_counts = [estimate_tokens(sentence) for sentence in sentences]
+    
     chunks: list[Chunk] = []
-    current_sentences: list[str] = []
+    # Current chunk's sentences with their token estimates; window_tokens is
+    # their running sum, used to trim the overlap without re-summing
+    current_sentences: deque[str] = deque()
+    current_sentence_tokens: deque[int] = deque()
+    window_tokens = 0
     current_tokens = 0
     chunk_index = start_index
     
     # Calculate overlap in tokens
     overlap_tokens = int(max_tokens * overlap)
     
-    for sentence in sentences:
-        sentence_tokens = estimate_tokens(sentence)
-        
+    for sentence, sentence_tokens in zip(sentences, sentence_token_counts):
         # If single sentence exceeds max, split it
         if sentence_tokens > max_tokens:
             # Flush current chunk if any
@@ -133,12 +146,15 @@ def chunk_text(
                     estimated_tokens=estimate_tokens(chunk_text_str),
                 ))
                 chunk_index += 1
-                current_sentences = []
+                current_sentences.clear()
+                current_sentence_tokens.clear()
+                window_tokens = 0
                 current_tokens = 0
             
             # Split long sentence by words
             words = sentence.split()
             word_chunk: list[str] = []
+            word_chunk_tokens: list[int] = []
             word_tokens = 0
             
             for word in words:
@@ -156,15 +172,21 @@ def chunk_text(
                     
                     # Keep overlap words
                     overlap_word_count = max(1, len(word_chunk) // 2)
-                    word_chunk = word_chunk[-overlap_word_count:]
-                    word_tokens = sum(estimate_tokens(w + ' ') for w in word_chunk)
+                    dropped = len(word_chunk) - overlap_word_count
+                    word_tokens -= sum(word_chunk_tokens[:dropped])
+                    word_chunk = word_chunk[dropped:]
+                    word_chunk_tokens = word_chunk_tokens[dropped:]
                 
                 word_chunk.append(word)
+                word_chunk_tokens.append(word_token_count)
                 word_tokens += word_token_count
             
             # Add remaining words
             if word_chunk:
-                current_sentences = [' '.join(word_chunk)]
+                remainder = ' '.join(word_chunk)
+                current_sentences.append(remainder)
+                current_sentence_tokens.append(estimate_tokens(remainder))
+                window_tokens = current_sentence_tokens[0]
                 current_tokens = word_tokens
             continue
         
@@ -181,23 +203,18 @@ def chunk_text(
             ))
             chunk_index += 1
             
-            # Calculate overlap: keep sentences that fit in overlap_tokens
-            overlap_sentences: list[str] = []
-            overlap_token_count = 0
-            
-            for sent in reversed(current_sentences):
-                sent_tokens = estimate_tokens(sent)
-                if overlap_token_count + sent_tokens <= overlap_tokens:
-                    overlap_sentences.insert(0, sent)
-                    overlap_token_count += sent_tokens
-                else:
-                    break
+            # Overlap: keep the longest run of trailing sentences that fits
+            # in overlap_tokens
+            while current_sentences and window_tokens > overlap_tokens:
+                current_sentences.popleft()
+                window_tokens -= current_sentence_tokens.popleft()
             
-            current_sentences = overlap_sentences
-            current_tokens = overlap_token_count
+            current_tokens = window_tokens
         
         # Add sentence to current chunk
         current_sentences.append(sentence)
+        current_sentence_tokens.append(sentence_tokens)
+        window_tokens += sentence_tokens
         current_tokens += sentence_tokens
     
     # Don't forget the last chunk
@@ -230,7 +247,28 @@ def chunk_document(
     Returns:
         List of all Chunk objects for the document
     """
-    all_chunks: list[Chunk] = []
+    return list(iter_document_chunks(pages, max_tokens=max_tokens, overlap=overlap))
+
+
+def iter_document_chunks(
+    pages: Iterable[tuple[int, str]],
+    max_tokens: int = 400,
+    overlap: float = 0.5,
+) -> Iterator[Chunk]:
+    """
+    Yield a document's chunks page by page, as chunk_document would return them.
+    
+    Lets a consumer (e.g. the embedder) start on early chunks while later
+    pages are still being chunked.
+    
+    Args:
+        pages: (page_number, page_text) tuples
+        max_tokens: Target maximum tokens per chunk
+        overlap: Fraction of overlap between chunks
+        
+    Yields:
+        Chunk objects with document-wide chunk indices
+    """
     chunk_index = 0
     
     for page_number, page_text in pages:
@@ -241,9 +279,7 @@ def chunk_document(
             overlap=overlap,
             start_index=chunk_index,
         )
-        all_chunks.extend(page_chunks)
+        yield from page_chunks
         
         if page_chunks:
             chunk_index = page_chunks[-1].chunk_index + 1
-    
-    return all_chunks
@@ -6,16 +6,26 @@ This module provides two-pass verification:
 2. Fuzzy match: Allows small edits (typos, whitespace differences)
 """
 
-import re
 import logging
+from functools import lru_cache
 from typing import Any
 
 from app.db.models import RuleChunk, RuleChunkSearchResult
-from app.services.levenshtein import levenshtein_distance, find_best_match_window
+from app.services.levenshtein import (
+    levenshtein_distance,
+    find_best_match_window,
+    rank_by_partial_similarity,
+)
 
 
 logger = logging.getLogger(__name__)
 
+# Normalized chunk bodies kept across verifications (a few MB at most)
+NORMALIZED_CHUNK_CACHE_SIZE = 8192
+
+# q-gram length for the fuzzy-match prescreen
+QGRAM_SIZE = 3
+
 
 def normalize_text(text: str) -> str:
     """
@@ -34,12 +44,21 @@ def normalize_text(text: str) -> str:
     if not text:
         return ""
     
-    # Collapse all whitespace (including newlines, tabs) to single space
-    normalized = re.sub(r'\s+', ' ', text)
-    # Strip and lowercase
-    normalized = normalized.strip().lower()
+    # Collapse all whitespace (including newlines, tabs) to single space;
+    # split() also drops leading/trailing whitespace
+    return ' '.join(text.split()).lower()
+
+
+@lru_cache(maxsize=NORMALIZED_CHUNK_CACHE_SIZE)
+def normalize_chunk_text(text: str) -> str:
+    """
+    Normalize a chunk's text, caching the result.
     
-    return normalized
+    The same retrieved chunks are verified again and again across queries
+    and attempts, so their normalized form is kept rather than rebuilt.
+    Keyed by the text itself, so edited chunks can't return stale text.
+    """
+    return normalize_text(text)
 
 
 def normalize_for_display(text: str) -> str:
@@ -56,7 +75,21 @@ def normalize_for_display(text: str) -> str:
         return ""
     
     # Collapse whitespace but keep case
-    return re.sub(r'\s+', ' ', text).strip()
+    return ' '.join(text.split())
+
+
+def index_chunks(
+    chunks: list[RuleChunk | RuleChunkSearchResult],
+) -> dict[int, RuleChunk | RuleChunkSearchResult]:
+    """
+    Map chunk id to chunk, for verifying several citations against one retrieval.
+    
+    The first chunk wins if an id repeats, matching a front-to-back scan.
+    """
+    by_id = {}
+    for chunk in chunks:
+        by_id.setdefault(chunk.id, chunk)
+    return by_id
 
 
 def verify_citation(
@@ -66,6 +99,7 @@ def verify_citation(
     max_exact_distance: int = 0,
     max_fuzzy_distance: int = 8,
     max_fuzzy_percent: float = 0.02,
+    chunks_by_id: dict[int, RuleChunk | RuleChunkSearchResult] | None = None,
 ) -> dict[str, Any]:
     """
     Verify a citation quote against a chunk's text.
@@ -81,6 +115,7 @@ def verify_citation(
         max_exact_distance: Max Levenshtein distance for "exact" match (0 = true exact)
         max_fuzzy_distance: Max absolute Levenshtein distance for fuzzy match
         max_fuzzy_percent: Max Levenshtein distance as percentage of quote length
+        chunks_by_id: index_chunks(chunks), if the caller already built it
         
     Returns:
         dict with:
@@ -103,11 +138,9 @@ def verify_citation(
         return result
     
     # Find the target chunk
-    target_chunk = None
-    for chunk in chunks:
-        if chunk.id == chunk_id:
-            target_chunk = chunk
-            break
+    if chunks_by_id is None:
+        chunks_by_id = index_chunks(chunks)
+    target_chunk = chunks_by_id.get(chunk_id)
     
     if not target_chunk:
         logger.warning(f"Chunk {chunk_id} not found in provided chunks")
@@ -120,7 +153,7 @@ def verify_citation(
     
     # Normalize texts for comparison
     normalized_quote = normalize_text(quote)
-    normalized_chunk = normalize_text(chunk_text)
+    normalized_chunk = normalize_chunk_text(chunk_text)
     
     # ========================================================================
     # Pass A: Exact Match
@@ -138,9 +171,6 @@ def verify_citation(
     # Pass B: Fuzzy Match
     # ========================================================================
     
-    # Find best matching window in the chunk
-    best_match, start_idx, distance = find_best_match_window(normalized_quote, normalized_chunk)
-    
     # Calculate thresholds
     max_allowed_distance = min(
         max_fuzzy_distance,
@@ -149,6 +179,11 @@ def verify_citation(
     # Ensure at least some tolerance
     max_allowed_distance = max(max_allowed_distance, max_fuzzy_distance)
     
+    # Find best matching window in the chunk, bounded by the threshold
+    best_match, start_idx, distance = find_best_match_window(
+        normalized_quote, normalized_chunk, max_distance=max_allowed_distance
+    )
+    
     if distance <= max_allowed_distance:
         result["verified"] = True
         result["method"] = "fuzzy"
@@ -200,7 +235,7 @@ def verify_citation_in_any_chunk(
         if not chunk.chunk_text:
             continue
         
-        normalized_chunk = normalize_text(chunk.chunk_text)
+        normalized_chunk = normalize_chunk_text(chunk.chunk_text)
         
         if normalized_quote in normalized_chunk:
             result["verified"] = True
@@ -212,28 +247,53 @@ def verify_citation_in_any_chunk(
             return result
     
     # Then try fuzzy match
+    max_allowed = max(
+        max_fuzzy_distance,
+        int(len(normalized_quote) * max_fuzzy_percent)
+    )
+    
     best_overall_distance = float('inf')
+    best_position = None
     best_chunk_id = None
     best_match_text = None
     
-    for chunk in chunks:
-        if not chunk.chunk_text:
+    candidates = [chunk for chunk in chunks if chunk.chunk_text]
+    normalized_chunks = [normalize_chunk_text(chunk.chunk_text) for chunk in candidates]
+    
+    # q-gram lemma: each edit destroys at most QGRAM_SIZE of the quote's
+    # distinct q-grams, so any text within distance k of the quote still
+    # contains len(qgrams) - QGRAM_SIZE * k of them. A chunk with fewer
+    # can't hold a close enough window and is skipped without the DP.
+    qgrams = {
+        normalized_quote[i:i + QGRAM_SIZE]
+        for i in range(len(normalized_quote) - QGRAM_SIZE + 1)
+    }
+    
+    # Visit the likeliest chunk first so the bound tightens early; ties
+    # still go to the earlier chunk, as in a plain in-order scan
+    for position in rank_by_partial_similarity(normalized_quote, normalized_chunks):
+        # Only a chunk that beats both the threshold and the best so far
+        # matters, so later chunks are scanned with a tighter bound
+        cutoff = int(min(best_overall_distance, max_allowed))
+        normalized_chunk = normalized_chunks[position]
+        
+        required = len(qgrams) - QGRAM_SIZE * cutoff
+        if required > 0 and sum(gram in normalized_chunk for gram in qgrams) < required:
             continue
         
-        normalized_chunk = normalize_text(chunk.chunk_text)
-        best_match, start_idx, distance = find_best_match_window(normalized_quote, normalized_chunk)
+        best_match, start_idx, distance = find_best_match_window(
+            normalized_quote, normalized_chunk, max_distance=cutoff
+        )
         
-        if distance < best_overall_distance:
+        if distance < best_overall_distance or (
+            distance == best_overall_distance and position < best_position
+        ):
             best_overall_distance = distance
-            best_chunk_id = chunk.id
+            best_position = position
+            best_chunk_id = candidates[position].id
             best_match_text = best_match
     
     # Check if best fuzzy match passes threshold
-    max_allowed = max(
-        max_fuzzy_distance,
-        int(len(normalized_quote) * max_fuzzy_percent)
-    )
-    
     if best_overall_distance <= max_allowed:
         result["verified"] = True
         result["method"] = "fuzzy"
@@ -3,53 +3,65 @@ Confidence calculation logic for The Arbiter.
 Determines verdict confidence based on strict mathematical thresholds.
 """
 
-from typing import Any
+
+REASON_HIGH = 'Strong match, verified quote, no conflicts'
+REASON_MEDIUM = 'Good match, verified quote'
+REASON_UNVERIFIED = 'Could not verify exact quote'
+REASON_CONFLICT = 'Multiple sources conflict'
+REASON_WEAK_MATCH = 'Weak semantic match'
+REASON_AMBIGUOUS = 'Ambiguous ruling'
 
 
 def get_low_reason(verify_ok: bool, s_top: float, conflict: bool) -> str:
     """Determine reason for low confidence."""
     if not verify_ok:
-        return 'Could not verify exact quote'
+        return REASON_UNVERIFIED
     if conflict:
-        return 'Multiple sources conflict'
+        return REASON_CONFLICT
     if s_top < 0.70:
-        return 'Weak semantic match'
-    return 'Ambiguous ruling'
+        return REASON_WEAK_MATCH
+    return REASON_AMBIGUOUS
 
 
-def calculate_confidence(context: dict[str, Any]) -> tuple[str, dict[str, str]]:
+def calculate_confidence(
+    verify_ok: bool = False,
+    s_top: float = 0.0,
+    s_gap: float = 0.0,
+    conflict: bool = False,
+    coverage: int | None = None,
+) -> tuple[str, dict[str, str]]:
     """
     Calculate confidence level and provide reason.
     
+    A context dict can still be passed as calculate_confidence(**context).
+    
     Args:
-        context: Dictionary containing:
-            - verify_ok: bool (citation verified)
-            - s_top: float (top chunk score, 0-1)
-            - s_gap: float (score difference between top 2 chunks)
-            - conflict: bool (contradictory sources detected)
-            - coverage: int (tracked for analytics, unused in logic)
+        verify_ok: Citation verified
+        s_top: Top chunk score, 0-1
+        s_gap: Score difference between top 2 chunks
+        conflict: Contradictory sources detected
+        coverage: Tracked for analytics, unused in logic
             
     Returns:
         Tuple of (confidence_level, reason_dict)
         confidence_level: 'high' | 'medium' | 'low'
-        reason_dict: {'reason': string}
+        reason_dict: {'reason': string}, a new dict per call
     """
-    verify_ok = context.get('verify_ok', False)
-    s_top = context.get('s_top', 0.0)
-    s_gap = context.get('s_gap', 0.0)
-    conflict = context.get('conflict', False)
+    # Anything unverified or conflicting is low; checked first since it
+    # rules out both higher levels at once
+    if not verify_ok or conflict:
+        return 'low', {'reason': get_low_reason(verify_ok, s_top, conflict)}
     
     # High confidence
     # Strict requirements: Verified, strong match, clear winner, no conflict
-    if verify_ok and s_top >= 0.85 and s_gap >= 0.08 and not conflict:
-        return 'high', {'reason': 'Strong match, verified quote, no conflicts'}
+    if s_top >= 0.85 and s_gap >= 0.08:
+        return 'high', {'reason': REASON_HIGH}
     
     # Medium confidence
     # Requirements: Verified, decent match, no conflict
-    if verify_ok and s_top >= 0.70 and not conflict:
-        return 'medium', {'reason': 'Good match, verified quote'}
+    if s_top >= 0.70:
+        return 'medium', {'reason': REASON_MEDIUM}
     
     # Low confidence
     # Anything else falls here
-    reason = get_low_reason(verify_ok, s_top, conflict)
-    return 'low', {'reason': reason}
+    return 'low', {'reason': get_low_reason(verify_ok, s_top, conflict)}
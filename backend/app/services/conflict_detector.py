@@ -2,14 +2,13 @@
 Conflict detector for identifying contradictory rules.
 """
 
+import asyncio
 import logging
 import json
 from typing import Any
 
-from openai import OpenAI
-
-from app.config import get_settings
 from app.db.models import RuleChunk, RuleChunkSearchResult
+from app.services.embeddings import get_openai_client
 
 
 logger = logging.getLogger(__name__)
@@ -18,13 +17,8 @@ logger = logging.getLogger(__name__)
 # Model for conflict detection
 CONFLICT_MODEL = "gpt-4o-mini"
 
-
-def get_openai_client() -> OpenAI:
-    """Get configured OpenAI client."""
-    settings = get_settings()
-    if not settings.openai_api_key:
-        raise ValueError("OPENAI_API_KEY not configured")
-    return OpenAI(api_key=settings.openai_api_key)
+# JSON mode: the reply is always a single JSON object
+JSON_RESPONSE_FORMAT = {"type": "json_object"}
 
 
 def detect_conflict(
@@ -77,9 +71,7 @@ Respond with JSON:
   "is_conflict": true/false,
   "explanation": "Brief explanation if conflict exists",
   "resolution": "How to resolve the conflict (e.g., 'Expansion overrides base rules')"
-}}
-
-Only JSON, no other text."""
+}}"""
 
     client = get_openai_client()
     
@@ -95,21 +87,16 @@ Only JSON, no other text."""
             ],
             max_tokens=200,
             temperature=0.1,
+            response_format=JSON_RESPONSE_FORMAT,
         )
         
         content = response.choices[0].message.content.strip()
         
-        # Parse JSON
+        # Parse JSON (can only fail if the reply was cut off at max_tokens)
         try:
             result = json.loads(content)
         except json.JSONDecodeError:
-            # Try to extract JSON
-            import re
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
-                result = json.loads(json_match.group(0))
-            else:
-                result = {"is_conflict": False, "explanation": "", "resolution": ""}
+            result = {"is_conflict": False, "explanation": "", "resolution": ""}
         
         return {
             "is_conflict": result.get("is_conflict", False),
@@ -143,11 +130,12 @@ def check_top_chunks_for_conflict(
     ranked_chunks: list[tuple],  # List of (chunk, score) or ScoredChunk
     question: str,
     score_threshold: float = 0.05,
+    top_k: int = 2,
 ) -> dict[str, Any] | None:
     """
-    Check if top 2 chunks have a potential conflict.
+    Check if the top chunks have a potential conflict.
     
-    Conditions for checking:
+    Conditions for checking a pair:
     1. Scores are similar (difference < threshold)
     2. Different precedence levels
     
@@ -155,43 +143,81 @@ def check_top_chunks_for_conflict(
         ranked_chunks: List of chunks with scores
         question: Original question
         score_threshold: Maximum score difference to consider similar
+        top_k: Number of top chunks to pair up (2 = just the top pair)
         
     Returns:
         Conflict info if detected, None otherwise
     """
-    if len(ranked_chunks) < 2:
-        return None
-    
-    # Extract chunks and scores
-    chunk1, score1 = _extract_chunk_and_score(ranked_chunks[0])
-    chunk2, score2 = _extract_chunk_and_score(ranked_chunks[1])
+    for chunk1, chunk2 in _conflict_candidate_pairs(ranked_chunks, score_threshold, top_k):
+        conflict = detect_conflict(chunk1, chunk2, question)
+        if conflict["is_conflict"]:
+            logger.warning(f"Conflict detected: {conflict['explanation']}")
+            return conflict
     
-    if chunk1 is None or chunk2 is None:
-        return None
-    
-    # Check score similarity
-    score_diff = abs(score1 - score2)
-    if score_diff > score_threshold:
-        # Scores too different, clear winner
-        return None
-    
-    # Check precedence levels
-    prec1 = getattr(chunk1, 'precedence_level', 1)
-    prec2 = getattr(chunk2, 'precedence_level', 1)
+    return None
+
+
+async def acheck_top_chunks_for_conflict(
+    ranked_chunks: list[tuple],
+    question: str,
+    score_threshold: float = 0.05,
+    top_k: int = 2,
+) -> dict[str, Any] | None:
+    """
+    Async version of check_top_chunks_for_conflict.
     
-    if prec1 == prec2:
-        # Same precedence, no conflict concern
+    The LLM check for every candidate pair runs at once on worker threads,
+    so several pairs cost about one round trip and the event loop isn't
+    blocked while they run. The first conflict in pair order wins.
+    """
+    pairs = _conflict_candidate_pairs(ranked_chunks, score_threshold, top_k)
+    if not pairs:
         return None
     
-    # Potential conflict - use LLM to verify
-    logger.info(f"Checking conflict between chunk {chunk1.id} (prec={prec1}) and {chunk2.id} (prec={prec2})")
-    
-    conflict = detect_conflict(chunk1, chunk2, question)
-    
-    if conflict["is_conflict"]:
-        logger.warning(f"Conflict detected: {conflict['explanation']}")
-    
-    return conflict if conflict["is_conflict"] else None
+    conflicts = await asyncio.gather(*(
+        asyncio.to_thread(detect_conflict, chunk1, chunk2, question)
+        for chunk1, chunk2 in pairs
+    ))
+    
+    for conflict in conflicts:
+        if conflict["is_conflict"]:
+            logger.warning(f"Conflict detected: {conflict['explanation']}")
+            return conflict
+    
+    return None
+
+
+def _conflict_candidate_pairs(
+    ranked_chunks: list[tuple],
+    score_threshold: float,
+    top_k: int,
+) -> list[tuple]:
+    """Pairs among the top_k chunks with similar scores and different precedence."""
+    candidates = []
+    for item in ranked_chunks[:top_k]:
+        chunk, score = _extract_chunk_and_score(item)
+        if chunk is None:
+            # Unrecognized item format, skip conflict checking
+            return []
+        candidates.append((chunk, score))
+    
+    pairs = []
+    for i, (chunk1, score1) in enumerate(candidates):
+        prec1 = getattr(chunk1, 'precedence_level', 1)
+        for chunk2, score2 in candidates[i + 1:]:
+            # Scores too different means a clear winner
+            if abs(score1 - score2) > score_threshold:
+                continue
+            
+            # Same precedence, no conflict concern
+            prec2 = getattr(chunk2, 'precedence_level', 1)
+            if prec1 == prec2:
+                continue
+            
+            logger.info(f"Checking conflict between chunk {chunk1.id} (prec={prec1}) and {chunk2.id} (prec={prec2})")
+            pairs.append((chunk1, chunk2))
+    
+    return pairs
 
 
 def _extract_chunk_and_score(item) -> tuple:
@@ -4,6 +4,9 @@ Handles single and batch embedding creation for RAG.
 """
 
 import logging
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from typing import Any
 
 from openai import OpenAI
@@ -18,10 +21,20 @@ logger = logging.getLogger(__name__)
 EMBEDDING_MODEL = "text-embedding-3-small"
 EMBEDDING_DIMENSIONS = 1536
 BATCH_SIZE = 100  # OpenAI recommends max 2048, but smaller is safer
+MAX_CONCURRENT_BATCHES = 5  # batch requests in flight at once
 
 
+@lru_cache(maxsize=1)
 def get_openai_client() -> OpenAI:
-    """Get configured OpenAI client."""
+    """
+    Get the shared OpenAI client.
+    
+    One client per process, so concurrent batch requests reuse its pooled
+    HTTPS connections instead of each opening (and TLS-handshaking) its
+    own. The client is thread-safe and also used by the answer, conflict
+    and override services. Tests that change settings.openai_api_key must
+    call get_openai_client.cache_clear().
+    """
     settings = get_settings()
     if not settings.openai_api_key:
         raise ValueError("OPENAI_API_KEY not configured")
@@ -73,6 +86,9 @@ def batch_create_embeddings(
     """
     Create embeddings for multiple texts in batches.
     
+    Identical texts (after truncation) are embedded once and the result is
+    shared, so repeated headers or footers aren't paid for twice.
+    
     Args:
         texts: List of texts to embed
         batch_size: Number of texts per API call (default 100)
@@ -97,22 +113,21 @@ def batch_create_embeddings(
         else:
             processed_texts.append(text)
     
+    # Embed each distinct text once; mapping points every input at its copy
+    unique: dict[str, int] = {}
+    mapping = [unique.setdefault(text, len(unique)) for text in processed_texts]
+    unique_texts = list(unique)
+    
     client = get_openai_client()
     all_embeddings: list[list[float]] = []
     
     # Process in batches
-    for i in range(0, len(processed_texts), batch_size):
-        batch = processed_texts[i:i + batch_size]
-        batch_indices = list(range(i, min(i + batch_size, len(processed_texts))))
-        
-        # Filter out empty texts for this batch
-        non_empty_texts: list[str] = []
-        non_empty_indices: list[int] = []
+    for i in range(0, len(unique_texts), batch_size):
+        batch = unique_texts[i:i + batch_size]
         
-        for idx, text in zip(batch_indices, batch):
-            if text.strip():
-                non_empty_texts.append(text)
-                non_empty_indices.append(idx - i)  # Local index in batch
+        # Filter out empty texts for this batch (blank inputs were
+        # already reduced to "")
+        non_empty_texts = [text for text in batch if text]
         
         if not non_empty_texts:
             # All texts in batch are empty, use zero vectors
@@ -129,19 +144,87 @@ def batch_create_embeddings(
                 dimensions=EMBEDDING_DIMENSIONS,
             )
             
-            # Map embeddings back to batch positions
-            batch_embeddings: list[list[float]] = [[0.0] * EMBEDDING_DIMENSIONS for _ in batch]
-            for j, embedding_data in enumerate(response.data):
-                local_idx = non_empty_indices[j]
-                batch_embeddings[local_idx] = embedding_data.embedding
-            
-            all_embeddings.extend(batch_embeddings)
+            # Map embeddings back to batch positions; only empty slots
+            # get a zero vector
+            vectors = iter(response.data)
+            all_embeddings.extend(
+                next(vectors).embedding if text else [0.0] * EMBEDDING_DIMENSIONS
+                for text in batch
+            )
             
         except Exception as e:
             logger.error(f"Failed to create batch embeddings: {e}")
             raise
     
-    return all_embeddings
+    return [all_embeddings[j] for j in mapping]
+
+
+def parallel_create_embeddings(
+    texts: Iterable[str],
+    batch_size: int = BATCH_SIZE,
+    max_workers: int = MAX_CONCURRENT_BATCHES,
+    progress_callback: Callable[[int, int], None] | None = None,
+) -> list[list[float]]:
+    """
+    Create embeddings with several batch requests in flight at once.
+    
+    Each batch is a network round trip, so overlapping them cuts wall
+    time roughly by max_workers. texts may be a lazy iterable: each batch
+    is submitted as soon as it fills, so producing later texts overlaps
+    with embedding earlier ones. Identical texts (after truncation) are
+    sent once across all batches and the result is fanned back out, so
+    the output order matches the input.
+    
+    Args:
+        texts: Texts to embed (list or iterable)
+        batch_size: Number of texts per API call (default 100)
+        max_workers: Maximum concurrent API calls
+        progress_callback: Called as (completed, total) distinct texts
+            after each batch once all texts have been submitted
+        
+    Returns:
+        List of embeddings in same order as input texts
+        
+    Raises:
+        openai.APIError: If any API call fails
+    """
+    futures: dict = {}
+    # Distinct text -> its index among the texts sent; mapping points every
+    # input at its distinct copy
+    unique: dict[str, int] = {}
+    mapping: list[int] = []
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        batch: list[str] = []
+        for text in texts:
+            # Same reduction batch_create_embeddings applies
+            key = text[:30000] if text and text.strip() else ""
+            index = unique.get(key)
+            if index is None:
+                index = unique[key] = len(unique)
+                batch.append(key)
+                if len(batch) == batch_size:
+                    futures[pool.submit(batch_create_embeddings, batch, batch_size)] = index + 1 - len(batch)
+                    batch = []
+            mapping.append(index)
+        
+        if batch:
+            futures[pool.submit(batch_create_embeddings, batch, batch_size)] = len(unique) - len(batch)
+        
+        total = len(unique)
+        unique_embeddings: list[list[float]] = [None] * total
+        completed = 0
+        
+        for future in as_completed(futures):
+            i = futures[future]
+            batch_embeddings = future.result()
+            unique_embeddings[i:i + len(batch_embeddings)] = batch_embeddings
+            completed += len(batch_embeddings)
+            
+            if progress_callback:
+                progress_callback(completed, total)
+    
+    return [unique_embeddings[j] for j in mapping]
 
 
 def count_tokens_estimate(text: str) -> int:
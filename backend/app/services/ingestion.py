@@ -4,11 +4,13 @@ Handles download, text extraction, OCR detection, chunking, and embedding.
 """
 
 import hashlib
+import io
 import logging
 import time
 from dataclasses import dataclass
+from operator import attrgetter, itemgetter
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, Final
 
 import fitz  # PyMuPDF
 import httpx
@@ -16,10 +18,10 @@ import httpx
 from app.config import get_settings
 from app.db.connection import get_sync_connection
 from app.db.repositories.sources import SourcesRepository
-from app.db.repositories.chunks import ChunksRepository
+from app.db.repositories.chunks import COPY_THRESHOLD, ChunksRepository
 from app.db.models import GameSource, RuleChunkCreate
 from app.services.chunker import chunk_document, Chunk
-from app.services.embeddings import batch_create_embeddings
+from app.services.embeddings import parallel_create_embeddings
 
 
 # Configure logging
@@ -45,22 +47,37 @@ class IngestionResult:
 OCR_THRESHOLD_CHARS_PER_PAGE = 50
 MIN_PAGES_FOR_OCR_CHECK = 3
 
+# Chunk precedence by source type (higher overrides lower)
+PRECEDENCE_MAP: Final[dict[str, int]] = {
+    "rulebook": 1,
+    "expansion": 2,
+    "faq": 3,
+    "errata": 3,
+    "reference_card": 1,
+}
+
+# How long ingested chunks stay valid before they expire
+CHUNK_TTL = timedelta(days=30)
+
+# Read size for streamed downloads
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
 
 def compute_file_hash(content: bytes) -> str:
     """Compute SHA-256 hash of file content."""
     return hashlib.sha256(content).hexdigest()
 
 
-def download_pdf(url: str, timeout: float = 30.0) -> bytes:
+def download_pdf(url: str, timeout: float = 30.0) -> tuple[bytes, str]:
     """
-    Download PDF from URL.
+    Download PDF from URL, hashing it as it streams in.
     
     Args:
         url: URL to download from
         timeout: Request timeout in seconds
         
     Returns:
-        PDF content as bytes
+        Tuple of (PDF content, SHA-256 hex digest of the content)
         
     Raises:
         httpx.HTTPError: On network/HTTP errors
@@ -68,66 +85,112 @@ def download_pdf(url: str, timeout: float = 30.0) -> bytes:
     """
     logger.info(f"Downloading PDF from: {url[:100]}...")
     
+    hasher = hashlib.sha256()
+    buffer = io.BytesIO()
+    
     with httpx.Client(timeout=timeout, follow_redirects=True) as client:
-        response = client.get(url)
-        response.raise_for_status()
-        
-        content_type = response.headers.get("content-type", "").lower()
-        
-        # Validate it looks like a PDF
-        content = response.content
-        if not content.startswith(b'%PDF'):
-            # Some servers don't set correct content-type
-            # Trust the magic bytes over content-type
-            if b'%PDF' not in content[:1024]:
-                raise ValueError(f"Response does not appear to be a PDF (content-type: {content_type})")
+        with client.stream("GET", url) as response:
+            response.raise_for_status()
+            
+            content_type = response.headers.get("content-type", "").lower()
+            
+            # Hash each chunk as it arrives instead of re-reading the
+            # whole payload afterwards
+            for chunk in response.iter_bytes(DOWNLOAD_CHUNK_SIZE):
+                hasher.update(chunk)
+                buffer.write(chunk)
+    
+    # Validate it looks like a PDF
+    content = buffer.getvalue()
+    if not content.startswith(b'%PDF'):
+        # Some servers don't set correct content-type
+        # Trust the magic bytes over content-type
+        if b'%PDF' not in content[:1024]:
+            raise ValueError(f"Response does not appear to be a PDF (content-type: {content_type})")
+    
+    logger.info(f"Downloaded {len(content):,} bytes")
+    return content, hasher.hexdigest()
+
+
+def extract_text_from_pdf(pdf: bytes | fitz.Document) -> list[tuple[int, str]]:
+    """
+    Extract text from a PDF, page by page.
+    
+    Args:
+        pdf: PDF file content, or an already-open document (which is
+            left open so the caller can keep using it)
         
-        logger.info(f"Downloaded {len(content):,} bytes")
-        return content
+    Returns:
+        List of (page_number, page_text) tuples (1-indexed page numbers)
+    """
+    if isinstance(pdf, fitz.Document):
+        return _extract_pages(pdf)[0]
+    
+    with fitz.open(stream=pdf, filetype="pdf") as doc:
+        return _extract_pages(doc)[0]
 
 
-def extract_text_from_pdf(pdf_bytes: bytes) -> list[tuple[int, str]]:
+def extract_text_and_count(pdf_bytes: bytes) -> tuple[list[tuple[int, str]], int, int]:
     """
-    Extract text from PDF bytes, page by page.
+    Extract page texts and counts from one parse of the PDF.
+    
+    Characters are tallied while extracting, so OCR detection needs no
+    further pass over the page texts.
     
     Args:
         pdf_bytes: PDF file content
         
     Returns:
-        List of (page_number, page_text) tuples (1-indexed page numbers)
+        Tuple of (pages, total_page_count, total_chars); pages as in
+        extract_text_from_pdf
     """
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        pages, total_chars = _extract_pages(doc)
+        return pages, doc.page_count, total_chars
+
+
+def _extract_pages(doc: fitz.Document) -> tuple[list[tuple[int, str]], int]:
+    """Collect non-empty page texts from an open document, with their total length."""
     pages: list[tuple[int, str]] = []
+    total_chars = 0
     
-    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
-        for page_num, page in enumerate(doc, start=1):
-            text = page.get_text("text")
-            # Clean up text
-            text = text.strip()
-            if text:
-                pages.append((page_num, text))
+    for page_num, page in enumerate(doc, start=1):
+        text = page.get_text("text")
+        # Clean up text
+        text = text.strip()
+        if text:
+            pages.append((page_num, text))
+            total_chars += len(text)
     
-    return pages
+    return pages, total_chars
 
 
-def detect_needs_ocr(pages: list[tuple[int, str]], total_page_count: int) -> bool:
+def detect_needs_ocr(
+    pages: list[tuple[int, str]],
+    total_page_count: int,
+    total_chars: int | None = None,
+) -> bool:
     """
     Detect if PDF is likely scanned and needs OCR.
     
     Args:
         pages: Extracted pages with text
         total_page_count: Total pages in PDF
+        total_chars: Total extracted characters, if the caller already
+            has it (avoids another pass over pages)
         
     Returns:
         True if PDF appears to be scanned/image-based
     """
+    if total_chars is None:
+        total_chars = sum(map(len, map(itemgetter(1), pages)))
+    
     if total_page_count < MIN_PAGES_FOR_OCR_CHECK:
         # Too few pages to reliably detect
         # Default to not needing OCR if we got any text
-        total_chars = sum(len(text) for _, text in pages)
         return total_chars < 100
     
     # Calculate average chars per page
-    total_chars = sum(len(text) for _, text in pages)
     avg_chars_per_page = total_chars / total_page_count if total_page_count > 0 else 0
     
     logger.info(f"OCR detection: {total_chars} chars across {total_page_count} pages "
@@ -140,6 +203,7 @@ def ingest_source(
     source_id: int,
     force: bool = False,
     save_chunks: bool = True,
+    prefetched: GameSource | None = None,
 ) -> dict[str, Any]:
     """
     Ingest a source document: download, extract, chunk, and store.
@@ -148,6 +212,8 @@ def ingest_source(
         source_id: ID of the source to ingest
         force: If True, re-ingest even if already done
         save_chunks: If True, save chunks to database
+        prefetched: Source record already loaded by the caller; skips
+            the lookup query
         
     Returns:
         Dict with status and metadata
@@ -157,8 +223,13 @@ def ingest_source(
     try:
         with get_sync_connection() as conn:
             # Get source record
-            sources_repo = SourcesRepository(conn)
-            source = sources_repo.get_source_sync(source_id)
+            source = prefetched
+            if source is None:
+                sources_repo = SourcesRepository(conn)
+                source = sources_repo.get_source_sync(source_id)
+                # Close the read transaction so the connection isn't left
+                # idle in transaction during download/extract/embed
+                conn.commit()
             
             if not source:
                 return IngestionResult(
@@ -185,7 +256,7 @@ def ingest_source(
             
             # Download PDF
             try:
-                pdf_bytes = download_pdf(source.source_url)
+                pdf_bytes, file_hash = download_pdf(source.source_url)
             except httpx.TimeoutException:
                 return IngestionResult(
                     status="error",
@@ -208,12 +279,27 @@ def ingest_source(
                     duration_ms=int((time.time() - start_time) * 1000),
                 ).__dict__
             
-            # Compute file hash
-            file_hash = compute_file_hash(pdf_bytes)
-            
-            # Check if content changed
-            if not force and source.file_hash == file_hash:
+            # Check if content changed. Only trust the stored hash if that
+            # content was actually ingested (the needs-OCR path stores a
+            # hash without creating chunks).
+            if (
+                not force
+                and source.file_hash == file_hash
+                and source.last_ingested_at
+                and not source.needs_ocr
+            ):
                 logger.info(f"Source {source_id} unchanged (hash match)")
+                with conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        UPDATE game_sources 
+                        SET needs_reingest = FALSE, last_ingested_at = NOW(), updated_at = NOW()
+                        WHERE id = %s
+                        """,
+                        (source_id,)
+                    )
+                    conn.commit()
+                
                 return IngestionResult(
                     status="unchanged",
                     source_id=source_id,
@@ -223,10 +309,7 @@ def ingest_source(
             
             # Extract text
             try:
-                with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
-                    total_page_count = len(doc)
-                
-                pages = extract_text_from_pdf(pdf_bytes)
+                pages, total_page_count, total_chars = extract_text_and_count(pdf_bytes)
             except Exception as e:
                 return IngestionResult(
                     status="error",
@@ -235,10 +318,8 @@ def ingest_source(
                     duration_ms=int((time.time() - start_time) * 1000),
                 ).__dict__
             
-            total_chars = sum(len(text) for _, text in pages)
-            
             # Check if needs OCR
-            if detect_needs_ocr(pages, total_page_count):
+            if detect_needs_ocr(pages, total_page_count, total_chars):
                 # Update source to mark as needing OCR
                 with conn.cursor() as cur:
                     cur.execute(
@@ -268,6 +349,9 @@ def ingest_source(
             chunks_created = 0
             chunks_deleted = 0
             
+            # Determine precedence level based on source type
+            precedence = PRECEDENCE_MAP.get(source.source_type, 1)
+            
             if save_chunks and chunks:
                 chunks_repo = ChunksRepository(conn)
                 
@@ -275,46 +359,39 @@ def ingest_source(
                 chunks_deleted = chunks_repo.delete_chunks_by_source_sync(source_id)
                 logger.info(f"Deleted {chunks_deleted} existing chunks")
                 
-                # Determine precedence level based on source type
-                precedence_map = {
-                    "rulebook": 1,
-                    "expansion": 2,
-                    "faq": 3,
-                    "errata": 3,
-                    "reference_card": 1,
-                }
-                precedence = precedence_map.get(source.source_type, 1)
-                
                 # Generate embeddings for all chunks
-                chunk_texts = [chunk.chunk_text for chunk in chunks]
+                chunk_texts = list(map(attrgetter("chunk_text"), chunks))
                 logger.info(f"Generating embeddings for {len(chunk_texts)} chunks...")
                 
                 try:
-                    embeddings = batch_create_embeddings(chunk_texts)
+                    embeddings = parallel_create_embeddings(chunk_texts)
                     logger.info(f"Generated {len(embeddings)} embeddings")
                 except Exception as e:
                     logger.error(f"Failed to generate embeddings: {e}")
                     # Continue without embeddings - they can be added later
                     embeddings = [None] * len(chunks)
                 
-                # Calculate expiration (30 days from now)
-                expires_at = datetime.now(timezone.utc) + timedelta(days=30)
+                # Calculate expiration
+                expires_at = datetime.now(timezone.utc) + CHUNK_TTL
                 
-                # Create new chunks with embeddings
-                for i, chunk in enumerate(chunks):
-                    embedding = embeddings[i] if i < len(embeddings) else None
-                    
-                    chunk_create = RuleChunkCreate(
+                # Create new chunks with embeddings in bulk rather than
+                # one INSERT round trip per chunk
+                chunk_creates = [
+                    RuleChunkCreate(
                         source_id=source_id,
                         page_number=chunk.page_number,
                         chunk_index=chunk.chunk_index,
                         chunk_text=chunk.chunk_text,
-                        embedding=embedding,
+                        embedding=embeddings[i] if i < len(embeddings) else None,
                         precedence_level=precedence,
                         expires_at=expires_at,
                     )
-                    chunks_repo.create_chunk_sync(chunk_create)
-                    chunks_created += 1
+                    for i, chunk in enumerate(chunks)
+                ]
+                if len(chunk_creates) >= COPY_THRESHOLD:
+                    chunks_created = chunks_repo.copy_chunks_sync(chunk_creates)
+                else:
+                    chunks_created = chunks_repo.bulk_insert_chunks_sync(chunk_creates)
                 
                 logger.info(f"Created {chunks_created} new chunks with embeddings")
             
@@ -407,7 +484,7 @@ def ingest_all_pending(limit: int = 10) -> list[dict[str, Any]]:
     # Process each source (outside connection context)
     for source in sources:
         logger.info(f"Ingesting source {source.id}: {source.edition} ({source.source_type})")
-        result = ingest_source(source.id)
+        result = ingest_source(source.id, prefetched=source)
         results.append(result)
         logger.info(f"  Result: {result['status']}")
     
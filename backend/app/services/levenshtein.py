@@ -1,7 +1,21 @@
 """
 Levenshtein distance calculation for fuzzy string matching.
+
+Uses rapidfuzz's bit-parallel C++ implementation when installed and falls
+back to the pure-Python DP otherwise; both give identical distances.
 """
 
+try:
+    from rapidfuzz import fuzz as _rf_fuzz, process as _rf_process
+    from rapidfuzz.distance import Levenshtein as _RFLevenshtein
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+
+# Strings up to this length fit one 64-bit word in Myers' algorithm
+MYERS_MAX_LENGTH = 64
+
 
 def levenshtein_distance(s1: str, s2: str) -> int:
     """
@@ -19,6 +33,9 @@ def levenshtein_distance(s1: str, s2: str) -> int:
     Returns:
         The edit distance as an integer
     """
+    if RAPIDFUZZ_AVAILABLE:
+        return _RFLevenshtein.distance(s1, s2)
+    
     # Make s1 the shorter string for space optimization
     if len(s1) > len(s2):
         s1, s2 = s2, s1
@@ -31,6 +48,9 @@ def levenshtein_distance(s1: str, s2: str) -> int:
     if n == 0:
         return m
     
+    if m <= MYERS_MAX_LENGTH:
+        return _myers_distance(s1, s2)
+    
     # Previous and current row of distances
     prev_row = list(range(m + 1))
     curr_row = [0] * (m + 1)
@@ -54,6 +74,120 @@ def levenshtein_distance(s1: str, s2: str) -> int:
     return prev_row[m]
 
 
+def _myers_distance(pattern: str, text: str) -> int:
+    """
+    Levenshtein distance via Myers' bit-parallel algorithm.
+    
+    Each column of the DP table is held as bit vectors of vertical +1/-1
+    deltas, so one pass over text with a few integer ops per character
+    replaces the O(m*n) cell loop. Meant for a pattern of at most
+    MYERS_MAX_LENGTH characters, where the vectors fit a machine word.
+    
+    Args:
+        pattern: The shorter string (non-empty)
+        text: The longer string
+        
+    Returns:
+        The edit distance as an integer
+    """
+    m = len(pattern)
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    
+    # Bitmask of the pattern positions holding each character
+    peq: dict[str, int] = {}
+    for i, ch in enumerate(pattern):
+        peq[ch] = peq.get(ch, 0) | (1 << i)
+    
+    vp, vn, score = full, 0, m
+    for ch in text:
+        eq = peq.get(ch, 0)
+        xv = eq | vn
+        xh = (((eq & vp) + vp) ^ vp) | eq
+        hp = vn | (~(xh | vp) & full)
+        hn = vp & xh
+        
+        if hp & last:
+            score += 1
+        elif hn & last:
+            score -= 1
+        
+        # Shift in a +1 for the top row (global, not substring, distance)
+        hp = ((hp << 1) | 1) & full
+        hn = (hn << 1) & full
+        vp = hn | (~(xv | hp) & full)
+        vn = hp & xv
+    
+    return score
+
+
+def bounded_levenshtein_distance(s1: str, s2: str, max_distance: int) -> int:
+    """
+    Calculate the edit distance, giving up once it exceeds max_distance.
+    
+    Uses Ukkonen's banded DP: only cells within max_distance of the
+    diagonal can stay under the bound, so each row costs O(max_distance)
+    instead of O(len), and the scan stops as soon as a whole row is over.
+    
+    Args:
+        s1: First string
+        s2: Second string
+        max_distance: Largest distance worth computing exactly
+        
+    Returns:
+        The edit distance, or max_distance + 1 if it exceeds max_distance
+    """
+    if RAPIDFUZZ_AVAILABLE:
+        return _RFLevenshtein.distance(s1, s2, score_cutoff=max_distance)
+    
+    if len(s1) > len(s2):
+        s1, s2 = s2, s1
+    
+    m, n = len(s1), len(s2)
+    over = max_distance + 1
+    
+    if n - m > max_distance:
+        return over
+    if m == 0:
+        return n
+    
+    if m <= MYERS_MAX_LENGTH:
+        return min(_myers_distance(s1, s2), over)
+    
+    prev_row = [i if i <= max_distance else over for i in range(m + 1)]
+    curr_row = [over] * (m + 1)
+    
+    for j in range(1, n + 1):
+        lo = max(1, j - max_distance)
+        hi = min(m, j + max_distance)
+        
+        # Left edge of the band; anything further left is already over
+        curr_row[lo - 1] = j if lo == 1 and j <= max_distance else over
+        row_min = curr_row[lo - 1]
+        
+        for i in range(lo, hi + 1):
+            if s1[i - 1] == s2[j - 1]:
+                value = prev_row[i - 1]
+            else:
+                value = 1 + min(prev_row[i], curr_row[i - 1], prev_row[i - 1])
+            if value > over:
+                value = over
+            curr_row[i] = value
+            if value < row_min:
+                row_min = value
+        
+        if row_min > max_distance:
+            return over
+        
+        # Right edge for the next row, which reads one cell past this band
+        if hi < m:
+            curr_row[hi + 1] = over
+        
+        prev_row, curr_row = curr_row, prev_row
+    
+    return prev_row[m]
+
+
 def similarity_ratio(s1: str, s2: str) -> float:
     """
     Calculate similarity ratio between two strings (0.0 to 1.0).
@@ -78,7 +212,11 @@ def similarity_ratio(s1: str, s2: str) -> float:
     return 1.0 - (distance / max_len)
 
 
-def find_best_match_window(target: str, source: str) -> tuple[str, int, int]:
+def find_best_match_window(
+    target: str,
+    source: str,
+    max_distance: int | None = None,
+) -> tuple[str, int, int]:
     """
     Find the substring window in source that best matches target.
     
@@ -88,9 +226,13 @@ def find_best_match_window(target: str, source: str) -> tuple[str, int, int]:
     Args:
         target: The string to search for
         source: The string to search within
+        max_distance: Only look for matches within this distance; windows
+            are scored with the bounded DP, tightened to the best so far
         
     Returns:
-        Tuple of (best_match_substring, start_index, distance)
+        Tuple of (best_match_substring, start_index, distance). With
+        max_distance set and no window within it, the distance is only
+        known to be greater than max_distance.
     """
     target_len = len(target)
     source_len = len(source)
@@ -102,11 +244,13 @@ def find_best_match_window(target: str, source: str) -> tuple[str, int, int]:
     
     # If target is longer than source, compare full strings
     if target_len >= source_len:
+        if max_distance is not None:
+            return (source, 0, bounded_levenshtein_distance(target, source, max_distance))
         return (source, 0, levenshtein_distance(target, source))
     
     best_match = ""
     best_start = 0
-    best_distance = float('inf')
+    best_distance = float('inf') if max_distance is None else max_distance + 1
     
     # Window sizes to try: exact length, +/- 10%
     window_sizes = [
@@ -126,7 +270,11 @@ def find_best_match_window(target: str, source: str) -> tuple[str, int, int]:
         
         for start in range(0, source_len - window_size + 1, step):
             window = source[start:start + window_size]
-            distance = levenshtein_distance(target, window)
+            if best_distance == float('inf'):
+                distance = levenshtein_distance(target, window)
+            else:
+                # Only a window that beats the best so far matters
+                distance = bounded_levenshtein_distance(target, window, int(best_distance))
             
             if distance < best_distance:
                 best_distance = distance
@@ -138,3 +286,25 @@ def find_best_match_window(target: str, source: str) -> tuple[str, int, int]:
                     return (best_match, best_start, best_distance)
     
     return (best_match, best_start, int(best_distance))
+
+
+def rank_by_partial_similarity(target: str, sources: list[str]) -> list[int]:
+    """
+    Order source indices from most to least likely to contain target.
+    
+    Scores every source with rapidfuzz's partial_ratio in one C call. Used
+    to visit the likeliest source first so bounded searches over the rest
+    can stop early. Without rapidfuzz the original order is kept.
+    
+    Args:
+        target: The string to search for
+        sources: The strings to search within
+        
+    Returns:
+        Indices into sources, best candidate first
+    """
+    if not RAPIDFUZZ_AVAILABLE or len(sources) < 2:
+        return list(range(len(sources)))
+    
+    ranked = _rf_process.extract(target, sources, scorer=_rf_fuzz.partial_ratio, limit=None)
+    return [index for _, _, index in ranked]
@@ -20,6 +20,17 @@ except Exception as e:
     _lemmatizer = None
     NLTK_AVAILABLE = False
 
+# Precompiled patterns for normalize_question
+_PUNCT_RE = re.compile(r'[^\w\s]')
+_WS_RE = re.compile(r'\s+')
+
+NUMBER_WORDS = {
+    'one': '1', 'two': '2', 'three': '3', 'four': '4', 'five': '5',
+    'six': '6', 'seven': '7', 'eight': '8', 'nine': '9', 'ten': '10',
+    'eleven': '11', 'twelve': '12'
+}
+_NUMBER_WORD_RE = re.compile(r'\b(' + '|'.join(NUMBER_WORDS) + r')\b')
+
 
 def normalize_question(q: str) -> str:
     """
@@ -39,19 +50,13 @@ def normalize_question(q: str) -> str:
     q = q.lower().strip()
     
     # Remove punctuation
-    q = re.sub(r'[^\w\s]', '', q)
+    q = _PUNCT_RE.sub('', q)
     
     # Collapse whitespace
-    q = re.sub(r'\s+', ' ', q)
+    q = _WS_RE.sub(' ', q)
     
-    # Number words to digits
-    number_map = {
-        'one': '1', 'two': '2', 'three': '3', 'four': '4', 'five': '5',
-        'six': '6', 'seven': '7', 'eight': '8', 'nine': '9', 'ten': '10',
-        'eleven': '11', 'twelve': '12'
-    }
-    for word, digit in number_map.items():
-        q = re.sub(r'\b' + word + r'\b', digit, q)
+    # Number words to digits, in one pass
+    q = _NUMBER_WORD_RE.sub(lambda m: NUMBER_WORDS[m.group(1)], q)
     
     # Lemmatize (convert words to base form) - skip if NLTK not available
     if NLTK_AVAILABLE and _lemmatizer:
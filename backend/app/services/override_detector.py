@@ -9,11 +9,8 @@ import logging
 import re
 from typing import Any
 
-from openai import OpenAI
-
-from app.config import get_settings
 from app.db.models import RuleChunk, RuleChunkSearchResult
-from app.services.embeddings import create_embedding
+from app.services.embeddings import create_embedding, get_openai_client
 
 
 logger = logging.getLogger(__name__)
@@ -24,6 +21,9 @@ SIMILARITY_THRESHOLD = 0.82  # Minimum similarity to consider as candidate
 MAX_CANDIDATES_PER_CHUNK = 3  # Max base chunks to consider
 OVERRIDE_MODEL = "gpt-4o-mini"
 
+# Fallback for pulling a JSON object out of a non-JSON reply
+_JSON_OBJECT_RE = re.compile(r'\{[^{}]*\}')
+
 # Regex pattern for override keywords
 OVERRIDE_KEYWORDS_PATTERN = re.compile(
     r'\b(instead|replaces?|ignores?|supersedes?|overrides?|'
@@ -34,14 +34,6 @@ OVERRIDE_KEYWORDS_PATTERN = re.compile(
 )
 
 
-def get_openai_client() -> OpenAI:
-    """Get configured OpenAI client."""
-    settings = get_settings()
-    if not settings.openai_api_key:
-        raise ValueError("OPENAI_API_KEY not configured")
-    return OpenAI(api_key=settings.openai_api_key)
-
-
 def has_override_keywords(text: str) -> bool:
     """Check if text contains override-indicating keywords."""
     return bool(OVERRIDE_KEYWORDS_PATTERN.search(text))
@@ -105,7 +97,7 @@ Respond with JSON only:
             result = json.loads(content)
         except json.JSONDecodeError:
             # Try to extract JSON
-            json_match = re.search(r'\{[^{}]*\}', content)
+            json_match = _JSON_OBJECT_RE.search(content)
             if json_match:
                 result = json.loads(json_match.group(0))
             else:
@@ -8,6 +8,7 @@ from dataclasses import dataclass
 from typing import Any
 
 from app.db.models import RuleChunk, RuleChunkSearchResult
+from app.db.repositories.base import to_halfvec_literal
 from app.db.repositories.chunks import ChunksRepository
 from app.services.cache import get_or_create_embedding
 
@@ -215,8 +216,8 @@ async def hybrid_search(
     
     conflict_info = None
     if detect_conflicts and len(scored_chunks) >= 2:
-        from app.services.conflict_detector import check_top_chunks_for_conflict
-        conflict_info = check_top_chunks_for_conflict(
+        from app.services.conflict_detector import acheck_top_chunks_for_conflict
+        conflict_info = await acheck_top_chunks_for_conflict(
             ranked_chunks=scored_chunks[:5],
             question=query,
             score_threshold=0.05,
@@ -368,7 +369,7 @@ def hybrid_search_sync(
     
     # Get embedding
     query_embedding = create_embedding(query)
-    embedding_str = "[" + ",".join(map(str, query_embedding)) + "]"
+    embedding_str = to_halfvec_literal(query_embedding)
     
     with get_sync_connection() as conn:
         with conn.cursor() as cur:
@@ -387,12 +388,12 @@ def hybrid_search_sync(
                 vec_hits AS (
                     SELECT 
                         id,
-                        1 - (embedding <=> %s::vector) as vec_score
+                        1 - (embedding <=> %s::halfvec) as vec_score
                     FROM rule_chunks
                     WHERE source_id = ANY(%s)
                     AND embedding IS NOT NULL
                     AND (expires_at IS NULL OR expires_at > NOW())
-                    ORDER BY embedding <=> %s::vector
+                    ORDER BY embedding <=> %s::halfvec
                     LIMIT %s
                 ),
                 combined AS (
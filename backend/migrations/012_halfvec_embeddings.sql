@@ -0,0 +1,33 @@
+-- Migration: 012_halfvec_embeddings.sql
+-- Store rule chunk embeddings as half-precision vectors (requires pgvector >= 0.7)
+--
+-- halfvec halves the bytes per embedding on disk, in the index and through
+-- every similarity scan, with negligible recall loss for 1536-d OpenAI
+-- embeddings. Queries cast their parameter with ::halfvec to match.
+
+-- ============================================================================
+-- Drop vector indexes (the opclass changes with the column type)
+-- ============================================================================
+
+DROP INDEX IF EXISTS rule_chunks_embedding_idx;
+DROP INDEX IF EXISTS idx_rule_chunks_embedding;
+
+-- ============================================================================
+-- Convert the column
+-- ============================================================================
+
+ALTER TABLE rule_chunks
+ALTER COLUMN embedding TYPE halfvec(1536)
+USING embedding::halfvec(1536);
+
+COMMENT ON COLUMN rule_chunks.embedding IS 'OpenAI text-embedding-3-small vector, stored as halfvec (1536 dimensions)';
+
+-- ============================================================================
+-- Recreate the similarity index
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_rule_chunks_embedding 
+ON rule_chunks USING ivfflat (embedding halfvec_cosine_ops)
+WITH (lists = 100);
+
+ANALYZE rule_chunks;
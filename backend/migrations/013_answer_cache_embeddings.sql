@@ -0,0 +1,34 @@
+-- Migration: 013_answer_cache_embeddings.sql
+-- Semantic answer cache: verified answers keyed by question embedding
+--
+-- The Redis answer cache only hits on an exact normalized question. This
+-- table lets a paraphrase of an already-answered question reuse the answer
+-- when its embedding is close enough. Lookups are always scoped to one
+-- (game, edition, expansion set), which holds few rows, so the btree scope
+-- index plus an exact distance sort is used instead of an ANN index.
+-- One row per normalized question in a scope (re-answering refreshes it);
+-- rows past the cache TTL are deleted by the cleanup jobs.
+
+CREATE TABLE IF NOT EXISTS answer_cache_embeddings (
+  id BIGSERIAL PRIMARY KEY,
+  game_id BIGINT NOT NULL REFERENCES games(id) ON DELETE CASCADE,
+  edition TEXT NOT NULL,                  -- Edition string ('base' if none)
+  exp_hash TEXT NOT NULL,                 -- Hash of sorted expansion IDs (as in the Redis key)
+  question TEXT NOT NULL,                 -- Normalized question text
+  embedding vector(1536) NOT NULL,
+  answer_json JSONB NOT NULL,             -- Cached /ask response body
+  created_at TIMESTAMPTZ DEFAULT NOW() NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS answer_cache_embeddings_scope_idx
+ON answer_cache_embeddings(game_id, edition, exp_hash, created_at DESC);
+
+-- Upsert target for semantic_put
+CREATE UNIQUE INDEX IF NOT EXISTS answer_cache_embeddings_question_idx
+ON answer_cache_embeddings(game_id, edition, exp_hash, question);
+
+-- Cleanup scans by age
+CREATE INDEX IF NOT EXISTS answer_cache_embeddings_created_idx
+ON answer_cache_embeddings(created_at);
+
+COMMENT ON TABLE answer_cache_embeddings IS 'Verified answers for semantic (embedding similarity) cache lookups';
@@ -90,9 +90,11 @@ def mock_openai():
 @pytest.fixture
 def mock_redis():
     """Mock Redis for caching."""
-    with patch("app.services.cache.redis") as mock:
-        mock.from_url.return_value.__aenter__ = AsyncMock()
-        mock.from_url.return_value.__aexit__ = AsyncMock()
+    with patch("app.services.cache.get_async_redis") as mock:
+        client = MagicMock()
+        client.get = AsyncMock(return_value=None)
+        client.set = AsyncMock()
+        mock.return_value = client
         yield mock
 
 
@@ -115,3 +117,17 @@ def sample_feedback_request():
         "feedback_type": "helpful",
         "user_note": "Great answer!"
     }
+
+
+@pytest.fixture(params=["fallback", "rapidfuzz"])
+def rapidfuzz_mode(request):
+    """Run a test against both the pure-Python fallback and rapidfuzz."""
+    if request.param == "rapidfuzz":
+        pytest.importorskip("rapidfuzz")
+        from app.services import levenshtein
+        if not levenshtein.RAPIDFUZZ_AVAILABLE:
+            pytest.skip("rapidfuzz not picked up by app.services.levenshtein")
+        yield
+    else:
+        with patch("app.services.levenshtein.RAPIDFUZZ_AVAILABLE", False):
+            yield
@@ -0,0 +1,120 @@
+"""
+Tests for parsing LLM answer responses.
+
+Tests cover:
+- Extracting the first balanced JSON object from surrounding text
+- Braces and escaped quotes inside string values
+- Truncated responses
+"""
+
+import json
+
+
+class TestExtractFirstJsonObject:
+    """Tests for _extract_first_json_object."""
+    
+    def test_plain_object(self):
+        """A bare object is returned whole."""
+        from app.services.answer_generator import _extract_first_json_object
+        
+        assert _extract_first_json_object('{"verdict": "Yes"}') == '{"verdict": "Yes"}'
+    
+    def test_leading_and_trailing_prose(self):
+        """Text before and after the object is dropped."""
+        from app.services.answer_generator import _extract_first_json_object
+        
+        content = 'Here is the answer: {"verdict": "Yes", "page": 4} Hope that helps! {"other": 1}'
+        
+        assert _extract_first_json_object(content) == '{"verdict": "Yes", "page": 4}'
+    
+    def test_nested_objects(self):
+        """Nested objects don't end the outer one early."""
+        from app.services.answer_generator import _extract_first_json_object
+        
+        content = '{"a": {"b": {"c": 1}}, "d": [{"e": 2}]} trailing'
+        
+        assert json.loads(_extract_first_json_object(content)) == {"a": {"b": {"c": 1}}, "d": [{"e": 2}]}
+    
+    def test_braces_inside_strings(self):
+        """Braces in string values aren't counted."""
+        from app.services.answer_generator import _extract_first_json_object
+        
+        obj = {"verdict": "Play the {attack} card}", "quote_exact": "{{not json"}
+        content = json.dumps(obj) + " and then }"
+        
+        assert json.loads(_extract_first_json_object(content)) == obj
+    
+    def test_escaped_quotes_inside_strings(self):
+        """An escaped quote doesn't end the string, so braces after it stay ignored."""
+        from app.services.answer_generator import _extract_first_json_object
+        
+        obj = {"verdict": 'The card says "discard }" first', "notes": ["a \\ b", 'x\\"}']}
+        content = "Answer: " + json.dumps(obj) + " done"
+        
+        assert json.loads(_extract_first_json_object(content)) == obj
+    
+    def test_escaped_backslash_before_quote(self):
+        """A doubled backslash is a literal backslash; the quote after it closes the string."""
+        from app.services.answer_generator import _extract_first_json_object
+        
+        content = r'{"path": "C:\\"} {"next": 1}'
+        
+        assert _extract_first_json_object(content) == r'{"path": "C:\\"}'
+    
+    def test_truncated_object(self):
+        """An object cut off mid-way has no balanced end."""
+        from app.services.answer_generator import _extract_first_json_object
+        
+        assert _extract_first_json_object('{"verdict": "Yes", "notes": [{"a": 1}') is None
+        assert _extract_first_json_object('{"verdict": "unterminated } string') is None
+    
+    def test_no_object(self):
+        """Text without an opening brace returns None."""
+        from app.services.answer_generator import _extract_first_json_object
+        
+        assert _extract_first_json_object("No JSON here } at all") is None
+        assert _extract_first_json_object("") is None
+    
+    def test_long_unbalanced_input(self):
+        """Long inputs with no balanced object finish in one pass."""
+        from app.services.answer_generator import _extract_first_json_object
+        
+        assert _extract_first_json_object("{" * 200_000 + '"x": ' * 50_000) is None
+
+
+class TestParseAnswerJson:
+    """Tests for parse_answer_json fallbacks."""
+    
+    def test_plain_json(self):
+        """JSON-mode output parses directly."""
+        from app.services.answer_generator import parse_answer_json
+        
+        assert parse_answer_json('{"verdict": "Yes"}') == {"verdict": "Yes"}
+    
+    def test_fenced_json(self):
+        """A fenced block is unwrapped."""
+        from app.services.answer_generator import parse_answer_json
+        
+        content = 'Sure:\n```json\n{"verdict": "No"}\n```'
+        
+        assert parse_answer_json(content) == {"verdict": "No"}
+    
+    def test_embedded_json(self):
+        """An object surrounded by prose is extracted."""
+        from app.services.answer_generator import parse_answer_json
+        
+        content = 'The ruling is {"verdict": "It depends {see FAQ}", "page": 3}. Thanks!'
+        
+        assert parse_answer_json(content) == {"verdict": "It depends {see FAQ}", "page": 3}
+    
+    def test_truncated_response_falls_back(self):
+        """Output cut off at max_tokens gives the low-confidence fallback."""
+        from app.services.answer_generator import parse_answer_json
+        
+        content = '{"verdict": "Yes, you may move twice", "quote_exact": "Each turn'
+        
+        result = parse_answer_json(content)
+        
+        assert result["confidence"] == "low"
+        assert result["verdict"] == content
+        assert result["notes"] == ["Response parsing failed"]
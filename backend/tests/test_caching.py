@@ -124,6 +124,33 @@ class TestInMemoryCache:
         stats = cache.stats()
         assert stats["size"] <= 5
 
+    def test_cache_evicts_least_recently_used(self):
+        """Eviction drops the least recently read entry, not the oldest write."""
+        from app.services.cache import TTLCache
+
+        cache = TTLCache(ttl_seconds=60, max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_expired_entry_removed_on_get(self):
+        """Expired entries are dropped lazily when read."""
+        from app.services.cache import TTLCache
+
+        cache = TTLCache(ttl_seconds=60)
+        with patch("app.services.cache.time.time", return_value=1000.0):
+            cache.set("test_key", "value")
+
+        with patch("app.services.cache.time.time", return_value=1061.0):
+            assert cache.get("test_key") is None
+
+        assert cache.stats()["size"] == 0
+
 
 class TestRedisCache:
     """Tests for Redis cache operations."""
@@ -131,32 +158,31 @@ class TestRedisCache:
     @pytest.mark.asyncio
     async def test_cache_hit_returns_cached_data(self):
         """Cache hit returns stored data."""
-        with patch("app.services.cache.redis") as redis_mock:
+        with patch("app.services.cache.get_async_redis") as get_redis_mock:
             from app.services.cache import get_cached_answer
             
             # Setup mock
-            client_mock = AsyncMock()
+            client_mock = MagicMock()
             client_mock.get = AsyncMock(return_value='{"verdict": "Yes", "confidence": "high"}')
-            redis_mock.from_url.return_value = client_mock
-            client_mock.__aenter__ = AsyncMock(return_value=client_mock)
-            client_mock.__aexit__ = AsyncMock()
+            client_mock.set = AsyncMock()
+            get_redis_mock.return_value = client_mock
             
             result = await get_cached_answer("test:key")
             
             assert result is not None
             assert result["verdict"] == "Yes"
+            client_mock.get.assert_awaited_once_with("test:key")
             
     @pytest.mark.asyncio
     async def test_cache_miss_returns_none(self):
         """Cache miss returns None."""
-        with patch("app.services.cache.redis") as redis_mock:
+        with patch("app.services.cache.get_async_redis") as get_redis_mock:
             from app.services.cache import get_cached_answer
             
-            client_mock = AsyncMock()
+            client_mock = MagicMock()
             client_mock.get = AsyncMock(return_value=None)
-            redis_mock.from_url.return_value = client_mock
-            client_mock.__aenter__ = AsyncMock(return_value=client_mock)
-            client_mock.__aexit__ = AsyncMock()
+            client_mock.set = AsyncMock()
+            get_redis_mock.return_value = client_mock
             
             result = await get_cached_answer("test:key")
             
@@ -165,10 +191,13 @@ class TestRedisCache:
     @pytest.mark.asyncio
     async def test_cache_error_returns_none(self):
         """Redis errors return None gracefully."""
-        with patch("app.services.cache.redis") as redis_mock:
+        with patch("app.services.cache.get_async_redis") as get_redis_mock:
             from app.services.cache import get_cached_answer
             
-            redis_mock.from_url.side_effect = Exception("Connection failed")
+            client_mock = MagicMock()
+            client_mock.get = AsyncMock(side_effect=Exception("Connection failed"))
+            client_mock.set = AsyncMock()
+            get_redis_mock.return_value = client_mock
             
             result = await get_cached_answer("test:key")
             
@@ -0,0 +1,197 @@
+"""
+Tests for citation verification.
+
+The fuzzy fallback across chunks (q-gram prescreen, likeliest-first
+visiting order, tightening bound) is checked against a plain in-order
+scan of every chunk.
+"""
+
+import random
+
+from unittest.mock import MagicMock, patch
+
+from tests.test_levenshtein import mutate, plain_levenshtein
+
+
+WORDS = (
+    "player may move two spaces each turn unless blocked by wall card "
+    "draw discard the attack defender token resource gain lose round"
+).split()
+
+
+def make_chunks(texts: list[str]) -> list[MagicMock]:
+    """Chunk stand-ins with ids 1..n."""
+    return [MagicMock(id=i, chunk_text=text) for i, text in enumerate(texts, start=1)]
+
+
+def plain_scan(quote: str, chunks: list[MagicMock], max_allowed: int) -> tuple[int | None, int]:
+    """
+    Reference for the fuzzy pass: score every chunk's best window with the
+    plain DP, front to back, keeping the first chunk on ties.
+    """
+    from app.services.citation_verifier import normalize_text
+    from app.services.levenshtein import find_best_match_window
+    
+    best_id, best_distance = None, None
+    for chunk in chunks:
+        match, _, _ = find_best_match_window(quote, normalize_text(chunk.chunk_text))
+        distance = plain_levenshtein(quote, match)
+        if best_distance is None or distance < best_distance:
+            best_id, best_distance = chunk.id, distance
+    if best_distance is None or best_distance > max_allowed:
+        return None, best_distance
+    return best_id, best_distance
+
+
+class TestVerifyCitation:
+    """Tests for verify_citation against the claimed chunk."""
+    
+    def test_exact_match_ignores_case_and_whitespace(self):
+        """Normalized substring matches are exact."""
+        from app.services.citation_verifier import verify_citation
+        
+        chunks = make_chunks(["A player MAY move\ntwo   spaces each turn."])
+        
+        result = verify_citation("may move two spaces", 1, chunks)
+        
+        assert result["verified"] is True
+        assert result["method"] == "exact"
+        assert result["chunk_id"] == 1
+    
+    def test_fuzzy_match_within_distance(self, rapidfuzz_mode):
+        """A quote a few edits off is verified as fuzzy."""
+        from app.services.citation_verifier import verify_citation
+        
+        chunks = make_chunks(["Each player may move two spaces unless blocked by a wall."])
+        
+        result = verify_citation("player may mvoe two spaces unles blocked", 1, chunks)
+        
+        assert result["verified"] is True
+        assert result["method"] == "fuzzy"
+        assert 0 < result["distance"] <= 8
+    
+    def test_unknown_chunk_id_searches_all_chunks(self, rapidfuzz_mode):
+        """A hallucinated chunk id falls back to the other chunks."""
+        from app.services.citation_verifier import verify_citation
+        
+        chunks = make_chunks(["Draw two cards.", "Discard a card at the end of the round."])
+        
+        result = verify_citation("discard a card at the end of the round", 99, chunks)
+        
+        assert result["verified"] is True
+        assert result["chunk_id"] == 2
+    
+    def test_repeated_chunk_id_uses_first(self):
+        """index_chunks keeps the first chunk for a repeated id."""
+        from app.services.citation_verifier import index_chunks
+        
+        first = MagicMock(id=1, chunk_text="first")
+        second = MagicMock(id=1, chunk_text="second")
+        
+        assert index_chunks([first, second])[1] is first
+
+
+class TestVerifyCitationInAnyChunk:
+    """Tests for the fuzzy fallback across all chunks."""
+    
+    def test_matches_plain_scan(self, rapidfuzz_mode):
+        """Random quotes find the same chunk and distance as the plain scan."""
+        from app.services.citation_verifier import normalize_text, verify_citation_in_any_chunk
+        
+        rng = random.Random(9)
+        for _ in range(40):
+            texts = [
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 40)))
+                for _ in range(rng.randint(1, 6))
+            ]
+            source = rng.choice(texts)
+            start = rng.randrange(max(1, len(source) - 60))
+            quote = mutate(rng, source[start:start + rng.randint(30, 60)], rng.randint(1, 12), "abcdefg ")
+            quote = normalize_text(quote)
+            if any(quote in text for text in texts):
+                continue
+            chunks = make_chunks(texts)
+            
+            result = verify_citation_in_any_chunk(quote, chunks)
+            expected_id, expected_distance = plain_scan(quote, chunks, max_allowed=8)
+            
+            if expected_id is None:
+                assert result["verified"] is False
+            else:
+                assert result["verified"] is True
+                assert result["method"] == "fuzzy"
+                assert result["chunk_id"] == expected_id
+                assert result["distance"] == expected_distance
+    
+    def test_prescreen_skips_chunks_without_shared_qgrams(self):
+        """Chunks too unlike the quote are never scored with the DP."""
+        from app.services import citation_verifier
+        
+        quote = "the defender may discard one token"
+        chunks = make_chunks([
+            "xyz xyz xyz xyz xyz xyz xyz xyz xyz xyz xyz",
+            "the defender may discard one tokens after the attack",
+        ])
+        
+        with patch.object(
+            citation_verifier, "find_best_match_window",
+            wraps=citation_verifier.find_best_match_window,
+        ) as window_search:
+            result = citation_verifier.verify_citation_in_any_chunk(quote + "x", chunks)
+        
+        assert result["verified"] is True
+        assert result["chunk_id"] == 2
+        searched = [call.args[1] for call in window_search.call_args_list]
+        assert all("xyz" not in text for text in searched)
+    
+    def test_prescreen_keeps_chunks_within_distance(self, rapidfuzz_mode):
+        """A chunk at the edge of the allowed distance still passes the prescreen."""
+        from app.services.citation_verifier import verify_citation_in_any_chunk
+        
+        original = "players take turns placing workers on open action spaces"
+        quote = "plazers tace tarns plucing workirs in open acteon spaxes"
+        chunks = make_chunks([original])
+        
+        result = verify_citation_in_any_chunk(quote, chunks)
+        
+        assert plain_levenshtein(quote, original) == 8
+        assert result["verified"] is True
+        assert result["distance"] == 8
+    
+    def test_tie_goes_to_earlier_chunk(self, rapidfuzz_mode):
+        """Equal distances resolve to the earlier chunk, whatever order they're visited in."""
+        from app.services.citation_verifier import verify_citation_in_any_chunk
+        
+        text = "gain one resource for each card in your hand"
+        chunks = make_chunks(["unrelated setup text", text, text])
+        
+        result = verify_citation_in_any_chunk("gain one resaurce for each card in your hand", chunks)
+        
+        assert result["verified"] is True
+        assert result["chunk_id"] == 2
+    
+    def test_tie_ignores_visiting_order(self):
+        """A later chunk visited first doesn't win a tie."""
+        from app.services import citation_verifier
+        
+        text = "gain one resource for each card in your hand"
+        chunks = make_chunks([text, text])
+        
+        with patch.object(citation_verifier, "rank_by_partial_similarity", return_value=[1, 0]):
+            result = citation_verifier.verify_citation_in_any_chunk(
+                "gain one resaurce for each card in your hand", chunks
+            )
+        
+        assert result["chunk_id"] == 1
+        assert result["distance"] == 1
+    
+    def test_no_match_beyond_threshold(self, rapidfuzz_mode):
+        """A quote from none of the chunks isn't verified."""
+        from app.services.citation_verifier import verify_citation_in_any_chunk
+        
+        chunks = make_chunks(["draw two cards", "discard a card"])
+        
+        result = verify_citation_in_any_chunk("the attacker rolls three dice and adds the bonus", chunks)
+        
+        assert result["verified"] is False
+        assert result["chunk_id"] is None
@@ -0,0 +1,213 @@
+"""
+Tests for the Levenshtein helpers used by citation verification.
+
+The optimized paths (rapidfuzz, the banded DP and the window search's
+tightening bound) are checked against a plain full-table DP.
+"""
+
+import random
+
+
+def plain_levenshtein(s1: str, s2: str) -> int:
+    """Reference edit distance: the full (m+1) x (n+1) DP table."""
+    table = [[0] * (len(s2) + 1) for _ in range(len(s1) + 1)]
+    for i in range(len(s1) + 1):
+        table[i][0] = i
+    for j in range(len(s2) + 1):
+        table[0][j] = j
+    for i in range(1, len(s1) + 1):
+        for j in range(1, len(s2) + 1):
+            cost = 0 if s1[i - 1] == s2[j - 1] else 1
+            table[i][j] = min(
+                table[i - 1][j] + 1,
+                table[i][j - 1] + 1,
+                table[i - 1][j - 1] + cost,
+            )
+    return table[len(s1)][len(s2)]
+
+
+def mutate(rng: random.Random, text: str, edits: int, alphabet: str) -> str:
+    """Apply random single-character insertions, deletions and substitutions."""
+    chars = list(text)
+    for _ in range(edits):
+        op = rng.choice("ids") if chars else "i"
+        pos = rng.randrange(len(chars) + (op == "i"))
+        if op == "i":
+            chars.insert(pos, rng.choice(alphabet))
+        elif op == "d":
+            del chars[pos]
+        else:
+            chars[pos] = rng.choice(alphabet)
+    return "".join(chars)
+
+
+def string_pairs(seed: int, count: int, max_len: int, alphabet: str = "abc d"):
+    """Random string pairs, most of them a few edits apart."""
+    rng = random.Random(seed)
+    pairs = []
+    for _ in range(count):
+        s1 = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, max_len)))
+        if rng.random() < 0.7:
+            s2 = mutate(rng, s1, rng.randint(0, 6), alphabet)
+        else:
+            s2 = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, max_len)))
+        pairs.append((s1, s2))
+    return pairs
+
+
+class TestLevenshteinDistance:
+    """Tests for levenshtein_distance."""
+    
+    def test_known_distances(self, rapidfuzz_mode):
+        """Textbook examples and empty strings."""
+        from app.services.levenshtein import levenshtein_distance
+        
+        assert levenshtein_distance("kitten", "sitting") == 3
+        assert levenshtein_distance("flaw", "lawn") == 2
+        assert levenshtein_distance("", "abc") == 3
+        assert levenshtein_distance("abc", "") == 3
+        assert levenshtein_distance("", "") == 0
+    
+    def test_matches_plain_dp(self, rapidfuzz_mode):
+        """Short and long (past the bit-parallel limit) strings agree with the DP."""
+        from app.services.levenshtein import levenshtein_distance
+        
+        for s1, s2 in string_pairs(seed=1, count=200, max_len=20) + string_pairs(seed=2, count=20, max_len=150):
+            assert levenshtein_distance(s1, s2) == plain_levenshtein(s1, s2), (s1, s2)
+
+
+class TestBoundedLevenshteinDistance:
+    """Tests for bounded_levenshtein_distance."""
+    
+    def test_matches_plain_dp_within_bound(self, rapidfuzz_mode):
+        """Distances up to the bound are exact; anything past it is bound + 1."""
+        from app.services.levenshtein import bounded_levenshtein_distance
+        
+        pairs = string_pairs(seed=3, count=200, max_len=20) + string_pairs(seed=4, count=40, max_len=150)
+        for s1, s2 in pairs:
+            expected = plain_levenshtein(s1, s2)
+            for max_distance in (0, 1, 3, 8):
+                assert bounded_levenshtein_distance(s1, s2, max_distance) == min(expected, max_distance + 1), (
+                    s1, s2, max_distance,
+                )
+    
+    def test_length_difference_over_bound(self, rapidfuzz_mode):
+        """Strings whose lengths differ by more than the bound are rejected."""
+        from app.services.levenshtein import bounded_levenshtein_distance
+        
+        assert bounded_levenshtein_distance("abc", "abcdefgh", 2) == 3
+        assert bounded_levenshtein_distance("", "abcd", 3) == 4
+        assert bounded_levenshtein_distance("", "abc", 3) == 3
+    
+    def test_symmetric(self, rapidfuzz_mode):
+        """Argument order doesn't change the result."""
+        from app.services.levenshtein import bounded_levenshtein_distance
+        
+        for s1, s2 in string_pairs(seed=5, count=50, max_len=100):
+            assert bounded_levenshtein_distance(s1, s2, 5) == bounded_levenshtein_distance(s2, s1, 5)
+
+
+class TestFindBestMatchWindow:
+    """Tests for find_best_match_window."""
+    
+    def test_exact_substring(self, rapidfuzz_mode):
+        """An exact occurrence is found at distance 0."""
+        from app.services.levenshtein import find_best_match_window
+        
+        source = "players may move two spaces unless blocked by a wall"
+        target = "move two spaces"
+        
+        match, start, distance = find_best_match_window(target, source)
+        
+        assert distance == 0
+        assert match == target
+        assert source[start:start + len(match)] == match
+    
+    def test_distance_is_plain_dp_of_window(self, rapidfuzz_mode):
+        """The reported distance is the true distance to the returned window."""
+        from app.services.levenshtein import find_best_match_window
+        
+        rng = random.Random(6)
+        for _ in range(60):
+            source = "".join(rng.choice("abcde ") for _ in range(rng.randint(20, 160)))
+            start = rng.randrange(len(source) - 10)
+            target = mutate(rng, source[start:start + rng.randint(5, 40)], rng.randint(0, 4), "abcde ")
+            
+            match, found_start, distance = find_best_match_window(target, source)
+            
+            assert source[found_start:found_start + len(match)] == match
+            assert distance == plain_levenshtein(target, match)
+    
+    def test_bounded_search_agrees_with_unbounded(self, rapidfuzz_mode):
+        """With max_distance, the same window is found whenever it is within the bound."""
+        from app.services.levenshtein import find_best_match_window
+        
+        rng = random.Random(7)
+        for _ in range(60):
+            source = "".join(rng.choice("abcde ") for _ in range(rng.randint(20, 160)))
+            start = rng.randrange(len(source) - 10)
+            target = mutate(rng, source[start:start + rng.randint(5, 40)], rng.randint(0, 6), "abcde ")
+            unbounded = find_best_match_window(target, source)
+            
+            for max_distance in (0, 2, 5):
+                bounded = find_best_match_window(target, source, max_distance=max_distance)
+                if unbounded[2] <= max_distance:
+                    assert bounded == unbounded
+                else:
+                    assert bounded[2] > max_distance
+    
+    def test_target_longer_than_source(self, rapidfuzz_mode):
+        """A target at least as long as the source is compared whole."""
+        from app.services.levenshtein import find_best_match_window
+        
+        assert find_best_match_window("abcdef", "abd") == ("abd", 0, 3)
+        assert find_best_match_window("abcdef", "abd", max_distance=1) == ("abd", 0, 2)
+    
+    def test_empty_inputs(self, rapidfuzz_mode):
+        """Empty target or source short-circuits."""
+        from app.services.levenshtein import find_best_match_window
+        
+        assert find_best_match_window("", "abc") == ("", 0, 0)
+        assert find_best_match_window("abc", "") == ("", 0, 3)
+
+
+class TestMyersDistance:
+    """Tests for the bit-parallel _myers_distance."""
+    
+    def test_matches_plain_dp(self):
+        """Patterns up to the word size agree with the DP against longer texts."""
+        from app.services.levenshtein import MYERS_MAX_LENGTH, _myers_distance
+        
+        rng = random.Random(8)
+        for _ in range(300):
+            pattern = "".join(rng.choice("abc d") for _ in range(rng.randint(1, MYERS_MAX_LENGTH)))
+            text = mutate(rng, pattern, rng.randint(0, 10), "abc d")
+            if len(text) < len(pattern):
+                pattern, text = text, pattern
+            if not pattern:
+                continue
+            assert _myers_distance(pattern, text) == plain_levenshtein(pattern, text), (pattern, text)
+    
+    def test_full_word_pattern(self):
+        """A pattern of exactly MYERS_MAX_LENGTH uses every bit of the word."""
+        from app.services.levenshtein import MYERS_MAX_LENGTH, _myers_distance
+        
+        pattern = "ab" * (MYERS_MAX_LENGTH // 2)
+        text = "b" + pattern[1:-1] + "xa"
+        
+        assert len(pattern) == MYERS_MAX_LENGTH
+        assert _myers_distance(pattern, text) == plain_levenshtein(pattern, text)
+    
+    def test_single_character_pattern(self):
+        """One-character patterns against texts with and without it."""
+        from app.services.levenshtein import _myers_distance
+        
+        assert _myers_distance("a", "a") == 0
+        assert _myers_distance("a", "bbb") == 3
+        assert _myers_distance("a", "bab") == 2
+    
+    def test_global_not_substring_distance(self):
+        """The whole text counts, not just the best-matching part of it."""
+        from app.services.levenshtein import _myers_distance
+        
+        assert _myers_distance("rule", "the rule applies") == 12
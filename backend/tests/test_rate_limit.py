@@ -0,0 +1,355 @@
+"""
+Tests for Redis rate limiting and concurrency limits.
+
+Tests cover:
+- Parsing the rate limit script's reply (stubbed script)
+- reset_at for denied sliding and approximate windows
+- Failing open when Redis is unavailable
+- The Lua scripts themselves, run against an in-memory Redis when
+  lupa is installed
+"""
+
+import fnmatch
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+NOW = 1_000_000.0
+
+
+def stub_script(reply):
+    """Patch the rate limit module to run a stub script returning reply."""
+    script = AsyncMock(return_value=reply)
+    return (
+        patch("app.middleware.rate_limit.get_async_redis", return_value=MagicMock()),
+        patch("app.middleware.rate_limit._get_script", return_value=script),
+        script,
+    )
+
+
+class FakeRedis:
+    """Just enough of Redis's data model for the rate limit scripts."""
+    
+    def __init__(self):
+        self.strings: dict[str, int] = {}
+        self.zsets: dict[str, dict[str, float]] = {}
+        self.lua = None  # LuaRuntime, for building table replies
+    
+    def call(self, command, *args):
+        command = command.upper()
+        if command == "GET":
+            value = self.strings.get(args[0])
+            return False if value is None else str(value)
+        if command == "SET":
+            self.strings[args[0]] = int(args[1])
+            return "OK"
+        if command in ("INCR", "DECR"):
+            self.strings[args[0]] = self.strings.get(args[0], 0) + (1 if command == "INCR" else -1)
+            return self.strings[args[0]]
+        if command in ("EXPIRE", "PEXPIRE"):
+            return 1
+        if command == "ZREMRANGEBYSCORE":
+            zset = self.zsets.get(args[0], {})
+            low, high = float(args[1]), float(args[2])
+            for member in [m for m, score in zset.items() if low <= score <= high]:
+                del zset[member]
+            return 0
+        if command == "ZCARD":
+            return len(self.zsets.get(args[0], {}))
+        if command == "ZADD":
+            self.zsets.setdefault(args[0], {})[args[2]] = float(args[1])
+            return 1
+        if command == "ZRANGE":
+            ordered = sorted(self.zsets.get(args[0], {}).items(), key=lambda item: item[1])
+            if not ordered:
+                return self.lua.table()
+            member, score = ordered[0]
+            return self.lua.table(member, repr(score))
+        raise NotImplementedError(command)
+    
+    def keys(self, pattern: str) -> list[str]:
+        return fnmatch.filter(list(self.strings) + list(self.zsets), pattern)
+
+
+def lua_redis():
+    """
+    FakeRedis plus a _get_script replacement that runs the real Lua
+    source against it. Skips the test when lupa isn't installed.
+    """
+    lupa = pytest.importorskip("lupa")
+    lua = lupa.LuaRuntime()
+    redis = FakeRedis()
+    redis.lua = lua
+    
+    def get_script(_client, source):
+        function = lua.execute(f"return function() {source} end")
+        
+        async def run(keys, args=(), client=None):
+            lua_globals = lua.globals()
+            lua_globals.KEYS = lua.table(*keys)
+            lua_globals.ARGV = lua.table(*[str(arg) for arg in args])
+            lua_globals.redis = lua.table_from({"call": redis.call})
+            reply = function()
+            # Redis truncates Lua numbers to integers on the way out
+            convert = lambda value: int(value) if isinstance(value, float) else value
+            if lupa.lua_type(reply) == "table":
+                return [convert(value) for value in reply.values()]
+            return convert(reply)
+        
+        return run
+    
+    return redis, get_script
+
+
+class TestRateLimitMany:
+    """Tests for rate_limit_many with a stubbed script."""
+    
+    async def test_allowed_reports_remaining(self):
+        """An allowed request reports the room left in the window."""
+        from app.middleware.rate_limit import rate_limit_many
+        
+        redis_patch, script_patch, _ = stub_script([0, 3, repr(NOW), 0])
+        with redis_patch, script_patch, patch("app.middleware.rate_limit.time.time", return_value=NOW):
+            [result] = await rate_limit_many([("ask:ip:1.2.3.4", 10, 60, "approximate")])
+        
+        assert result.allowed is True
+        assert result.remaining == 7
+        assert result.reset_at == int(NOW) + 60
+        assert result.remaining_header == "7"
+    
+    async def test_builds_keys_and_args_per_window_type(self):
+        """Approximate limits use two window counters; sliding ones a sorted set."""
+        from app.middleware.rate_limit import rate_limit_many
+        
+        redis_patch, script_patch, script = stub_script([0, 1, repr(NOW), 0, 1, repr(NOW), 0])
+        with redis_patch, script_patch, patch("app.middleware.rate_limit.time.time", return_value=NOW):
+            await rate_limit_many([
+                ("ask:ip:1.2.3.4", 10, 60, "approximate"),
+                ("ask:session:abc", 5, 30, "sliding"),
+            ])
+        
+        window_id = int(NOW // 60)
+        keys = script.await_args.kwargs["keys"]
+        args = script.await_args.kwargs["args"]
+        assert keys == [
+            f"ratelimit:ask:ip:1.2.3.4:{window_id}",
+            f"ratelimit:ask:ip:1.2.3.4:{window_id - 1}",
+            "ratelimit:ask:session:abc",
+            "ratelimit:ask:session:abc:seq",
+        ]
+        assert args[0] == repr(NOW)
+        assert args[1:5] == ["approximate", 10, 60, 0]
+        assert args[6:10] == ["sliding", 5, 30, repr(NOW - 30)]
+    
+    async def test_denied_sliding_resets_when_oldest_expires(self):
+        """A denied sliding limit frees up one window after its oldest entry."""
+        from app.middleware.rate_limit import rate_limit_many
+        
+        oldest = NOW - 20
+        redis_patch, script_patch, _ = stub_script([1, 5, repr(oldest), 0])
+        with redis_patch, script_patch, patch("app.middleware.rate_limit.time.time", return_value=NOW):
+            [result] = await rate_limit_many([("ask:session:abc", 5, 30, "sliding")])
+        
+        assert result.allowed is False
+        assert result.remaining == 0
+        assert result.reset_at == int(oldest) + 30
+        assert result.retry_after == 10
+    
+    async def test_denied_approximate_reports_decay_point(self):
+        """A denied approximate limit reports when the weighted count fits again."""
+        from app.middleware.rate_limit import _approximate_reset_at, rate_limit_many
+        
+        # 40s into the window: 30 * (1 - 40/60) + 4 = 14 weighted requests
+        redis_patch, script_patch, _ = stub_script([1, 14, 4, 30])
+        with redis_patch, script_patch, patch("app.middleware.rate_limit.time.time", return_value=NOW):
+            [result] = await rate_limit_many([("ask:ip:1.2.3.4", 10, 60, "approximate")])
+        
+        assert result.allowed is False
+        assert result.reset_at == _approximate_reset_at(NOW, 10, 60, current=4, previous=30)
+        assert int(NOW) < result.reset_at < (int(NOW // 60) + 1) * 60
+    
+    async def test_only_exceeded_limits_are_denied(self):
+        """When one limit denies, the others keep allowed=True."""
+        from app.middleware.rate_limit import rate_limit_many
+        
+        redis_patch, script_patch, _ = stub_script([2, 3, repr(NOW), 0, 5, repr(NOW - 5), 0])
+        with redis_patch, script_patch, patch("app.middleware.rate_limit.time.time", return_value=NOW):
+            ip_result, session_result = await rate_limit_many([
+                ("ask:ip:1.2.3.4", 10, 60, "sliding"),
+                ("ask:session:abc", 5, 30, "sliding"),
+            ])
+        
+        assert ip_result.allowed is True
+        assert session_result.allowed is False
+    
+    async def test_fails_open_without_redis(self):
+        """If Redis can't be reached, every limit allows the request."""
+        from app.middleware.rate_limit import rate_limit_many
+        
+        with patch("app.middleware.rate_limit.get_async_redis", side_effect=Exception("down")):
+            results = await rate_limit_many([("a", 10, 60, "approximate"), ("b", 5, 30, "sliding")])
+        
+        assert [r.allowed for r in results] == [True, True]
+        assert [r.remaining for r in results] == [10, 5]
+    
+    async def test_fails_open_on_script_error(self):
+        """A failing script allows the request."""
+        from app.middleware.rate_limit import rate_limit
+        
+        redis_patch, script_patch, script = stub_script(None)
+        script.side_effect = Exception("NOSCRIPT")
+        with redis_patch, script_patch:
+            result = await rate_limit("a", 10, 60)
+        
+        assert result.allowed is True
+
+
+class TestApproximateResetAt:
+    """Tests for _approximate_reset_at."""
+    
+    @staticmethod
+    def weighted_count(at: float, window: int, counters: dict[int, int]) -> float:
+        """Sliding estimate at time at, given counters per fixed window."""
+        current_id = int(at // window)
+        weight = 1 - (at - current_id * window) / window
+        return counters.get(current_id - 1, 0) * weight + counters.get(current_id, 0)
+    
+    @pytest.mark.parametrize("current, previous", [(4, 8), (0, 15), (9, 1), (10, 0), (25, 3)])
+    def test_room_opens_at_reported_time(self, current, previous):
+        """The count is under the limit at reset_at and not two seconds before."""
+        from app.middleware.rate_limit import _approximate_reset_at
+        
+        max_requests, window = 10, 60
+        now = NOW + 15
+        window_id = int(now // window)
+        counters = {window_id - 1: previous, window_id: current}
+        
+        reset_at = _approximate_reset_at(now, max_requests, window, current, previous)
+        
+        assert self.weighted_count(reset_at, window, counters) < max_requests
+        if reset_at - 2 > now:
+            assert self.weighted_count(reset_at - 2, window, counters) >= max_requests
+    
+    def test_full_current_window_waits_past_boundary(self):
+        """A current window at the limit on its own can't clear before the next one."""
+        from app.middleware.rate_limit import _approximate_reset_at
+        
+        window_end = (int(NOW // 60) + 1) * 60
+        
+        assert _approximate_reset_at(NOW, 10, 60, current=12, previous=0) > window_end
+
+
+class TestConcurrentLimit:
+    """Tests for check_concurrent_limit and release_concurrent with a stubbed script."""
+    
+    async def test_acquire_allowed(self):
+        """A free slot is taken."""
+        from app.middleware.rate_limit import check_concurrent_limit
+        
+        redis_patch, script_patch, script = stub_script([1, 2])
+        with redis_patch, script_patch:
+            assert await check_concurrent_limit("ingest", 3) == (True, 2)
+        
+        assert script.await_args.kwargs["keys"] == ["concurrent:ingest"]
+        assert script.await_args.kwargs["args"] == [3, 600]
+    
+    async def test_acquire_denied(self):
+        """A full counter is rejected."""
+        from app.middleware.rate_limit import check_concurrent_limit
+        
+        redis_patch, script_patch, _ = stub_script([0, 3])
+        with redis_patch, script_patch:
+            assert await check_concurrent_limit("ingest", 3) == (False, 3)
+    
+    async def test_acquire_fails_open(self):
+        """Redis errors allow the operation."""
+        from app.middleware.rate_limit import check_concurrent_limit
+        
+        with patch("app.middleware.rate_limit.get_async_redis", side_effect=Exception("down")):
+            assert await check_concurrent_limit("ingest", 3) == (True, 0)
+    
+    async def test_release_runs_script(self):
+        """Release decrements the same counter."""
+        from app.middleware.rate_limit import release_concurrent
+        
+        redis_patch, script_patch, script = stub_script(0)
+        with redis_patch, script_patch:
+            await release_concurrent("ingest")
+        
+        assert script.await_args.kwargs["keys"] == ["concurrent:ingest"]
+
+
+class TestRateLimitLua:
+    """The Lua scripts run against an in-memory Redis (needs lupa)."""
+    
+    @pytest.mark.parametrize("window_type", ["approximate", "sliding"])
+    async def test_limit_reject_and_reset(self, window_type):
+        """Requests count up to the limit, the next is rejected, and a later window allows again."""
+        from app.middleware.rate_limit import rate_limit
+        
+        _, get_script = lua_redis()
+        with patch("app.middleware.rate_limit.get_async_redis", return_value=MagicMock()), \
+                patch("app.middleware.rate_limit._get_script", get_script), \
+                patch("app.middleware.rate_limit.time.time") as clock:
+            clock.return_value = NOW
+            remaining = [(await rate_limit("k", 3, 60, window_type)).remaining for _ in range(3)]
+            denied = await rate_limit("k", 3, 60, window_type)
+            
+            assert remaining == [2, 1, 0]
+            assert denied.allowed is False
+            assert denied.reset_at > NOW
+            
+            # Still denied just before reset_at, allowed from it on
+            clock.return_value = denied.reset_at - 2
+            assert (await rate_limit("k", 3, 60, window_type)).allowed is False
+            clock.return_value = denied.reset_at
+            assert (await rate_limit("k", 3, 60, window_type)).allowed is True
+    
+    async def test_rejected_request_is_not_recorded(self):
+        """A denial on one limit doesn't use up room on another."""
+        from app.middleware.rate_limit import rate_limit_many
+        
+        redis, get_script = lua_redis()
+        limits = [("wide", 10, 60, "approximate"), ("narrow", 1, 60, "sliding")]
+        with patch("app.middleware.rate_limit.get_async_redis", return_value=MagicMock()), \
+                patch("app.middleware.rate_limit._get_script", get_script), \
+                patch("app.middleware.rate_limit.time.time", return_value=NOW):
+            first = await rate_limit_many(limits)
+            second = await rate_limit_many(limits)
+        
+        assert [r.allowed for r in first] == [True, True]
+        assert [r.allowed for r in second] == [True, False]
+        assert redis.strings[redis.keys("ratelimit:wide:*")[0]] == 1
+    
+    async def test_same_timestamp_requests_all_count(self):
+        """Sliding-window requests at one timestamp aren't deduplicated."""
+        from app.middleware.rate_limit import rate_limit
+        
+        redis, get_script = lua_redis()
+        with patch("app.middleware.rate_limit.get_async_redis", return_value=MagicMock()), \
+                patch("app.middleware.rate_limit._get_script", get_script), \
+                patch("app.middleware.rate_limit.time.time", return_value=NOW):
+            for _ in range(3):
+                await rate_limit("k", 10, 60, "sliding")
+        
+        assert len(redis.zsets["ratelimit:k"]) == 3
+    
+    async def test_concurrent_acquire_and_release(self):
+        """Slots are taken up to the limit, rejected past it, and freed on release."""
+        from app.middleware.rate_limit import check_concurrent_limit, release_concurrent
+        
+        redis, get_script = lua_redis()
+        with patch("app.middleware.rate_limit.get_async_redis", return_value=MagicMock()), \
+                patch("app.middleware.rate_limit._get_script", get_script):
+            assert await check_concurrent_limit("ingest", 2) == (True, 1)
+            assert await check_concurrent_limit("ingest", 2) == (True, 2)
+            assert await check_concurrent_limit("ingest", 2) == (False, 2)
+            
+            await release_concurrent("ingest")
+            assert await check_concurrent_limit("ingest", 2) == (True, 2)
+            
+            # Releasing more than was acquired floors at zero
+            for _ in range(3):
+                await release_concurrent("ingest")
+            assert redis.strings["concurrent:ingest"] == 0